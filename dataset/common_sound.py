@@ -21,6 +21,7 @@ class CommonSoundData(object):
         self.rate_list = None
         self.channel_num = None
         self.flatten_pitches = None
+        self.pitch_histogram = None
         self.key_dict = None
         self.shift_pitch = 0
         self.rhythm_dict = None
@@ -79,6 +80,16 @@ class CommonSoundData(object):
             self._flatten()
         return self.flatten_pitches
 
+    def get_pitch_histogram(self):
+        if self.pitch_histogram is None:
+            if self.flatten_pitches is None:
+                self._flatten()
+            histogram = [0] * 128
+            for pitch in self.flatten_pitches:
+                histogram[pitch] += 1
+            self.pitch_histogram = histogram
+        return self.pitch_histogram
+
     def get_note_list(self):
         return deepcopy(self.note_list)
 
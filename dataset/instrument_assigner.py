@@ -0,0 +1,195 @@
+# coding: utf-8
+from .midi._static_data import (
+    DICT_FOR_PROGRAM_onlyFF14,
+    UNPITCHED_PROGRAM_NUMS,
+)
+
+INF = float("inf")
+NUM_PITCHES = 128
+
+
+class InstrumentAssigner(object):
+    """
+    音域の当てはまり具合からFF14の楽器を自動で割り当てるクラス
+    """
+    def __init__(self, out_of_range_weight=1.0, center_weight=0.002, keep_bonus=0.05):
+        """
+        Parameters
+        ----------
+        out_of_range_weight : float, optional
+            音域外の音の割合に掛ける重み, by default 1.0
+        center_weight : float, optional
+            音域の中心と平均ピッチの差(半音)に掛ける重み, by default 0.002
+        keep_bonus : float, optional
+            元の楽器と同じ場合に差し引くコスト, by default 0.05
+        """
+        self.out_of_range_weight = out_of_range_weight
+        self.center_weight = center_weight
+        self.keep_bonus = keep_bonus
+        # (楽器名, 最低ピッチ, 最高ピッチ)のリスト（打楽器は除く）
+        self.instruments = [
+            (keys[-1], base_pitch - 12, base_pitch + 24)
+            for keys, (program_num, base_pitch) in DICT_FOR_PROGRAM_onlyFF14.items()
+            if program_num not in UNPITCHED_PROGRAM_NUMS
+        ]
+
+    def get_program_names(self):
+        """
+        割当候補の楽器名リストを返す関数
+
+        Returns
+        -------
+        list of str
+            楽器名のリスト
+        """
+        return [program_str for program_str, _, _ in self.instruments]
+
+    def get_cost_matrix(self, common_data_list):
+        """
+        パート×楽器のコスト行列を作る関数
+        コストは音域外の音の割合と、音域の中心と平均ピッチの差から算出する
+
+        Parameters
+        ----------
+        common_data_list : list of CommonSoundData
+            共通音楽データリスト
+
+        Returns
+        -------
+        list of list of float
+            コスト行列（行がパート、列が楽器）
+        """
+        cost_matrix = []
+        for common_data in common_data_list:
+            histogram = common_data.get_pitch_histogram()
+            # 累積和にしておけば音域外の音数はO(1)で得られる
+            cumsum = [0]
+            weighted_sum = 0
+            for pitch, count in enumerate(histogram):
+                cumsum.append(cumsum[-1] + count)
+                weighted_sum += pitch * count
+            num_notes = cumsum[-1]
+            avg_pitch = weighted_sum / num_notes if num_notes > 0 else None
+            program_str = common_data.get_program_str()
+
+            costs = []
+            for inst_str, min_pitch, max_pitch in self.instruments:
+                cost = 0.0
+                if num_notes > 0:
+                    num_inside = (
+                        cumsum[min(max_pitch, NUM_PITCHES - 1) + 1] - cumsum[max(min_pitch, 0)]
+                    )
+                    cost += self.out_of_range_weight * (num_notes - num_inside) / num_notes
+                    center = (min_pitch + max_pitch) / 2
+                    cost += self.center_weight * abs(avg_pitch - center)
+                if inst_str == program_str:
+                    cost -= self.keep_bonus
+                costs.append(cost)
+            cost_matrix.append(costs)
+        return cost_matrix
+
+    def assign(self, common_data_list, unique=False):
+        """
+        パートごとにFF14の楽器を割り当てる関数
+
+        Parameters
+        ----------
+        common_data_list : list of CommonSoundData
+            共通音楽データリスト（ドラムは含めない）
+        unique : bool, optional
+            同じ楽器を重複して割り当てないかどうか, by default False
+
+        Returns
+        -------
+        list of str
+            パートごとの楽器名（重複なしで楽器が足りない場合は元の楽器名）
+        """
+        cost_matrix = self.get_cost_matrix(common_data_list)
+        if unique:
+            inst_idxs = solve_assignment(cost_matrix)
+        else:
+            inst_idxs = [costs.index(min(costs)) for costs in cost_matrix]
+
+        program_strs = []
+        for common_data, inst_idx in zip(common_data_list, inst_idxs):
+            if inst_idx is None:
+                program_strs.append(common_data.get_program_str())
+            else:
+                program_strs.append(self.instruments[inst_idx][0])
+        return program_strs
+
+
+def solve_assignment(cost_matrix):
+    """
+    ハンガリアン法で総コスト最小の割当を求める関数 O(n^2 m)
+    行数が列数より多い場合は、割り当てられない行がNoneになる
+
+    Parameters
+    ----------
+    cost_matrix : list of list of float
+        コスト行列
+
+    Returns
+    -------
+    list of int or None
+        行ごとに割り当てられた列番号
+    """
+    num_rows = len(cost_matrix)
+    if num_rows == 0:
+        return []
+    num_cols = len(cost_matrix[0])
+    if num_rows > num_cols:
+        # ダミー列で正方行列にする
+        cost_matrix = [
+            list(costs) + [0.0] * (num_rows - num_cols) for costs in cost_matrix
+        ]
+    m = max(num_rows, num_cols)
+
+    # 1始まりのポテンシャル(u, v)と、列に割り当てられた行(p)
+    u = [0.0] * (num_rows + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, num_rows + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            costs = cost_matrix[i0 - 1]
+            delta = INF
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = costs[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # 増加路に沿って割当を更新
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    ret = [None] * num_rows
+    for j in range(1, num_cols + 1):
+        if p[j] != 0:
+            ret[p[j] - 1] = j - 1
+    return ret
@@ -175,6 +175,12 @@ DICT_FOR_PROGRAM_onlyFF14 = {
     ("Electric Guitar (muted)",	"ミュートギター"): (28, 48),
     ("Distortion Guitar",	"ディストーションギター"): (30, 36),
 }
+UNPITCHED_PROGRAM_NUMS = [
+    115,  # ウッドブロック(ボンゴ)
+    117,  # バスドラム
+    118,  # スネアドラム
+    119,  # シンバル
+]
 
 ## FOR LOADER
 DICT_FOR_QUANTIZED_UNIT_TIMES = {
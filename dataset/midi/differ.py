@@ -0,0 +1,342 @@
+# coding: utf-8
+from bisect import bisect_right
+from struct import unpack_from
+from .reviser import (
+    MIDI_HEADER_CHUNK,
+    MIDI_TRACK_CHUNK,
+)
+
+
+class MidiDiffer(object):
+    """
+    2つのmidiファイルをノート単位で比較するクラス
+    往復変換(mid→xlsx→mid)で音が保たれているかの確認に使う
+    """
+
+    def __init__(self, tolerance=0, ignore_channel=False):
+        """
+        Parameters
+        ----------
+        tolerance : int, optional
+            ずれ(shifted)とみなす開始tickの差の最大値, by default 0（音長の違いのみ）
+        ignore_channel : bool, optional
+            チャネルの違いを無視するかどうか, by default False
+        """
+        self.tolerance = tolerance
+        self.ignore_channel = ignore_channel
+
+    def diff(self, midi_a, midi_b):
+        """
+        ノートの差分を小節ごとに求める関数
+
+        Parameters
+        ----------
+        midi_a : str or bytes
+            基準とするmidiのファイル名、もしくはバイト列
+        midi_b : str or bytes
+            比較するmidiのファイル名、もしくはバイト列
+
+        Returns
+        -------
+        dict of int to dict
+            {小節番号: {"missing": [ノート], "extra": [ノート], "shifted": [(ノート, ノート)]}}
+            ノートは(開始tick, ピッチ, 音長, チャネル)、差分のない小節は含まない
+        """
+        notes_a, ticks_per_beat_a, time_signatures = extract_notes(midi_a)
+        notes_b, ticks_per_beat_b, _ = extract_notes(midi_b)
+        if ticks_per_beat_a != ticks_per_beat_b:
+            # 分解能が違う場合はBをAに合わせる
+            notes_b = sorted(
+                (
+                    tick * ticks_per_beat_a // ticks_per_beat_b,
+                    pitch,
+                    duration * ticks_per_beat_a // ticks_per_beat_b,
+                    channel,
+                )
+                for tick, pitch, duration, channel in notes_b
+            )
+        if self.ignore_channel:
+            notes_a = sorted((t, p, d, 0) for t, p, d, _ in notes_a)
+            notes_b = sorted((t, p, d, 0) for t, p, d, _ in notes_b)
+
+        missing, extra = merge_compare(notes_a, notes_b)
+        shifted, missing, extra = self._pair_shifted(missing, extra)
+
+        get_measure_num = MeasureCounter(ticks_per_beat_a, time_signatures).get_measure_num
+        ret = {}
+        for kind, notes in [("missing", missing), ("extra", extra), ("shifted", shifted)]:
+            for note in notes:
+                tick = note[0][0] if kind == "shifted" else note[0]
+                measure_diff = ret.setdefault(
+                    get_measure_num(tick), {"missing": [], "extra": [], "shifted": []}
+                )
+                measure_diff[kind].append(note)
+        return dict(sorted(ret.items()))
+
+    def pprint(self, diff):
+        """
+        差分を表示する関数
+
+        Parameters
+        ----------
+        diff : dict
+            diff関数の返り値
+        """
+        for measure_num, measure_diff in diff.items():
+            print("measure {}:".format(measure_num))
+            for note in measure_diff["missing"]:
+                print("  - missing {}".format(note))
+            for note in measure_diff["extra"]:
+                print("  + extra   {}".format(note))
+            for note_a, note_b in measure_diff["shifted"]:
+                print("  ~ shifted {} -> {}".format(note_a, note_b))
+
+    def _pair_shifted(self, missing, extra):
+        """
+        一致しなかったノートのうち、同じピッチ・チャネルで開始tickが近いものを「ずれ」として組にする関数
+
+        Parameters
+        ----------
+        missing : list of tuple
+            Aにだけあるノート（tick順）
+        extra : list of tuple
+            Bにだけあるノート（tick順）
+
+        Returns
+        -------
+        list of tuple
+            (Aのノート, Bのノート)のリスト
+        list of tuple
+            残ったAにだけあるノート
+        list of tuple
+            残ったBにだけあるノート
+        """
+        groups = {}
+        for idx, note in enumerate(missing):
+            groups.setdefault((note[1], note[3]), ([], []))[0].append(idx)
+        for idx, note in enumerate(extra):
+            groups.setdefault((note[1], note[3]), ([], []))[1].append(idx)
+
+        shifted = []
+        used_a = set()
+        used_b = set()
+        for idxs_a, idxs_b in groups.values():
+            i = j = 0
+            while i < len(idxs_a) and j < len(idxs_b):
+                note_a, note_b = missing[idxs_a[i]], extra[idxs_b[j]]
+                delta = note_b[0] - note_a[0]
+                if abs(delta) <= self.tolerance:
+                    shifted.append((note_a, note_b))
+                    used_a.add(idxs_a[i])
+                    used_b.add(idxs_b[j])
+                    i += 1
+                    j += 1
+                elif delta < 0:
+                    j += 1
+                else:
+                    i += 1
+        shifted.sort()
+        missing = [note for idx, note in enumerate(missing) if idx not in used_a]
+        extra = [note for idx, note in enumerate(extra) if idx not in used_b]
+        return shifted, missing, extra
+
+
+class MeasureCounter(object):
+    """
+    拍子記号から絶対tickを小節番号に変換するクラス
+    """
+
+    def __init__(self, ticks_per_beat, time_signatures):
+        """
+        Parameters
+        ----------
+        ticks_per_beat : int
+            4分音符あたりのtick数
+        time_signatures : list of tuple of (int, int, int)
+            (絶対tick, 分子, 分母)のリスト
+        """
+        self.start_ticks = []
+        self.start_measure_nums = []
+        self.ticks_in_measures = []
+        tick, measure_num, ticks_in_measure = 0, 1, ticks_per_beat * 4
+        for sig_tick, numerator, denominator in sorted(time_signatures):
+            if sig_tick > tick:
+                measure_num += -(-(sig_tick - tick) // ticks_in_measure)
+                tick = sig_tick
+            ticks_in_measure = ticks_per_beat * 4 * numerator // denominator
+            if self.start_ticks and self.start_ticks[-1] == tick:
+                self.ticks_in_measures[-1] = ticks_in_measure
+                continue
+            self.start_ticks.append(tick)
+            self.start_measure_nums.append(measure_num)
+            self.ticks_in_measures.append(ticks_in_measure)
+        if not self.start_ticks:
+            self.start_ticks, self.start_measure_nums = [0], [1]
+            self.ticks_in_measures = [ticks_in_measure]
+
+    def get_measure_num(self, tick):
+        """
+        絶対tickを小節番号(1始まり)に変換する関数
+
+        Parameters
+        ----------
+        tick : int
+            絶対tick
+
+        Returns
+        -------
+        int
+            小節番号
+        """
+        idx = max(bisect_right(self.start_ticks, tick) - 1, 0)
+        return (
+            self.start_measure_nums[idx]
+            + (tick - self.start_ticks[idx]) // self.ticks_in_measures[idx]
+        )
+
+
+def merge_compare(notes_a, notes_b):
+    """
+    ソート済みのノート列を線形にマージして、片方にしかないノートを求める関数
+
+    Parameters
+    ----------
+    notes_a : list of tuple
+        ノートのリスト（ソート済み）
+    notes_b : list of tuple
+        ノートのリスト（ソート済み）
+
+    Returns
+    -------
+    list of tuple
+        Aにだけあるノート
+    list of tuple
+        Bにだけあるノート
+    """
+    missing, extra = [], []
+    i = j = 0
+    len_a, len_b = len(notes_a), len(notes_b)
+    while i < len_a and j < len_b:
+        note_a, note_b = notes_a[i], notes_b[j]
+        if note_a == note_b:
+            i += 1
+            j += 1
+        elif note_a < note_b:
+            missing.append(note_a)
+            i += 1
+        else:
+            extra.append(note_b)
+            j += 1
+    missing.extend(notes_a[i:])
+    extra.extend(notes_b[j:])
+    return missing, extra
+
+
+def extract_notes(midi):
+    """
+    SMFのバイト列から直接ノートを取り出す関数（midoは使わない）
+
+    Parameters
+    ----------
+    midi : str or bytes
+        midiのファイル名、もしくはバイト列
+
+    Returns
+    -------
+    list of tuple of (int, int, int, int)
+        (開始tick, ピッチ, 音長, チャネル)のリスト（ソート済み）
+    int
+        4分音符あたりのtick数
+    list of tuple of (int, int, int)
+        拍子記号の(絶対tick, 分子, 分母)のリスト
+    """
+    if isinstance(midi, (bytes, bytearray)):
+        data = bytes(midi)
+    else:
+        with open(midi, "rb") as f:
+            data = f.read()
+    if data[:4] != MIDI_HEADER_CHUNK:
+        raise ValueError("not a Standard MIDI File")
+    header_len = unpack_from(">I", data, 4)[0]
+    ticks_per_beat = unpack_from(">H", data, 12)[0]
+
+    notes = []
+    time_signatures = []
+    pos = 8 + header_len
+    while pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        chunk_len = unpack_from(">I", data, pos + 4)[0]
+        start = pos + 8
+        pos = start + chunk_len
+        if chunk_type == MIDI_TRACK_CHUNK:
+            _extract_track_notes(data, start, min(pos, len(data)), notes, time_signatures)
+    notes.sort()
+    return notes, ticks_per_beat, time_signatures
+
+
+def _extract_track_notes(data, pos, end, notes, time_signatures):
+    """
+    1トラック分のノートを取り出す関数（ランニングステータスに対応）
+    """
+    active = {}  # (チャネル, ピッチ): 鳴っている音の開始tickのリスト
+    tick = 0
+    status = 0
+    while pos < end:
+        # デルタタイム
+        delta = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7f)
+            if byte < 0x80:
+                break
+        tick += delta
+
+        if data[pos] >= 0x80:
+            status = data[pos]
+            pos += 1
+        if status == 0xff:
+            meta_type = data[pos]
+            pos += 1
+            length, pos = _read_vlq(data, pos)
+            if meta_type == 0x58 and length >= 2:
+                time_signatures.append((tick, data[pos], 1 << data[pos + 1]))
+            elif meta_type == 0x2f:
+                break
+            pos += length
+            status = 0
+            continue
+        if status == 0xf0 or status == 0xf7:
+            length, pos = _read_vlq(data, pos)
+            pos += length
+            status = 0
+            continue
+
+        kind = status & 0xf0
+        if kind == 0xc0 or kind == 0xd0:
+            pos += 1
+            continue
+        pitch, velocity = data[pos], data[pos + 1]
+        pos += 2
+        if kind == 0x90 and velocity > 0:
+            active.setdefault((status & 0x0f, pitch), []).append(tick)
+        elif kind == 0x80 or kind == 0x90:
+            on_ticks = active.get((status & 0x0f, pitch))
+            if on_ticks:
+                on_tick = on_ticks.pop(0)
+                notes.append((on_tick, pitch, tick - on_tick, status & 0x0f))
+
+    # 閉じていない音はトラックの最後で切る
+    for (channel, pitch), on_ticks in active.items():
+        for on_tick in on_ticks:
+            notes.append((on_tick, pitch, tick - on_tick, channel))
+
+
+def _read_vlq(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return value, pos
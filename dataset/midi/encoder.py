@@ -0,0 +1,143 @@
+# coding: utf-8
+from struct import pack
+from .reviser import (
+    MIDI_HEADER_CHUNK,
+    MIDI_TRACK_CHUNK,
+)
+
+END_OF_TRACK_BYTES = b"\x00\xff\x2f\x00"  # デルタタイム0のend_of_track
+NUM_VLQ_TABLE = 1 << 14  # 2バイトまでの可変長数値は表引き
+
+
+def _encode_vlq(value):
+    """
+    数値を可変長数値(Variable Length Quantity)のバイト列に変換する関数
+
+    Parameters
+    ----------
+    value : int
+        0以上の数値
+
+    Returns
+    -------
+    bytes
+        可変長数値のバイト列
+    """
+    buffer = [value & 0x7f]
+    value >>= 7
+    while value:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    return bytes(buffer[::-1])
+
+
+VLQ_TABLE = [_encode_vlq(value) for value in range(NUM_VLQ_TABLE)]
+
+
+def encode_vlq(value):
+    """
+    数値を可変長数値のバイト列に変換する関数（2バイト以内は表引き）
+
+    Parameters
+    ----------
+    value : int
+        0以上の数値
+
+    Returns
+    -------
+    bytes
+        可変長数値のバイト列
+    """
+    if value < NUM_VLQ_TABLE:
+        return VLQ_TABLE[value]
+    return _encode_vlq(value)
+
+
+def encode_header(type, num_tracks, ticks_per_beat):
+    """
+    ヘッダチャンクのバイト列を作る関数
+
+    Parameters
+    ----------
+    type : int
+        SMFのフォーマット(0, 1, 2)
+    num_tracks : int
+        トラック数
+    ticks_per_beat : int
+        4分音符あたりのtick数
+
+    Returns
+    -------
+    bytes
+        ヘッダチャンク
+    """
+    return MIDI_HEADER_CHUNK + pack(">IHHH", 6, type, num_tracks, ticks_per_beat)
+
+
+def encode_track(events):
+    """
+    絶対時間のイベント列をトラックチャンクのバイト列に変換する関数
+    チャネルメッセージはランニングステータスで詰め、最後にend_of_trackを付ける
+
+    Parameters
+    ----------
+    events : list of tuple of (int, bytes)
+        (絶対tick, メッセージのバイト列)のリスト（tick順に並んでいること）
+
+    Returns
+    -------
+    bytes
+        トラックチャンク
+    """
+    data = bytearray()
+    vlq_table = VLQ_TABLE
+    bef_tick = 0
+    running_status = None
+    for tick, msg_bytes in events:
+        delta = tick - bef_tick
+        data += vlq_table[delta] if delta < NUM_VLQ_TABLE else _encode_vlq(delta)
+        bef_tick = tick
+        status = msg_bytes[0]
+        if status == running_status:
+            data += msg_bytes[1:]
+        else:
+            data += msg_bytes
+            running_status = status if status < 0xf0 else None
+    data += END_OF_TRACK_BYTES
+    return MIDI_TRACK_CHUNK + pack(">I", len(data)) + data
+
+
+def encode_meta_track(track):
+    """
+    mido形式のトラック（デルタタイム）をトラックチャンクのバイト列に変換する関数
+
+    Parameters
+    ----------
+    track : mido.MidiTrack
+        SMFのトラック（コンダクタートラック等）
+
+    Returns
+    -------
+    bytes
+        トラックチャンク
+    """
+    events = []
+    now_time = 0
+    for msg in track:
+        now_time += msg.time
+        if msg.type == "end_of_track":
+            continue
+        events.append((now_time, bytes(msg.bytes())))
+    return encode_track(events)
+
+
+def note_on_bytes(channel_num, pitch, velocity=100):
+    return bytes((0x90 | channel_num, pitch, velocity))
+
+
+def note_off_bytes(channel_num, pitch, velocity=0):
+    return bytes((0x80 | channel_num, pitch, velocity))
+
+
+def program_change_bytes(channel_num, program_num):
+    return bytes((0xc0 | channel_num, program_num))
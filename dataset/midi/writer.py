@@ -1,6 +1,18 @@
 # coding: utf-8
-from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo, tempo2bpm
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from struct import pack
+from operator import itemgetter
+from mido import MetaMessage, MidiFile, MidiTrack, bpm2tempo, tempo2bpm
 from .base import MidiIOBase
+from .encoder import (
+    encode_header,
+    encode_meta_track,
+    encode_track,
+    note_off_bytes,
+    note_on_bytes,
+    program_change_bytes,
+)
 from ._static_data import (
     DICT_FOR_PITCH_CONVERT,
 )
@@ -15,6 +27,7 @@ class MidiWriter(MidiIOBase):
         self, type=1, tempo=60, ticks_per_beat=480, rhythm_dict=None
     ):
         self.mid = MidiFile(type=type, ticks_per_beat=ticks_per_beat)
+        self.type = type
         self.ticks_per_beat = ticks_per_beat
         self.tempo = tempo
         self.time_in_measures = {}
@@ -26,6 +39,9 @@ class MidiWriter(MidiIOBase):
         for message in self._convert_rhythm_messages(self.rhythm_dict):
             self.mid.tracks[0].append(message)
         self.use_channel_list = [False] * 16
+        self.part_tracks = []  # エンコード済みのパートのトラックチャンク
+        self.part_names = []  # パートごとの楽器種類（プログラム名）
+        self.part_notes = []  # パートごとの(プログラム番号, ノートイベント列)
 
     def add_common_data(self, common_data):
         """
@@ -33,125 +49,16 @@ class MidiWriter(MidiIOBase):
         
         Parameters
         ----------
-        common_data_list : CommonSoundData
+        common_data : CommonSoundData
             共通音楽データ
-        program : str, optional
-            楽器種類（プログラム名）, by default "Acoustic Piano"
         """
-        program_str = common_data.get_program_str()
-        sound_list = common_data.get_note_list()
         rate_list = common_data.get_rate_list()
-        program_num, base_pitch = self.convert_program_str2num(program_str)
         if rate_list is None:
-            rate_list = common_data._create_dummy_rates()
-        channel_num = self._get_empty_channel_num()
-        if channel_num is None:
-            print("Error: already using All 16 Channels!")
-            return
-        print("Channel num: {}")
-        self.use_channel_list[channel_num] = True
-
-        track = MidiTrack()
-        track.append(
-            Message("program_change", channel=channel_num, program=program_num, time=0)
+            common_data._create_dummy_rates()
+            rate_list = common_data.get_rate_list()
+        self._add_track(
+            common_data.get_note_list(), rate_list, common_data.get_program_str()
         )
-        bef_pitches = []
-        bef_time = 0
-        interval_time = 0
-        now_time = 0
-        time_in_measure = 1920
-        basetime_in_beat = 480
-        print(self.time_in_measures)
-        # TODO: erase multiple for loop
-        for (
-            measure_num,
-            (notes_in_measure, (rates_in_measure, rates_in_beats)),
-        ) in enumerate(zip(sound_list, rate_list), start=1):
-            # [[[c], [c, d]], [], [], []]
-            print(measure_num, time_in_measure, now_time, interval_time)
-            if measure_num in self.time_in_measures:
-                time_in_measure = self.time_in_measures[measure_num]
-            basetime_in_beat = time_in_measure // sum(rates_in_measure)
-            bef_measure_time = now_time
-            for beat_num, (notes_in_beat) in enumerate(notes_in_measure):
-                # [[c], [c, d]]
-                time_in_beat = rates_in_measure[beat_num] * basetime_in_beat
-                basetime_in_cell = time_in_beat // sum(rates_in_beats[beat_num])
-                for cell_num, notes in enumerate(notes_in_beat):
-                    # [c] or [c, d]
-                    time_in_cell = rates_in_beats[beat_num][cell_num] * basetime_in_cell
-                    time_in_str = time_in_cell // len(notes)
-                    for note in notes:
-                        if note == "-":
-                            pass
-                        elif note == "r":
-                            if bef_pitches:
-                                for bef_pitch in bef_pitches:
-                                    track.append(
-                                        Message(
-                                            "note_off",
-                                            channel=channel_num,
-                                            note=bef_pitch,
-                                            velocity=0,
-                                            time=interval_time,
-                                        )
-                                    )
-                                    bef_time = now_time
-                                    interval_time = 0
-                                bef_pitches = []
-                        else:
-                            if bef_pitches:
-                                for bef_pitch in bef_pitches:
-                                    track.append(
-                                        Message(
-                                            "note_off",
-                                            channel=channel_num,
-                                            note=bef_pitch,
-                                            velocity=0,
-                                            time=interval_time,
-                                        )
-                                    )
-                                    bef_time = now_time
-                                    interval_time = 0
-                                bef_pitches = []
-                            if type(note) is str:
-                                _note = [note]
-                            pitches = []
-                            for n in _note:
-                                pitch = self._note2pitch(n, base_pitch)
-                                track.append(
-                                    Message(
-                                        "note_on",
-                                        channel=channel_num,
-                                        note=pitch,
-                                        velocity=100,
-                                        time=interval_time,
-                                    )
-                                )
-                                pitches.append(pitch)
-                                bef_time = now_time
-                                interval_time = 0
-                            bef_pitches = pitches
-                        interval_time += time_in_str
-                        now_time += time_in_str
-            if (bef_measure_time + time_in_measure) != (bef_time + interval_time):
-                now_time = bef_measure_time + time_in_measure
-                interval_time = now_time - bef_time
-        if bef_pitches:
-            for bef_pitch in bef_pitches:
-                track.append(
-                    Message(
-                        "note_off",
-                        channel=channel_num,
-                        note=bef_pitch,
-                        velocity=0,
-                        time=interval_time,
-                    )
-                )
-                interval_time = 0
-        # for msg in track:
-        #     print(msg)
-        self.mid.tracks.append(track)
 
     def add_sound_list(self, sound_list, rate_list=None, program="Acoustic Piano"):
         """
@@ -166,118 +73,312 @@ class MidiWriter(MidiIOBase):
         program : str, optional
             楽器種類（プログラム名）, by default "Acoustic Piano"
         """
-        program_num, base_pitch = self.convert_program_str2num(program)
         if rate_list is None:
             rate_list = self._create_dummy_rates(sound_list)
-        channel_num = self._get_empty_channel_num()
-        if channel_num is None:
-            print("Error: already using All 16 Channels!")
-            return
-        # print("Channel num: {}")
-        self.use_channel_list[channel_num] = True
+        self._add_track(sound_list, rate_list, program)
 
-        track = MidiTrack()
-        print(program_num, channel_num)
-        track.append(
-            Message("program_change", channel=channel_num, program=program_num, time=0)
-        )
-        bef_pitches = []
-        bef_time = 0
-        interval_time = 0
+    def get_note_events(self, sound_list, rate_list, base_pitch):
+        """
+        共通音リストを絶対時間のノートイベント列に変換する関数
+        
+        Parameters
+        ----------
+        sound_list : list of list of list of list of str
+            共通音リスト
+        rate_list : list of tuple
+            共通音レートリスト
+        base_pitch : int
+            FF14での C のピッチ番号
+        
+        Returns
+        -------
+        list of tuple of (int, bool, int)
+            (絶対tick, note_onかどうか, ピッチ)のリスト（tick順）
+        """
+        events = []
+        append = events.append
+        pitch_cache = {}
+        sounding_pitches = []
         now_time = 0
         time_in_measure = 1920
-        basetime_in_beat = 480
-        print(self.time_in_measures)
-        # TODO: erase multiple for loop
         for (
             measure_num,
             (notes_in_measure, (rates_in_measure, rates_in_beats)),
         ) in enumerate(zip(sound_list, rate_list), start=1):
             # [[[c], [c, d]], [], [], []]
-            print(measure_num, time_in_measure, now_time, interval_time)
             if measure_num in self.time_in_measures:
                 time_in_measure = self.time_in_measures[measure_num]
+            measure_start_time = now_time
             basetime_in_beat = time_in_measure // sum(rates_in_measure)
-            bef_measure_time = now_time
-            for beat_num, (notes_in_beat) in enumerate(notes_in_measure):
+            for notes_in_beat, rate_in_beat, rates_in_cells in zip(
+                notes_in_measure, rates_in_measure, rates_in_beats
+            ):
                 # [[c], [c, d]]
-                time_in_beat = rates_in_measure[beat_num] * basetime_in_beat
-                basetime_in_cell = time_in_beat // sum(rates_in_beats[beat_num])
-                for cell_num, notes in enumerate(notes_in_beat):
-                    # [c] or [c, d]
-                    time_in_cell = rates_in_beats[beat_num][cell_num] * basetime_in_cell
-                    time_in_str = time_in_cell // len(notes)
+                basetime_in_cell = (rate_in_beat * basetime_in_beat) // sum(rates_in_cells)
+                for notes, rate_in_cell in zip(notes_in_beat, rates_in_cells):
+                    # [c] or [c, d]（セル内の音は等分して順に鳴らす）
+                    time_in_str = (rate_in_cell * basetime_in_cell) // len(notes)
                     for note in notes:
-                        if note == "-":
-                            pass
-                        elif note == "r":
-                            if bef_pitches:
-                                for bef_pitch in bef_pitches:
-                                    track.append(
-                                        Message(
-                                            "note_off",
-                                            channel=channel_num,
-                                            note=bef_pitch,
-                                            velocity=0,
-                                            time=int(interval_time),
-                                        )
-                                    )
-                                    bef_time = now_time
-                                    interval_time = 0
-                                bef_pitches = []
-                        else:
-                            if bef_pitches:
-                                for bef_pitch in bef_pitches:
-                                    track.append(
-                                        Message(
-                                            "note_off",
-                                            channel=channel_num,
-                                            note=bef_pitch,
-                                            velocity=0,
-                                            time=int(interval_time),
-                                        )
-                                    )
-                                    bef_time = now_time
-                                    interval_time = 0
-                                bef_pitches = []
-                            if type(note) is str:
-                                _note = [note]
-                            pitches = []
-                            for n in _note:
-                                pitch = self._note2pitch(n, base_pitch)
-                                track.append(
-                                    Message(
-                                        "note_on",
-                                        channel=channel_num,
-                                        note=pitch,
-                                        velocity=100,
-                                        time=int(interval_time),
-                                    )
-                                )
-                                pitches.append(pitch)
-                                bef_time = now_time
-                                interval_time = 0
-                            bef_pitches = pitches
-                        interval_time += time_in_str
+                        if note != "-":
+                            tick = int(now_time)
+                            for pitch in sounding_pitches:
+                                append((tick, False, pitch))
+                            sounding_pitches = []
+                            if note != "r":
+                                # 文字列は単音、リストは和音
+                                for n in ([note] if type(note) is str else note):
+                                    pitch = pitch_cache.get(n)
+                                    if pitch is None:
+                                        pitch = self._note2pitch(n, base_pitch)
+                                        pitch_cache[n] = pitch
+                                    append((tick, True, pitch))
+                                    sounding_pitches.append(pitch)
                         now_time += time_in_str
-            if (bef_measure_time + time_in_measure) != (bef_time + interval_time):
-                now_time = bef_measure_time + time_in_measure
-                interval_time = now_time - bef_time
-        if bef_pitches:
-            for bef_pitch in bef_pitches:
-                track.append(
-                    Message(
-                        "note_off",
-                        channel=channel_num,
-                        note=bef_pitch,
-                        velocity=0,
-                        time=int(interval_time),
+            # 割り切れなかった分は小節の頭に揃える
+            now_time = measure_start_time + time_in_measure
+        tick = int(now_time)
+        for pitch in sounding_pitches:
+            append((tick, False, pitch))
+        events.sort(key=itemgetter(0))  # 安定ソートなので同時刻はoff→onの順が保たれる
+        return events
+
+    def _add_track(self, sound_list, rate_list, program_str):
+        """
+        共通音リストをエンコードしてパートのトラックとして追加する関数
+        
+        Parameters
+        ----------
+        sound_list : list of list of list of list of str
+            共通音リスト
+        rate_list : list of tuple
+            共通音レートリスト
+        program_str : str
+            楽器種類（プログラム名）
+        """
+        program_num, base_pitch = self.convert_program_str2num(program_str)
+        channel_num = self._get_empty_channel_num()
+        if channel_num is None:
+            print("Error: already using All 16 Channels!")
+            return
+        print(program_num, channel_num)
+        self.use_channel_list[channel_num] = True
+
+        note_events = self.get_note_events(sound_list, rate_list, base_pitch)
+        self.part_tracks.append(
+            self._encode_note_events(note_events, channel_num, program_num)
+        )
+        self.part_names.append(program_str)
+        self.part_notes.append((program_num, note_events))
+
+    def _encode_note_events(self, note_events, channel_num, program_num):
+        """
+        ノートイベント列をトラックチャンクのバイト列に変換する関数
+        
+        Parameters
+        ----------
+        note_events : list of tuple of (int, bool, int)
+            (絶対tick, note_onかどうか, ピッチ)のリスト
+        channel_num : int
+            チャネル番号
+        program_num : int
+            midi形式のプログラム番号
+        
+        Returns
+        -------
+        bytes
+            トラックチャンク
+        """
+        on_bytes = [note_on_bytes(channel_num, pitch) for pitch in range(128)]
+        off_bytes = [note_off_bytes(channel_num, pitch) for pitch in range(128)]
+        events = [(0, program_change_bytes(channel_num, program_num))]
+        events.extend(
+            (tick, on_bytes[pitch] if is_on else off_bytes[pitch])
+            for tick, is_on, pitch in note_events
+        )
+        return encode_track(events)
+
+    def fwrite(self, filename):
+        """
+        ファイル出力する関数（ヘッダ・トラックのバイト列を直接書き込む）
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力ファイル名、もしくは書き込み先のバッファ(BytesIO等)
+        """
+        if hasattr(filename, "write"):
+            self._write_chunks(filename)
+        else:
+            with open(filename, "wb") as f:
+                self._write_chunks(f)
+
+    def get_bytes(self):
+        """
+        SMFのバイト列を返す関数
+
+        Returns
+        -------
+        bytes
+            SMFのバイト列
+        """
+        buffer = BytesIO()
+        self._write_chunks(buffer)
+        return buffer.getvalue()
+
+    def fwrite_tempo_variants(self, tempos, filename_format):
+        """
+        テンポ違いのファイルをまとめて出力する関数
+        パートのトラックはエンコード済みのものを使い回し、コンダクタートラックのテンポだけを差し替える
+
+        Parameters
+        ----------
+        tempos : list of int
+            テンポのリスト
+        filename_format : str
+            出力ファイル名のフォーマット（"{}"にテンポが入る） ex) "out/TM4_tempo{}.mid"
+
+        Returns
+        -------
+        list of str
+            出力ファイル名のリスト
+        """
+        filenames = []
+        for tempo, data in zip(tempos, self.get_tempo_variant_bytes(tempos)):
+            filename = filename_format.format(tempo)
+            _write_bytes(filename, data)
+            filenames.append(filename)
+        return filenames
+
+    def get_tempo_variant_bytes(self, tempos, part_idxs=None):
+        """
+        テンポ違いのSMFのバイト列を順に返す関数
+
+        Parameters
+        ----------
+        tempos : list of int
+            テンポのリスト
+        part_idxs : list of int, optional
+            出力するパートの番号（追加順）, by default None（全パート）
+
+        Yields
+        -------
+        bytes
+            SMFのバイト列
+        """
+        for conductor in self._get_conductor_variants(tempos):
+            yield self._join_chunks(conductor, part_idxs)
+
+    def fwrite_minus_one(self, filename_format, tempos=None, solo=False, max_workers=None):
+        """
+        パートごとに、そのパートだけを抜いたファイル（マイナスワン）を出力する関数
+        エンコード済みのトラックを組み合わせるだけなので、パート数だけ変換し直すことはない
+        テンポ違いとの組み合わせは全て並列で書き出す
+
+        Parameters
+        ----------
+        filename_format : str
+            出力ファイル名のフォーマット
+            {mode}: "minus" or "solo", {part}: パート番号(1始まり), {program}: 楽器名, {tempo}: テンポ
+            ex) "out/TM4_{mode}{part}_{program}_tempo{tempo}.mid"
+        tempos : list of int, optional
+            テンポのリスト, by default None（現在のテンポのみ）
+        solo : bool, optional
+            そのパートだけのファイルも出力するかどうか, by default False
+        max_workers : int, optional
+            書き出しの並列数, by default None
+
+        Returns
+        -------
+        list of str
+            出力ファイル名のリスト
+        """
+        if tempos is None:
+            tempos = [self.tempo]
+        conductors = self._get_conductor_variants(tempos)
+        num_parts = len(self.part_tracks)
+        filenames, datas = [], []
+        for part_idx, program_str in enumerate(self.part_names):
+            part_sets = [("minus", [i for i in range(num_parts) if i != part_idx])]
+            if solo:
+                part_sets.append(("solo", [part_idx]))
+            for mode, part_idxs in part_sets:
+                for tempo, conductor in zip(tempos, conductors):
+                    filenames.append(
+                        filename_format.format(
+                            mode=mode, part=part_idx + 1, program=program_str, tempo=tempo
+                        )
                     )
-                )
-                interval_time = 0
-        # for msg in track:
-        #     print(msg)
-        self.mid.tracks.append(track)
+                    datas.append(self._join_chunks(conductor, part_idxs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_write_bytes, filenames, datas))
+        return filenames
+
+    def _get_conductor_variants(self, tempos):
+        """
+        テンポだけを差し替えたコンダクタートラックのリストを作る関数
+
+        Parameters
+        ----------
+        tempos : list of int
+            テンポのリスト
+
+        Returns
+        -------
+        list of bytes
+            トラックチャンクのリスト
+        """
+        conductor = bytearray(encode_meta_track(self.mid.tracks[0]))
+        # set_tempo(FF 51 03 tt tt tt)のデータ部分の位置
+        tempo_idx = conductor.find(b"\xff\x51\x03") + 3
+        conductors = []
+        for tempo in tempos:
+            conductor[tempo_idx:tempo_idx + 3] = pack(">I", bpm2tempo(tempo))[1:]
+            conductors.append(bytes(conductor))
+        return conductors
+
+    def _join_chunks(self, conductor, part_idxs=None):
+        """
+        ヘッダ、コンダクタートラック、パートのトラックを連結する関数
+
+        Parameters
+        ----------
+        conductor : bytes
+            コンダクタートラック
+        part_idxs : list of int, optional
+            連結するパートの番号（追加順）, by default None（全パート）
+
+        Returns
+        -------
+        bytes
+            SMFのバイト列
+        """
+        if part_idxs is None:
+            part_tracks = self.part_tracks
+        else:
+            part_tracks = [self.part_tracks[i] for i in part_idxs]
+        header = encode_header(self.type, 1 + len(part_tracks), self.ticks_per_beat)
+        return b"".join([header, conductor] + part_tracks)
+
+    def pprint(self):
+        mid = MidiFile(file=BytesIO(self.get_bytes()))
+        for i, track in enumerate(mid.tracks):
+            print("Track {}: {}".format(i, track.name))
+            for msg in track:
+                print(msg)
+
+    def _write_chunks(self, f):
+        """
+        ヘッダ、コンダクタートラック、パートのトラックを順に書き込む関数
+
+        Parameters
+        ----------
+        f : file-like object
+            書き込み先
+        """
+        f.write(encode_header(self.type, 1 + len(self.part_tracks), self.ticks_per_beat))
+        f.write(encode_meta_track(self.mid.tracks[0]))
+        for part_track in self.part_tracks:
+            f.write(part_track)
 
     def set_tempo(self, tempo):
         """
@@ -299,6 +400,7 @@ class MidiWriter(MidiIOBase):
         self.mid.tracks[0].insert(
             0, MetaMessage("set_tempo", tempo=bpm2tempo(tempo), time=0)
         )
+        self.tempo = tempo
 
     def _convert_rhythm_messages(self, rhythm_dict):
         """
@@ -351,6 +453,30 @@ class MidiWriter(MidiIOBase):
                 return i
         return None
 
+    def _create_dummy_rates(self, sound_list):
+        """
+        横幅による1拍ごとのレート（長さ）を固定間隔で作る関数
+        
+        Parameters
+        ----------
+        sound_list : list of list of list of list of str
+            共通音リスト
+        
+        Returns
+        -------
+        list of tuple
+            共通音レートリスト
+        """
+        all_rates = []
+        for notes_in_measure in sound_list:
+            rates_in_measure = [1 for notes_in_beat in notes_in_measure]
+            rates_in_beats = [
+                [1 for note_in_cell in notes_in_beat]
+                for notes_in_beat in notes_in_measure
+            ]
+            all_rates.append((rates_in_measure, rates_in_beats))
+        return all_rates
+
     def _note2pitch(self, note, base_pitch):
         """
         共通音リストの音文字列をピッチ（数値）に変換する関数
@@ -377,3 +503,33 @@ class MidiWriter(MidiIOBase):
             elif split_note[1] == "plus2":
                 pitch += 24
         return pitch
+
+
+def _write_bytes(filename, data):
+    with open(filename, "wb") as f:
+        f.write(data)
+
+
+def get_tempo_ladder(start_tempo, end_tempo, step=5):
+    """
+    開始テンポから終了テンポまで一定間隔のテンポリストを作る関数（終了テンポも含む）
+
+    Parameters
+    ----------
+    start_tempo : int
+        開始テンポ
+    end_tempo : int
+        終了テンポ
+    step : int, optional
+        テンポの間隔, by default 5
+
+    Returns
+    -------
+    list of int
+        テンポのリスト ex) 60, 100, 5 -> [60, 65, ..., 100]
+    """
+    step = abs(step) if start_tempo <= end_tempo else -abs(step)
+    tempos = list(range(start_tempo, end_tempo, step))
+    if len(tempos) == 0 or tempos[-1] != end_tempo:
+        tempos.append(end_tempo)
+    return tempos
@@ -0,0 +1,45 @@
+# coding: utf-8
+
+## FOR WRITER
+WAVETABLE_SIZE = 4096  # 1周期分の波形テーブルのサンプル数
+DURATION_BUCKET_SEC = 0.02  # 音長をこの単位で丸めて波形をキャッシュする
+MAX_AMPLITUDE = 32767  # 16bit PCM
+
+# プログラム番号: (倍音の振幅, アタック[s], 減衰の時定数[s], 持続レベル, リリース[s])
+# 倍音の振幅がNoneの場合はノイズ（打楽器）
+DICT_FOR_VOICE = {
+    # 撥弦・打鍵
+    46: ((1.0, 0.5, 0.25, 0.12, 0.06), 0.005, 0.6, 0.0, 0.05),  # ハープ
+    0: ((1.0, 0.6, 0.3, 0.2, 0.1, 0.05), 0.005, 0.9, 0.0, 0.08),  # グランドピアノ
+    25: ((1.0, 0.7, 0.45, 0.3, 0.2, 0.1), 0.005, 0.7, 0.0, 0.05),  # スチールギター
+    45: ((1.0, 0.4, 0.15), 0.003, 0.15, 0.0, 0.03),  # ピチカート
+    # 木管
+    73: ((1.0, 0.15, 0.05), 0.04, 0.3, 0.85, 0.06),  # フルート
+    68: ((1.0, 0.9, 0.7, 0.5, 0.35, 0.2), 0.03, 0.3, 0.8, 0.05),  # オーボエ
+    71: ((1.0, 0.0, 0.5, 0.0, 0.3, 0.0, 0.15), 0.03, 0.3, 0.85, 0.05),  # クラリネット
+    72: ((1.0, 0.1, 0.03), 0.03, 0.3, 0.85, 0.05),  # ピッコロ
+    75: ((1.0, 0.25, 0.08), 0.05, 0.3, 0.8, 0.08),  # パンパイプ
+    # 打楽器
+    47: ((1.0, 0.3, 0.1), 0.005, 0.5, 0.0, 0.1),  # ティンパニ
+    115: (None, 0.001, 0.04, 0.0, 0.02),  # ボンゴ
+    117: (None, 0.001, 0.12, 0.0, 0.03),  # バスドラム
+    118: (None, 0.001, 0.08, 0.0, 0.03),  # スネアドラム
+    119: (None, 0.002, 0.4, 0.0, 0.1),  # シンバル
+    # 金管
+    56: ((1.0, 0.8, 0.6, 0.45, 0.3, 0.2, 0.1), 0.03, 0.3, 0.8, 0.05),  # トランペット
+    57: ((1.0, 0.85, 0.65, 0.45, 0.3, 0.15), 0.04, 0.3, 0.8, 0.06),  # トロンボーン
+    58: ((1.0, 0.6, 0.3, 0.15), 0.05, 0.3, 0.8, 0.08),  # チューバ
+    60: ((1.0, 0.5, 0.25, 0.1), 0.05, 0.3, 0.8, 0.08),  # ホルン
+    65: ((1.0, 0.7, 0.5, 0.35, 0.25, 0.15), 0.03, 0.3, 0.8, 0.05),  # サックス
+    # 弦
+    40: ((1.0, 0.5, 0.33, 0.25, 0.2, 0.16, 0.14), 0.06, 0.3, 0.85, 0.1),  # ヴァイオリン
+    41: ((1.0, 0.55, 0.35, 0.25, 0.18, 0.12), 0.06, 0.3, 0.85, 0.1),  # ヴィオラ
+    42: ((1.0, 0.6, 0.4, 0.25, 0.15, 0.1), 0.07, 0.3, 0.85, 0.1),  # チェロ
+    43: ((1.0, 0.65, 0.4, 0.2, 0.1), 0.08, 0.3, 0.85, 0.1),  # コントラバス
+    # エレキギター
+    29: ((1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3), 0.005, 1.0, 0.3, 0.05),  # オーバードライブギター
+    27: ((1.0, 0.5, 0.3, 0.2, 0.1), 0.005, 0.8, 0.0, 0.05),  # クリーンギター
+    28: ((1.0, 0.5, 0.3, 0.2), 0.003, 0.12, 0.0, 0.02),  # ミュートギター
+    30: ((1.0, 1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3), 0.005, 1.2, 0.4, 0.05),  # ディストーションギター
+}
+DEFAULT_VOICE = ((1.0, 0.5, 0.25), 0.01, 0.5, 0.5, 0.05)
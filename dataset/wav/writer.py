@@ -0,0 +1,257 @@
+# coding: utf-8
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+from ..midi.writer import MidiWriter
+from ._static_data import (
+    DEFAULT_VOICE,
+    DICT_FOR_VOICE,
+    DURATION_BUCKET_SEC,
+    MAX_AMPLITUDE,
+    WAVETABLE_SIZE,
+)
+
+
+class WavWriter(object):
+    """
+    練習用音源(WAV)を合成して出力するクラス
+    楽器ごとの波形テーブル（打楽器はノイズ）で音を作り、パートごとに別プロセスで合成して足し合わせる
+    """
+
+    def __init__(self, sample_rate=44100, gain=0.25, max_workers=None):
+        """
+        Parameters
+        ----------
+        sample_rate : int, optional
+            サンプリング周波数, by default 44100
+        gain : float, optional
+            1パートあたりの音量, by default 0.25
+        max_workers : int, optional
+            合成の並列数（1の場合は同じプロセスで合成）, by default None
+        """
+        self.sample_rate = sample_rate
+        self.gain = gain
+        self.max_workers = max_workers
+        self.parts = []  # (プログラム番号, 開始[s]の配列, 終了[s]の配列, ピッチの配列)のリスト
+
+    def add_midi_writer(self, midi_data):
+        """
+        MidiWriterに追加済みのパートを追加する関数
+
+        Parameters
+        ----------
+        midi_data : MidiWriter
+            パートを追加済みのMidiWriter
+        """
+        sec_per_tick = 60 / (midi_data.tempo * midi_data.ticks_per_beat)
+        for program_num, note_events in midi_data.part_notes:
+            starts, ends, pitches = pair_note_events(note_events)
+            self.parts.append(
+                (program_num, starts * sec_per_tick, ends * sec_per_tick, pitches)
+            )
+
+    def add_common_data_list(self, common_data_list, tempo, rhythm_dict=None):
+        """
+        共通音楽データ(CommonSoundData)のリストを追加する関数
+
+        Parameters
+        ----------
+        common_data_list : list of CommonSoundData
+            共通音楽データリスト
+        tempo : int
+            曲のテンポ
+        rhythm_dict : dict, optional
+            拍子の辞書, by default None
+        """
+        midi_data = MidiWriter(tempo=tempo, rhythm_dict=rhythm_dict)
+        for common_data in common_data_list:
+            midi_data.add_common_data(common_data)
+        self.add_midi_writer(midi_data)
+
+    def render(self):
+        """
+        全パートを合成する関数
+
+        Returns
+        -------
+        numpy.ndarray
+            16bit PCMの波形（モノラル）
+        """
+        if len(self.parts) == 0:
+            return np.zeros(0, dtype=np.int16)
+        num_samples = int(
+            max((ends.max() if len(ends) > 0 else 0) for _, _, ends, _ in self.parts)
+            * self.sample_rate
+        ) + 1
+        num_samples += int(max(_get_voice(p)[4] for p, _, _, _ in self.parts) * self.sample_rate)
+        args = [
+            (program_num, starts, ends, pitches, num_samples, self.sample_rate)
+            for program_num, starts, ends, pitches in self.parts
+        ]
+        mix = np.zeros(num_samples, dtype=np.float32)
+        if self.max_workers == 1:
+            for part_wave in map(render_part, *zip(*args)):
+                mix += part_wave
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                for part_wave in executor.map(render_part, *zip(*args)):
+                    mix += part_wave
+        mix *= self.gain
+        np.clip(mix, -1.0, 1.0, out=mix)
+        return (mix * MAX_AMPLITUDE).astype(np.int16)
+
+    def fwrite(self, filename):
+        """
+        ファイル出力する関数
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力ファイル名
+        """
+        data = self.render()
+        with wave.open(filename, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(data.tobytes())
+
+
+def pair_note_events(note_events):
+    """
+    ノートイベント列をノート（開始、終了、ピッチ）の配列に変換する関数
+
+    Parameters
+    ----------
+    note_events : list of tuple of (int, bool, int)
+        (絶対tick, note_onかどうか, ピッチ)のリスト（tick順）
+
+    Returns
+    -------
+    numpy.ndarray
+        開始tickの配列
+    numpy.ndarray
+        終了tickの配列
+    numpy.ndarray
+        ピッチの配列
+    """
+    on_ticks = {}
+    notes = []
+    for tick, is_on, pitch in note_events:
+        if is_on:
+            on_ticks[pitch] = tick
+        elif pitch in on_ticks:
+            notes.append((on_ticks.pop(pitch), tick, pitch))
+    if len(notes) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    starts, ends, pitches = np.array(notes, dtype=np.int64).T
+    return starts, ends, pitches
+
+
+def render_part(program_num, starts, ends, pitches, num_samples, sample_rate):
+    """
+    1パート分の波形を合成する関数（プロセスごとに呼ばれる）
+    同じ(楽器, ピッチ, 音長)の波形はキャッシュしたものを重ね合わせる
+
+    Parameters
+    ----------
+    program_num : int
+        midi形式のプログラム番号
+    starts : numpy.ndarray
+        開始[s]の配列
+    ends : numpy.ndarray
+        終了[s]の配列
+    pitches : numpy.ndarray
+        ピッチの配列
+    num_samples : int
+        出力のサンプル数
+    sample_rate : int
+        サンプリング周波数
+
+    Returns
+    -------
+    numpy.ndarray
+        1パート分の波形（float32）
+    """
+    out = np.zeros(num_samples, dtype=np.float32)
+    if len(starts) == 0:
+        return out
+    bucket_len = max(int(DURATION_BUCKET_SEC * sample_rate), 1)
+    start_samples = np.round(starts * sample_rate).astype(np.int64)
+    num_buckets = np.maximum(
+        np.round((ends - starts) * sample_rate / bucket_len).astype(np.int64), 1
+    )
+    for start, pitch, num_bucket in zip(
+        start_samples.tolist(), pitches.tolist(), num_buckets.tolist()
+    ):
+        note_wave = get_note_wave(program_num, pitch, num_bucket, sample_rate)
+        end = min(start + len(note_wave), num_samples)
+        out[start:end] += note_wave[:end - start]
+    return out
+
+
+@lru_cache(maxsize=4096)
+def get_note_wave(program_num, pitch, num_buckets, sample_rate):
+    """
+    1音分の波形を作る関数（楽器、ピッチ、音長の単位数ごとにキャッシュ）
+
+    Parameters
+    ----------
+    program_num : int
+        midi形式のプログラム番号
+    pitch : int
+        ピッチ
+    num_buckets : int
+        音長（DURATION_BUCKET_SEC単位）
+    sample_rate : int
+        サンプリング周波数
+
+    Returns
+    -------
+    numpy.ndarray
+        リリースを含む1音分の波形（float32）
+    """
+    harmonics, attack, decay, sustain, release = _get_voice(program_num)
+    note_len = num_buckets * max(int(DURATION_BUCKET_SEC * sample_rate), 1)
+    release_len = int(release * sample_rate)
+    t = np.arange(note_len + release_len, dtype=np.float32) / sample_rate
+
+    if harmonics is None:
+        # 打楽器はピッチごとに固定したノイズ
+        rand = np.random.default_rng(program_num * 128 + pitch)
+        tone = rand.uniform(-1.0, 1.0, len(t)).astype(np.float32)
+    else:
+        freq = 440.0 * 2 ** ((pitch - 69) / 12)
+        table = _get_wavetable(harmonics, freq, sample_rate)
+        phases = (np.arange(len(t), dtype=np.float64) * (freq * WAVETABLE_SIZE / sample_rate))
+        tone = table[phases.astype(np.int64) % WAVETABLE_SIZE]
+
+    # ADSRのエンベロープ
+    envelope = sustain + (1.0 - sustain) * np.exp(-t / decay)
+    if attack > 0:
+        envelope = np.minimum(envelope, t / attack)
+    if release_len > 0:
+        release_env = np.linspace(1.0, 0.0, release_len, dtype=np.float32)
+        envelope[note_len:] = envelope[note_len - 1] * release_env
+    return (tone * envelope).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _get_wavetable(harmonics, freq, sample_rate):
+    """
+    ナイキスト周波数を超える倍音を除いた1周期分の波形テーブルを作る関数
+    """
+    phase = np.arange(WAVETABLE_SIZE, dtype=np.float64) * (2 * np.pi / WAVETABLE_SIZE)
+    table = np.zeros(WAVETABLE_SIZE, dtype=np.float64)
+    for k, amp in enumerate(harmonics, start=1):
+        if freq * k >= sample_rate / 2:
+            break
+        table += amp * np.sin(k * phase)
+    table /= max(np.abs(table).max(), 1e-9)
+    return table.astype(np.float32)
+
+
+def _get_voice(program_num):
+    return DICT_FOR_VOICE.get(program_num, DEFAULT_VOICE)
@@ -8,6 +8,23 @@ HUE_DICT = {
     "purple": [270, 330],
 }
 ALPHABET_NUM = 26
+KNOWN_NOTE_COLORS = list(HUE_DICT.keys()) + ["gray", "white"]  # 音の読み方が決まっている色（judge_colorの色と灰・白）
+NON_BORDER_COLORS = ["ffc7c8c8"]  # XlsxWriterがセルの区切りに使う（拍の区切りではない）罫線の色
+BORDER_NONE = 0  # 区切りなし
+BORDER_BEAT = 1  # 拍の区切り
+BORDER_MEASURE = 2  # 小節の区切り
+DICT_FOR_BORDER_CLASS = {
+    "thin": BORDER_BEAT,
+    "hair": BORDER_BEAT,
+    "medium": BORDER_MEASURE,
+    "thick": BORDER_MEASURE,
+}
+MAX_BEAT_SCAN_CELLS = 64  # 小節の区切りを探すセル数
+BEAT_WIDTH_TOLERANCE = 0.1  # 拍の横幅のずれの許容値（1拍の横幅に対する割合）
+SCAN_MEASURE_END = 0  # 小節の区切りまで読めた
+SCAN_LIMIT_BEAT = 1  # 拍数の上限に達した
+SCAN_NO_BORDER = 2  # 小節の区切りが見つからなかった
+MIN_SCORE_CELLS = 4  # 楽譜の行とみなす色付きのセルの最小数（マーカー列が無い場合）
 DICT_FOR_NAME_CONVERT = {
     ("C", "c", "ド", ("ﾄ", "ﾞ")): ("C", True),
     ("D", "d", "レ", "ﾚ"): ("D", True),
@@ -1,11 +1,15 @@
 # coding: utf-8
 from abc import ABCMeta, abstractmethod
+from itertools import accumulate
+from openpyxl.utils.cell import get_column_letter
 
 from ._static_data import (
     HUE_DICT,
     ALPHABET_NUM,
 )
 
+COLUMN_STR_DICT = {}  # 列番号ごとの列の英語（一度変換したものを使い回す）
+
 
 class XlsxIOBase(metaclass=ABCMeta):
     def get_sheetnames(self):
@@ -54,6 +58,9 @@ class XlsxIOBase(metaclass=ABCMeta):
         str
             列の英語
         """
+        col_str = COLUMN_STR_DICT.get(col_num)
+        if col_str is not None:
+            return col_str
         col_str = ""
         _num = col_num
         if col_num > ALPHABET_NUM:
@@ -63,7 +70,9 @@ class XlsxIOBase(metaclass=ABCMeta):
                 _num = ALPHABET_NUM
                 div_num -= 1
             col_str += self._convert_column_num(div_num)
-        return col_str + chr(_num + ord("@"))
+        col_str += chr(_num + ord("@"))
+        COLUMN_STR_DICT[col_num] = col_str
+        return col_str
 
     def _convert_cell_str(self, cell_str):
         """
@@ -118,8 +127,8 @@ class XlsxIOBase(metaclass=ABCMeta):
         
         Parameters
         ----------
-        sheet : openpyxl.Sheet
-            エクセルのシート名
+        sheet : openpyxl.Sheet or SheetLayout
+            エクセルのシート（SheetLayoutの場合は列幅の累積和を使い回す）
         start_col : int
             開始行番号
         end_col : int
@@ -130,6 +139,9 @@ class XlsxIOBase(metaclass=ABCMeta):
         dict of {int: int}
             行番号をキー、セル幅を値とする辞書
         """
+        geometry = getattr(sheet.column_dimensions, "geometry", None)
+        if geometry is not None:
+            return geometry.get_widths(start_col, end_col)
         cell_width_dict = {}
         bef_width = -1
         col_num = 1
@@ -167,3 +179,123 @@ class XlsxIOBase(metaclass=ABCMeta):
             if lower < _hue and _hue < upper:
                 return color
         return None
+
+
+class ColumnGeometry(object):
+    """
+    列番号ごとの列幅（未設定の列は左の列の幅）とその累積和を持つクラス
+    書き込み(SheetLayout)と読み込み(SheetAnalysis)の両方で使う
+    列幅はset_widthで変え、変えた列より右の列幅は次に参照したときに計算し直す
+    """
+
+    def __init__(self, column_dimensions):
+        """
+        Parameters
+        ----------
+        column_dimensions : ColumnDimensions or openpyxl.DimensionHolder or RawColumnDimensions
+            列幅（列の英語をキーとし、参照した列は既定の列幅で作るもの）
+        """
+        self.column_dimensions = column_dimensions
+        self.column_widths = [0]  # 列番号をインデックスとする列幅（0列目はダミー）
+        self.width_prefix_sums = [0]  # 列幅の累積和
+
+    def set_width(self, column, width):
+        """
+        列幅を設定する関数
+
+        Parameters
+        ----------
+        column : int
+            列番号
+        width : float or None
+            列幅
+        """
+        self.column_dimensions[get_column_letter(column)].width = width
+        if column < len(self.column_widths) and (width is None or self.column_widths[column] != width):
+            self.clear(column)
+
+    def clear(self, column=1):
+        """
+        指定した列より右の列幅を捨てる関数（次に参照したときに計算し直す）
+
+        Parameters
+        ----------
+        column : int, optional
+            列番号, by default 1
+        """
+        del self.column_widths[column:]
+        del self.width_prefix_sums[column:]
+
+    def get_widths(self, start_col, end_col):
+        """
+        複数セル行の列幅を取得する関数(終了列番号も含む)
+
+        Parameters
+        ----------
+        start_col : int
+            開始列番号
+        end_col : int
+            終了列番号
+
+        Returns
+        -------
+        dict of {int: float}
+            列番号をキー、列幅を値とする辞書
+        """
+        self._extend(end_col)
+        return {col_num: self.column_widths[col_num] for col_num in range(start_col, end_col + 1)}
+
+    def get_width_list(self, end_col):
+        """
+        列番号をインデックスとする列幅のリストを返す関数（0列目はダミー、終了列番号も含む）
+
+        Parameters
+        ----------
+        end_col : int
+            終了列番号
+
+        Returns
+        -------
+        list of float
+            列幅のリスト
+        """
+        self._extend(end_col)
+        return self.column_widths[:end_col + 1]
+
+    def get_width_sum(self, start_col, end_col):
+        """
+        複数セル行の横幅の合計を取得する関数(終了列番号も含む)
+
+        Parameters
+        ----------
+        start_col : int
+            開始列番号
+        end_col : int
+            終了列番号
+
+        Returns
+        -------
+        float
+            横幅の合計
+        """
+        self._extend(end_col)
+        return self.width_prefix_sums[end_col] - self.width_prefix_sums[start_col - 1]
+
+    def _extend(self, end_col):
+        """
+        列幅の配列を終了列番号まで延ばす関数（参照した列は既定の列幅で作られる）
+        """
+        num_cols = len(self.column_widths) - 1
+        if end_col <= num_cols:
+            return
+        bef_width = self.column_widths[-1] if num_cols > 0 else -1
+        widths = []
+        for col_num in range(num_cols + 1, end_col + 1):
+            width = self.column_dimensions[get_column_letter(col_num)].width
+            if width is None:
+                width = bef_width
+            else:
+                bef_width = width
+            widths.append(width)
+        self.column_widths.extend(widths)
+        self.width_prefix_sums.extend(list(accumulate(widths, initial=self.width_prefix_sums[-1]))[1:])
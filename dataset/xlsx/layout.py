@@ -0,0 +1,448 @@
+# coding: utf-8
+from bisect import bisect_right, insort
+
+from openpyxl.cell.cell import MergedCell
+from openpyxl.styles.borders import Border, DEFAULT_BORDER
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils.units import DEFAULT_COLUMN_WIDTH
+from openpyxl.worksheet.cell_range import CellRange
+
+from .base import ColumnGeometry
+
+BORDER_SIDE_NAMES = ["top", "left", "right", "bottom"]  # openpyxlの結合セルの罫線を付ける順
+STYLE_KEYS = [
+    ("font", "_fonts", "fontId"),
+    ("align", "_alignments", "alignmentId"),
+    ("border", "_borders", "borderId"),
+    ("fill", "_fills", "fillId"),
+]  # (CellSpecの属性, Workbookのスタイル一覧, StyleArrayの番号)
+
+
+class CellSpec(object):
+    """
+    1セル分の値とスタイル（XlsxWriterの持つFont, Alignment, Border, PatternFill）
+    スタイルがNoneの場合は既定のスタイル（罫線はWorkbookのスタイル一覧の0番と同じDEFAULT_BORDER）とする
+    """
+    __slots__ = ("value", "font", "align", "border", "fill")
+
+    def __init__(self):
+        self.value = None
+        self.font = None
+        self.align = None
+        self.border = None
+        self.fill = None
+
+    def copy(self):
+        spec = CellSpec()
+        spec.value = self.value
+        spec.font = self.font
+        spec.align = self.align
+        spec.border = self.border
+        spec.fill = self.fill
+        return spec
+
+    def has_style(self):
+        return not (self.font is None and self.align is None and self.border is None and self.fill is None)
+
+
+class LayoutDimension(object):
+    def __init__(self, width=None, height=None):
+        self.width = width
+        self.height = height
+
+
+class ColumnDimensions(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.geometry = ColumnGeometry(self)
+
+    def __missing__(self, key):
+        # openpyxlと同様、参照した列は既定の列幅で作る
+        self[key] = LayoutDimension(width=DEFAULT_COLUMN_WIDTH)
+        return self[key]
+
+
+class RowDimensions(dict):
+    def __missing__(self, key):
+        self[key] = LayoutDimension()
+        return self[key]
+
+
+class SheetLayout(object):
+    """
+    シートのレイアウト（セルの値・スタイル、結合セル、列幅、行の高さ）だけを持つクラス
+    openpyxlのWorksheetは作らず、描画(render_worksheet, RawXlsxStreamWriter等)は別で行う
+    """
+
+    def __init__(self, title="Sheet", column_dimensions=None, row_dimensions=None, border_sum_dict=None):
+        """
+        Parameters
+        ----------
+        title : str, optional
+            シート名, by default "Sheet"
+        column_dimensions : ColumnDimensions or None, optional
+            列幅（パートごとのレイアウトでシートと共有する場合に指定）, by default None
+        row_dimensions : RowDimensions or None, optional
+            行の高さ（パートごとのレイアウトでシートと共有する場合に指定）, by default None
+        border_sum_dict : dict or None, optional
+            足した罫線のキャッシュ（パートや小節ごとのレイアウトでシートと共有する場合に指定）, by default None
+        """
+        self.title = title
+        self.cells = {}  # (行番号, 列番号)ごとのCellSpec
+        self.merged_ranges = {}  # 結合セルの(最小列, 最小行, 最大列, 最大行)をキーとする辞書（結合した順、重なり無し）
+        self.merged_rows = {}  # 行番号ごとの、その行を含む結合セルの(最小列, 最大列, 範囲)のリスト（列の順）
+        self.column_dimensions = ColumnDimensions() if column_dimensions is None else column_dimensions
+        self.row_dimensions = RowDimensions() if row_dimensions is None else row_dimensions
+        # (罫線のid, 足す辺, 足す罫線のid)ごとの(足した罫線, 罫線, 足す罫線)
+        # idが使い回されないよう、足した罫線と一緒にキーの罫線も持っておく
+        self.border_sum_dict = {} if border_sum_dict is None else border_sum_dict
+
+    def cell(self, row, column):
+        """
+        セルの指定を返す関数（無ければ作る）
+
+        Parameters
+        ----------
+        row : int
+            行番号
+        column : int
+            列番号
+
+        Returns
+        -------
+        CellSpec
+            セルの指定
+        """
+        spec = self.cells.get((row, column))
+        if spec is None:
+            spec = CellSpec()
+            self.cells[(row, column)] = spec
+        return spec
+
+    def merge_cells(self, start_row, start_column, end_row, end_column):
+        """
+        セルを結合する関数（openpyxlのmerge_cellsと同じように罫線を付け直す）
+        1セルだけの結合は何もしない
+        既存の結合セルに含まれる範囲は登録せず、既存の結合セルを含む（重なる）範囲はまとめて1つの結合セルにする
+
+        Parameters
+        ----------
+        start_row, start_column : int
+            始点のセルの行番号、列番号
+        end_row, end_column : int
+            終点のセルの行番号、列番号
+        """
+        if end_row < start_row or end_column < start_column:
+            raise ValueError("Invalid merge range: ({}, {}) - ({}, {})".format(
+                start_row, start_column, end_row, end_column
+            ))
+        if start_row == end_row and start_column == end_column:
+            # openpyxlでも罫線は変わらない
+            return
+        # 始点のセルに終点のセルの右・下の罫線を足す
+        start_spec = self.cell(start_row, start_column)
+        end_spec = self.cells.get((end_row, end_column))
+        if end_spec is not None:
+            self._add_border(start_spec, "end", end_spec.border or DEFAULT_BORDER)  # 右・下の辺だけ足す
+        # 始点以外は値もスタイルも無い結合セルにする
+        for row in range(start_row, end_row + 1):
+            for column in range(start_column, end_column + 1):
+                if (row, column) != (start_row, start_column):
+                    self.cells[(row, column)] = CellSpec()
+        # 端の結合セルに始点のセルの罫線を付ける
+        start_border = start_spec.border or DEFAULT_BORDER
+        edges = {
+            "top": [(start_row, column) for column in range(start_column, end_column + 1)],
+            "left": [(row, start_column) for row in range(start_row, end_row + 1)],
+            "right": [(row, end_column) for row in range(start_row, end_row + 1)],
+            "bottom": [(end_row, column) for column in range(start_column, end_column + 1)],
+        }
+        for name in BORDER_SIDE_NAMES:
+            side = getattr(start_border, name)
+            if side and side.style is None:
+                continue
+            for row, column in edges[name]:
+                self._add_border(self.cells[(row, column)], name, side)
+        self._add_merged_range((start_column, start_row, end_column, end_row))
+
+    def shift_rows(self, num_rows):
+        """
+        セル・結合セル・行の高さを下へずらしたレイアウトを返す関数（列幅は共有する）
+
+        Parameters
+        ----------
+        num_rows : int
+            ずらす行数
+
+        Returns
+        -------
+        SheetLayout
+            ずらしたレイアウト
+        """
+        layout = SheetLayout(
+            title=self.title, column_dimensions=self.column_dimensions, border_sum_dict=self.border_sum_dict
+        )
+        layout.cells = {(row + num_rows, column): spec for (row, column), spec in self.cells.items()}
+        for min_col, min_row, max_col, max_row in self.merged_ranges:
+            layout._add_merged_range((min_col, min_row + num_rows, max_col, max_row + num_rows))
+        for row, dim in self.row_dimensions.items():
+            layout.row_dimensions[row + num_rows] = dim
+        return layout
+
+    def paste(self, layout, num_rows=0, num_columns=0):
+        """
+        別のレイアウトのセル（コピー）と結合セルを、行・列をずらして加える関数
+
+        Parameters
+        ----------
+        layout : SheetLayout
+            加えるレイアウト
+        num_rows : int, optional
+            下へずらす行数, by default 0
+        num_columns : int, optional
+            右へずらす列数, by default 0
+        """
+        for (row, column), spec in layout.cells.items():
+            self.cells[(row + num_rows, column + num_columns)] = spec.copy()
+        for min_col, min_row, max_col, max_row in layout.merged_ranges:
+            self._add_merged_range((min_col + num_columns, min_row + num_rows, max_col + num_columns, max_row + num_rows))
+
+    def update(self, layout):
+        """
+        別のレイアウト（パートごとのレイアウト等、行が重ならないもの）のセルと結合セルを加える関数
+
+        Parameters
+        ----------
+        layout : SheetLayout
+            加えるレイアウト
+        """
+        self.cells.update(layout.cells)
+        for bounds in layout.merged_ranges:
+            self._add_merged_range(bounds)
+        if layout.column_dimensions is not self.column_dimensions:
+            self.column_dimensions.update(layout.column_dimensions)
+            self.column_dimensions.geometry.clear()
+        if layout.row_dimensions is not self.row_dimensions:
+            self.row_dimensions.update(layout.row_dimensions)
+
+    def iter_rows(self):
+        """
+        値かスタイルのあるセルを行ごとに返すジェネレータ
+
+        Yields
+        ------
+        int
+            行番号
+        list of tuple
+            列番号とCellSpecの組のリスト（列の順）
+        """
+        rows = {}
+        for (row, column), spec in self.cells.items():
+            if spec.value is None and not spec.has_style():
+                continue
+            rows.setdefault(row, []).append((column, spec))
+        for row in sorted(rows.keys()):
+            yield row, sorted(rows[row], key=lambda x: x[0])
+
+    def pop_rows(self, row):
+        """
+        指定した行より上のセル・結合セル・行の高さを、レイアウトから取り除いて返す関数
+        （書き出し終えた行をレイアウトから捨てるためのもの）
+
+        Parameters
+        ----------
+        row : int
+            行番号（この行は含まない）
+
+        Returns
+        -------
+        list of tuple
+            値かスタイルのあるセルの(行番号, 列番号とCellSpecの組のリスト)のリスト（iter_rowsと同じ形）
+        list of tuple of int
+            最後の行が指定した行より上の結合セルの(最小列, 最小行, 最大列, 最大行)のリスト
+        dict of {int: LayoutDimension}
+            行番号ごとの行の高さ
+        """
+        rows = {}
+        for key in [key for key in self.cells.keys() if key[0] < row]:
+            spec = self.cells.pop(key)
+            if spec.value is None and not spec.has_style():
+                continue
+            rows.setdefault(key[0], []).append((key[1], spec))
+        merged_ranges = [bounds for bounds in self.merged_ranges if bounds[3] < row]
+        for bounds in merged_ranges:
+            self._remove_merged_range(bounds)
+        # 指定した行をまたぐ結合セルは残すので、空になった行だけ消す
+        for _row in [_row for _row, intervals in self.merged_rows.items() if _row < row and not intervals]:
+            del self.merged_rows[_row]
+        row_dimensions = {
+            _row: self.row_dimensions.pop(_row) for _row in list(self.row_dimensions.keys()) if _row < row
+        }
+        return (
+            [(_row, sorted(rows[_row], key=lambda x: x[0])) for _row in sorted(rows.keys())],
+            merged_ranges,
+            row_dimensions,
+        )
+
+    def _add_merged_range(self, bounds):
+        # 結合セルの一覧に加える（重なる結合セルが無いようにする）
+        while True:
+            overlaps = self._get_overlapping_ranges(bounds)
+            if len(overlaps) == 0:
+                break
+            min_col, min_row, max_col, max_row = bounds
+            for _min_col, _min_row, _max_col, _max_row in overlaps:
+                if (
+                    _min_col <= min_col and max_col <= _max_col
+                    and _min_row <= min_row and max_row <= _max_row
+                ):
+                    # 既存の結合セルに含まれる
+                    return
+            for overlap in overlaps:
+                if not (
+                    min_col <= overlap[0] and overlap[2] <= max_col
+                    and min_row <= overlap[1] and overlap[3] <= max_row
+                ):
+                    print("[WARN] Overlapping merged cells are combined: {} {}".format(overlap, bounds))
+                self._remove_merged_range(overlap)
+            # 重なる結合セルを含む範囲にして、さらに重なるものが無いか調べる
+            bounds = (
+                min([min_col] + [overlap[0] for overlap in overlaps]),
+                min([min_row] + [overlap[1] for overlap in overlaps]),
+                max([max_col] + [overlap[2] for overlap in overlaps]),
+                max([max_row] + [overlap[3] for overlap in overlaps]),
+            )
+        self.merged_ranges[bounds] = True
+        for row in range(bounds[1], bounds[3] + 1):
+            insort(self.merged_rows.setdefault(row, []), (bounds[0], bounds[2], bounds))
+
+    def _get_overlapping_ranges(self, bounds):
+        # 範囲と重なる結合セルのリスト（各行の結合セルは重ならず列の順に並んでいる）
+        min_col, min_row, max_col, max_row = bounds
+        overlaps = {}
+        for row in range(min_row, max_row + 1):
+            intervals = self.merged_rows.get(row)
+            if not intervals:
+                continue
+            idx = bisect_right(intervals, (max_col, float("inf"))) - 1
+            while idx >= 0 and intervals[idx][1] >= min_col:
+                overlaps[intervals[idx][2]] = True
+                idx -= 1
+        return list(overlaps.keys())
+
+    def _remove_merged_range(self, bounds):
+        del self.merged_ranges[bounds]
+        for row in range(bounds[1], bounds[3] + 1):
+            self.merged_rows[row].remove((bounds[0], bounds[2], bounds))
+
+    def _add_border(self, spec, name, other):
+        # 罫線の足し算(Border +)は組み合わせごとに一度だけ行う
+        # name: 足す辺("top"等、otherはSide)、または"end"(otherは終点のセルのBorder)
+        border = spec.border or DEFAULT_BORDER
+        key = (id(border), name, id(other))
+        border_sum = self.border_sum_dict.get(key)
+        if border_sum is None:
+            if name == "end":
+                new_border = border + Border(right=other.right, bottom=other.bottom)
+            else:
+                new_border = border + Border(**{name: other})
+            border_sum = (new_border, border, other)
+            self.border_sum_dict[key] = border_sum
+        spec.border = border_sum[0]
+
+
+class LayoutStyleIndex(object):
+    """
+    CellSpecのスタイルをopenpyxlのWorkbookのスタイル一覧に登録し、セルのスタイル番号(StyleArray)にするクラス
+    （スタイルのハッシュの計算はスタイルのオブジェクトごとに一度だけ行う）
+    """
+
+    def __init__(self, workbook):
+        """
+        Parameters
+        ----------
+        workbook : openpyxl.Workbook
+            スタイルの一覧を持つワークブック
+        """
+        self.wb = workbook
+        # idが使い回されないよう、値と一緒にキーのスタイルも持っておく
+        self.style_id_dict = {}  # (スタイルの種類, スタイルのid)ごとの(ワークブックでの番号, スタイル)
+        self.style_array_dict = {}  # スタイルのidの組ごとの(StyleArray, フォント, 配置, 罫線, 背景色)
+
+    def get_style_array(self, spec):
+        """
+        セルのスタイル番号を返す関数
+
+        Parameters
+        ----------
+        spec : CellSpec
+            セルの指定
+
+        Returns
+        -------
+        StyleArray or None
+            スタイル番号（スタイルが無い場合はNone）
+        """
+        if not spec.has_style():
+            return None
+        array_key = (id(spec.font), id(spec.align), id(spec.border), id(spec.fill))
+        cached = self.style_array_dict.get(array_key)
+        if cached is not None:
+            return cached[0]
+        style_array = StyleArray()
+        for attr, collection, key in STYLE_KEYS:
+            style = getattr(spec, attr)
+            if style is None:
+                continue
+            style_key = (key, id(style))
+            cached = self.style_id_dict.get(style_key)
+            if cached is None:
+                cached = (getattr(self.wb, collection).add(style), style)
+                self.style_id_dict[style_key] = cached
+            setattr(style_array, key, cached[0])
+        self.style_array_dict[array_key] = (style_array, spec.font, spec.align, spec.border, spec.fill)
+        return style_array
+
+
+def render_worksheet(layout, ws, style_index=None):
+    """
+    レイアウトをopenpyxlのWorksheetに書き込む関数
+
+    Parameters
+    ----------
+    layout : SheetLayout
+        レイアウト
+    ws : openpyxl.worksheet.worksheet.Worksheet
+        書き込み先のシート（空のもの）
+    style_index : LayoutStyleIndex or None, optional
+        スタイル番号の変換, by default None（wsのワークブックで作る）
+    """
+    if style_index is None:
+        style_index = LayoutStyleIndex(ws.parent)
+    ws.title = layout.title
+    # 罫線はレイアウトで付け直してあり、結合セルも重ならないので、範囲をまとめて登録する
+    ws.merged_cells.ranges.update(
+        CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row)
+        for min_col, min_row, max_col, max_row in layout.merged_ranges
+    )
+    merged_cells = set()
+    for min_col, min_row, max_col, max_row in layout.merged_ranges:
+        for row in range(min_row, max_row + 1):
+            for column in range(min_col, max_col + 1):
+                if (row, column) != (min_row, min_col):
+                    merged_cells.add((row, column))
+    for row, specs in layout.iter_rows():
+        for column, spec in specs:
+            if (row, column) in merged_cells:
+                cell = MergedCell(ws, row=row, column=column)
+                ws._cells[(row, column)] = cell
+            else:
+                cell = ws.cell(row=row, column=column, value=spec.value)
+            style_array = style_index.get_style_array(spec)
+            if style_array is not None:
+                cell._style = StyleArray(style_array)
+    for column_str, dim in layout.column_dimensions.items():
+        ws.column_dimensions[column_str].width = dim.width
+    for row, dim in layout.row_dimensions.items():
+        if dim.height is not None:
+            ws.row_dimensions[row].height = dim.height
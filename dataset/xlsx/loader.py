@@ -1,33 +1,72 @@
 # coding: utf-8
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from os import cpu_count
 from os.path import isfile
 from openpyxl import load_workbook
 from more_itertools import chunked
 from colorsys import rgb_to_hsv
 
 from .base import XlsxIOBase
+from .raw_reader import RawXlsxWorkbook
+from .sheet_analysis import SheetAnalysis
+from .note_name import convert_to_german_note, tokenize_note
+from .region import detect_score_region
 from ._static_data import (
-    DICT_FOR_NAME_CONVERT,
+    DICT_FOR_BORDER_CLASS,
+    BORDER_NONE,
+    BORDER_BEAT,
+    BORDER_MEASURE,
+    MAX_BEAT_SCAN_CELLS,
+    BEAT_WIDTH_TOLERANCE,
+    NON_BORDER_COLORS,
+    KNOWN_NOTE_COLORS,
+    SCAN_MEASURE_END,
+    SCAN_LIMIT_BEAT,
+    SCAN_NO_BORDER,
 )
 
 class XlsxLoader(XlsxIOBase):
-    def __init__(self, filename, max_beat_num=8, force_same_width=False):
+    def __init__(
+        self, filename, max_beat_num=8, force_same_width=False, backend="openpyxl",
+        max_cached_sheets=4,
+    ):
         """        
         Parameters
         ----------
-        filename : str
-            .xlsxのファイル名
+        filename : str or bytes or file-like object
+            .xlsxのファイル名、もしくは.xlsxのバイト列・読み込み元のバッファ(BytesIO等)
+        backend : str, optional
+            読み込み方法, by default "openpyxl"
+            "openpyxl": load_workbookでワークブック全体を読み込む
+            "raw": zip内のXMLから必要なシートの必要な行だけを読み込む（高速・省メモリ）
+        max_cached_sheets : int, optional
+            解析結果を保持するシートの数（古いものから捨てる）, by default 4
         
         Raises
         ------
         OSError
             ファイルオープンエラー
         """
-        if isfile(filename):
-            self.wb = load_workbook(filename)
+        if hasattr(filename, "read"):
+            filename = filename.read()
+        if isinstance(filename, (bytes, bytearray)):
+            self.source = bytes(filename)  # 並列読み込みのワーカーで開き直すためのもの
+            filename = BytesIO(filename)
+        elif isfile(filename):
+            self.source = filename
         else:
             raise OSError
+        self.backend = backend
+        if backend == "raw":
+            self.wb = RawXlsxWorkbook(filename)
+        else:
+            self.wb = load_workbook(filename)
         self.max_beat_num = max_beat_num
         self.force_same_width = force_same_width
+        self.style_info_dict = {}  # スタイル番号(fillId, borderId)ごとの(色, 左罫線の種類, 右罫線の種類)
+        self.max_cached_sheets = max_cached_sheets
+        self.sheet_analysis_dict = {}  # シート名ごとの解析結果（使った順）
 
     def get_sound_list(self, sheet_name, start_col_char, end_col_char, row_list, get_rate=True):
         """
@@ -63,63 +102,36 @@ class XlsxLoader(XlsxIOBase):
         if sheet_name not in self.get_sheetnames():
             print("[ERROR] Invalid sheet name: {}".format(sheet_name))
             return None
-        sheet = self.wb[sheet_name]
+        sheet_analysis = self._get_sheet_analysis(sheet_name, row_list)
         start_col = self._convert_column_str(start_col_char.upper())
         end_col = self._convert_column_str(end_col_char.upper())
-        merged_cells = self._get_merged_cells(sheet)
-        cell_width_dict = self._get_cell_widths(sheet, start_col, end_col)
+        last_col = end_col + MAX_BEAT_SCAN_CELLS  # 小節の最後の結合セルは終了列を越えることがある
 
         all_notes = []
         all_rates = []
         measure_num = 1
         for row_num in row_list:
+            values, colors, left_borders, right_borders, is_merged, widths = self._get_row_vector(
+                sheet_analysis, row_num, start_col, last_col
+            )
             beat_start_col = start_col
             while beat_start_col < end_col + 1:
                 # [[ges_minus1, -], [-, -], [-, -], [r, r]] のような小節内の音リストを得る
-                if (row_num, beat_start_col) in merged_cells:
+                if is_merged[beat_start_col]:
                     print("skip(1)", row_num, beat_start_col)
                     beat_start_col += 1
                     continue
-                val, color, left_border_style, right_border_style = self._get_cell_info(sheet, row_num, beat_start_col)
-                note = self._get_note(val, color)
+                note = self._get_note(values[beat_start_col], colors[beat_start_col])
                 if note is None:
                     beat_start_col += 1
                     continue
-                notes = [[note]]
-                cells = [[(row_num, beat_start_col)]]
-                beat_num = 0
-                bef_right_border_style = None
                 bef_beat_start_col = beat_start_col
-                for col_num in range(beat_start_col + 1, beat_start_col + 64):
-                    val, color, left_border_style, right_border_style = self._get_cell_info(sheet, row_num, col_num)
-                    if (row_num, col_num) in merged_cells:
-                        bef_right_border_style = right_border_style
-                        cells[beat_num].append((row_num, col_num))
-                        continue
-                    if (
-                        (bef_right_border_style == "medium" or bef_right_border_style == "thick") or \
-                        (left_border_style == "medium" or left_border_style == "thick")
-                    ) or (col_num > end_col):
-                        beat_start_col = col_num
-                        break
-                    elif (
-                        (bef_right_border_style == "thin" or bef_right_border_style == "hair") or \
-                        (left_border_style == "thin" or left_border_style == "hair")
-                    ):
-                        beat_num += 1
-                        if beat_num >= self.max_beat_num:
-                            beat_start_col = col_num
-                            print("LIMIT BEAT", col_num)
-                            break
-                        else:
-                            notes.append([])
-                            cells.append([])
-                    note = self._get_note(val, color)
-                    if note is not None:
-                        notes[beat_num].append(note)
-                        cells[beat_num].append((row_num, col_num))
-                    bef_right_border_style = right_border_style
-                else:
+                notes, cells, beat_start_col, end_state = self._scan_measure(
+                    note, beat_start_col, end_col, values, colors, left_borders, right_borders, is_merged
+                )
+                if end_state == SCAN_LIMIT_BEAT:
+                    print("LIMIT BEAT", beat_start_col)
+                elif end_state == SCAN_NO_BORDER:
                     print("ERROR: No border in next 64 cells")
 
                 # widthからbeatの割合を算出
@@ -129,10 +141,10 @@ class XlsxLoader(XlsxIOBase):
                 for cells_in_beat in cells:
                     widths_in_beat = []
                     sum_widths_in_beat = 0
-                    for _, col_num in cells_in_beat:
-                        width = cell_width_dict[col_num]
+                    for col_num in cells_in_beat:
+                        width = widths[col_num]
                         sum_widths_in_beat += width
-                        if (row_num, col_num) not in merged_cells:
+                        if not is_merged[col_num] or len(widths_in_beat) == 0:
                             widths_in_beat.append(width)
                         else:
                             widths_in_beat[-1] += width
@@ -160,51 +172,346 @@ class XlsxLoader(XlsxIOBase):
         else:
             return all_notes, None
 
-    def _convert_to_german_note(self, value):
+    def validate(self, sheet_name, start_col_char, end_col_char, row_list, rhythm_dict=None):
         """
-        セル内の文字をドイツ音名に変換する関数
+        get_sound_listと同じ読み方で楽譜欄を調べ、問題のあるセルを返す関数（midiは作らない）
+        読めない音名、拍子と合わない拍数、判定できない色、小節の区切りの罫線の不備を調べる
         
         Parameters
         ----------
-        value : str
-            音の文字列
+        sheet_name : str
+            シート名
+        start_col_char : char
+            列名（英語）
+        end_col_char : char
+            列名（英語）
+        row_list : list of int
+            行リスト
+        rhythm_dict : dict of {int: (int, int)}, optional
+            キーを小節数、値に(拍数, 音価)を取る辞書, by default None（拍数は調べない）
         
         Returns
         -------
-        list of str
-            ドイツ音名の音リスト
+        list of tuple of (str, str)
+            (セルの座標値, 問題の内容)のリスト
+        """
+        if sheet_name not in self.get_sheetnames():
+            return [("", "Invalid sheet name: {}".format(sheet_name))]
+        sheet_analysis = self._get_sheet_analysis(sheet_name, row_list)
+        start_col = self._convert_column_str(start_col_char.upper())
+        end_col = self._convert_column_str(end_col_char.upper())
+        last_col = end_col + MAX_BEAT_SCAN_CELLS
+
+        issues = []
+        measure_num = 1
+        numerator, denominator = None, None
+        for row_num in row_list:
+            values, colors, left_borders, right_borders, is_merged, widths = self._get_row_vector(
+                sheet_analysis, row_num, start_col, last_col
+            )
+            for col_num in range(start_col, end_col + 1):
+                if is_merged[col_num]:
+                    continue
+                issue = self._validate_cell(values[col_num], colors[col_num])
+                if issue is not None:
+                    issues.append((self._convert_cell_num(row_num, col_num), issue))
+
+            beat_start_col = start_col
+            while beat_start_col < end_col + 1:
+                if is_merged[beat_start_col]:
+                    beat_start_col += 1
+                    continue
+                note = self._get_note(values[beat_start_col], colors[beat_start_col])
+                if note is None:
+                    beat_start_col += 1
+                    continue
+                cell_str = self._convert_cell_num(row_num, beat_start_col)
+                _, cells, beat_start_col, end_state = self._scan_measure(
+                    note, beat_start_col, end_col, values, colors, left_borders, right_borders, is_merged
+                )
+                if end_state == SCAN_LIMIT_BEAT:
+                    issues.append((
+                        cell_str,
+                        "Measure {}: more than {} beats".format(measure_num, self.max_beat_num)
+                    ))
+                elif end_state == SCAN_NO_BORDER:
+                    issues.append((
+                        cell_str,
+                        "Measure {}: no measure border in next {} cells".format(
+                            measure_num, MAX_BEAT_SCAN_CELLS
+                        )
+                    ))
+                if rhythm_dict is not None and measure_num in rhythm_dict:
+                    numerator, denominator = rhythm_dict[measure_num]
+                if numerator is not None:
+                    # 結合して罫線の無い拍(2分音符等)もあるので、各拍の横幅が
+                    # 小節の横幅を拍子の拍数で割った幅の整数倍になっているかを調べる
+                    widths_in_measure = [sum(widths[col_num] for col_num in c) for c in cells]
+                    beat_width = sum(widths_in_measure) / numerator
+                    num_beats = [width / beat_width for width in widths_in_measure]
+                    if any(round(n) == 0 or abs(n - round(n)) > BEAT_WIDTH_TOLERANCE for n in num_beats):
+                        issues.append((
+                            cell_str,
+                            "Measure {}: {} beats do not fit {}/{}".format(
+                                measure_num, len(cells), numerator, denominator
+                            )
+                        ))
+                measure_num += 1
+        return issues
+
+    def detect_score_region(self, sheet_name):
+        """
+        シート全体のセルの情報から楽譜欄を検出する関数
+        段のマーカー(XlsxWriterの出力するa, b, c, ...)、色付きのセル、小節の罫線、楽器・奏者の欄を使う
+        
+        Parameters
+        ----------
+        sheet_name : str
+            シート名
+        
+        Returns
+        -------
+        dict or None
+            create_midiのdata_dictと同じ形式の辞書（"rhythm"以外）に、"player_list"を加えたもの
+            楽譜欄が見つからない場合はNone
         """
-        ret = []
-        now_idx = 0
-        eng_note = ""
-        while now_idx < len(value):
-            v = value[now_idx]
-            add_note = False
-            for candidates, (note_name, register_note) in DICT_FOR_NAME_CONVERT.items():
-                for c in candidates:
-                    if type(c) is str:  # 比較候補が1文字の場合
-                        if v == c:
-                            add_note = True
-                            break
-                    elif type(c) is list or type(c) is tuple:  # 比較候補が2文字以上の場合
-                        if self._check_same_strings_or_not(value, now_idx, c) is True:
-                            add_note = True
-                            break
-                if add_note:
-                    if register_note is True and len(eng_note) != 0:
-                        ret.append(eng_note)
-                        eng_note = ""
-                    if (eng_note == "E" or eng_note == "A") and note_name == "es":
-                        eng_note += "s"
-                    elif eng_note == "H" and note_name == "es":
-                        eng_note = "B"
-                    else:
-                        eng_note += note_name
+        if sheet_name not in self.get_sheetnames():
+            print("[ERROR] Invalid sheet name: {}".format(sheet_name))
+            return None
+        sheet = self._get_sheet(sheet_name, None)
+        cells = sheet.cells if self.backend == "raw" else sheet._cells
+        cell_infos = {}
+        for (row_num, col_num), cell in cells.items():
+            style_id = self._get_style_id(cell)
+            style_info = self.style_info_dict.get(style_id)
+            if style_info is None:
+                style_info = self._get_style_info(cell)
+                self.style_info_dict[style_id] = style_info
+            cell_infos[(row_num, col_num)] = (cell.value,) + style_info
+        region = detect_score_region(
+            cell_infos, [merged_cell.bounds for merged_cell in sheet.merged_cells.ranges]
+        )
+        if region is None:
+            return None
+        return {
+            "sheet_name": sheet_name,
+            "start_column_char": self._convert_column_num(region["start_column"]),
+            "end_column_char": self._convert_column_num(region["end_column"]),
+            "row_lists": region["row_lists"],
+            "program_list": region["program_list"],
+            "player_list": region["player_list"],
+        }
+
+    def get_sheet_hashes(self):
+        """
+        シートごとの内容のハッシュを返す関数（シートを解析せずに変更の有無を調べるためのもの）
+        
+        Returns
+        -------
+        dict of {str: str}
+            シート名をキー、ハッシュ値を値とする辞書
+        """
+        if self.backend == "raw":
+            return self.wb.get_sheet_hashes()
+        source = BytesIO(self.source) if isinstance(self.source, bytes) else self.source
+        return RawXlsxWorkbook(source).get_sheet_hashes()
+
+    def get_sound_lists(self, jobs, max_workers=1):
+        """
+        複数のシート・パートの共通音リスト, 共通音レートリストをまとめて返す関数
+        並列に読み込む場合は、ワーカープロセスごとにワークブックをrawで1回だけ開き直す
+        （ワーカーごとにload_workbookし直すと、大きなワークブックでは1曲を読むより遅いため）
+        
+        Parameters
+        ----------
+        jobs : list of tuple of (str, str, str, list of int)
+            (シート名, 開始列名, 終了列名, 行リスト)のリスト
+        max_workers : int or None, optional
+            プロセス数, by default 1（並列化せずに読み込む）
+            Noneの場合はCPU数
+        
+        Returns
+        -------
+        list of tuple of (list, list)
+            jobsの順の(共通音リスト, 共通音レートリスト)のリスト
+        """
+        if max_workers is None:
+            max_workers = cpu_count() or 1
+        max_workers = min(max_workers, len(jobs))
+        if max_workers <= 1:
+            return [self.get_sound_list(*job) for job in jobs]
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_loader,
+            initargs=(self.source, self.max_beat_num, self.force_same_width),
+        ) as executor:
+            # 同じシートのパートが同じワーカーに渡りやすいようにシート順にまとめて渡す
+            order = sorted(range(len(jobs)), key=lambda idx: jobs[idx][0])
+            sound_lists = [None] * len(jobs)
+            results = executor.map(
+                _get_sound_list_in_worker, [jobs[idx] for idx in order],
+                chunksize=max(len(jobs) // (max_workers * 4), 1),
+            )
+            for idx, result in zip(order, results):
+                sound_lists[idx] = result
+        return sound_lists
+
+    def _scan_measure(
+        self, note, beat_start_col, end_col, values, colors, left_borders, right_borders, is_merged
+    ):
+        """
+        小節の先頭のセルから次の小節の区切りまでを読み、拍ごとの音リストを返す関数
+        
+        Parameters
+        ----------
+        note : list of str
+            小節の先頭のセルの音リスト
+        beat_start_col : int
+            小節の先頭の列番号
+        end_col : int
+            終了列番号
+        values, colors, left_borders, right_borders, is_merged : list
+            _get_row_vectorで得た1行分のセルの情報
+        
+        Returns
+        -------
+        list of list of list of str
+            拍ごとの音リスト
+        list of list of int
+            拍ごとのセルの列番号
+        int
+            次の小節の先頭の列番号
+        int
+            小節の終わり方(SCAN_MEASURE_END, SCAN_LIMIT_BEAT, SCAN_NO_BORDER)
+        """
+        notes = [[note]]
+        cells = [[beat_start_col]]
+        beat_num = 0
+        bef_right_border = BORDER_NONE
+        end_state = SCAN_MEASURE_END
+        for col_num in range(beat_start_col + 1, beat_start_col + MAX_BEAT_SCAN_CELLS):
+            if is_merged[col_num]:
+                bef_right_border = right_borders[col_num]
+                cells[beat_num].append(col_num)
+                continue
+            border = max(bef_right_border, left_borders[col_num])
+            if border == BORDER_MEASURE or col_num > end_col:
+                next_col = col_num
+                break
+            elif border == BORDER_BEAT:
+                beat_num += 1
+                if beat_num >= self.max_beat_num:
+                    next_col = col_num
+                    end_state = SCAN_LIMIT_BEAT
                     break
-            now_idx += 1
-        if len(eng_note) != 0:
-            ret.append(eng_note)
-        return ret
+                else:
+                    notes.append([])
+                    cells.append([])
+            note = self._get_note(values[col_num], colors[col_num])
+            if note is not None:
+                notes[beat_num].append(note)
+                cells[beat_num].append(col_num)
+            bef_right_border = right_borders[col_num]
+        else:
+            next_col = beat_start_col + MAX_BEAT_SCAN_CELLS
+            end_state = SCAN_NO_BORDER
+
+        # 罫線の後に音のセルが無かった拍は除く
+        notes = [n for n, c in zip(notes, cells) if len(c) > 0]
+        cells = [c for c in cells if len(c) > 0]
+        return notes, cells, next_col, end_state
+
+    def _get_row_vector(self, sheet_analysis, row_num, start_col, last_col):
+        """
+        1行分のセルの情報を列番号をインデックスとする配列にまとめて返す関数（開始列より前はダミー）
+        
+        Parameters
+        ----------
+        sheet_analysis : SheetAnalysis
+            シートの解析結果
+        row_num : int
+            行番号
+        start_col : int
+            開始列番号
+        last_col : int
+            最後の列番号
+        
+        Returns
+        -------
+        list of str
+            セルの値
+        list of str
+            セルの色
+        list of int
+            左罫線の種類(BORDER_NONE, BORDER_BEAT, BORDER_MEASURE)
+        list of int
+            右罫線の種類
+        list of bool
+            結合セル（結合の先頭以外）かどうか
+        list of float
+            セル幅
+        """
+        num_cols = last_col + 1
+        values = [None] * num_cols
+        colors = [None] * num_cols
+        left_borders = [BORDER_NONE] * num_cols
+        right_borders = [BORDER_NONE] * num_cols
+        merged_cells = sheet_analysis.merged_cells
+        is_merged = [(row_num, col_num) in merged_cells for col_num in range(num_cols)]
+        for col_num in range(start_col, num_cols):
+            value, color, left_border, right_border = self._get_cell_info(sheet_analysis, row_num, col_num)
+            values[col_num] = value
+            colors[col_num] = color
+            left_borders[col_num] = left_border
+            right_borders[col_num] = right_border
+        widths = sheet_analysis.column_geometry.get_width_list(last_col)
+        return values, colors, left_borders, right_borders, is_merged, widths
+
+    def _get_sheet_analysis(self, sheet_name, row_list):
+        """
+        シートの解析結果を返す関数（解析済みのシートは使い回す）
+        
+        Parameters
+        ----------
+        sheet_name : str
+            シート名
+        row_list : list of int
+            行リスト
+        
+        Returns
+        -------
+        SheetAnalysis
+            シートの解析結果
+        """
+        sheet_analysis = self.sheet_analysis_dict.pop(sheet_name, None)
+        if sheet_analysis is None:
+            sheet_analysis = SheetAnalysis(self._get_sheet(sheet_name, row_list))
+            while len(self.sheet_analysis_dict) >= max(self.max_cached_sheets, 1):
+                del self.sheet_analysis_dict[next(iter(self.sheet_analysis_dict))]
+        elif self.backend == "raw":
+            sheet_analysis.sheet.add_rows(row_list)
+        self.sheet_analysis_dict[sheet_name] = sheet_analysis
+        return sheet_analysis
+
+    def _get_sheet(self, sheet_name, row_list):
+        """
+        シートを返す関数（rawの場合は指定した行だけを読み込む）
+        
+        Parameters
+        ----------
+        sheet_name : str
+            シート名
+        row_list : list of int
+            行リスト
+        
+        Returns
+        -------
+        openpyxl.WorkSheet or RawXlsxSheet
+            シート
+        """
+        if self.backend == "raw":
+            return self.wb.get_sheet(sheet_name, row_list)
+        return self.wb[sheet_name]
 
     def _get_note(self, value, color):
         """
@@ -228,7 +535,7 @@ class XlsxLoader(XlsxIOBase):
             return ["r"]
         if value is None or value.strip() == "":
             return ["-"]
-        ret = self._convert_to_german_note(value.strip())
+        ret = list(convert_to_german_note(value.strip()))
         if len(ret) == 0:
             return None
         if color == "cyan" or color == "blue":
@@ -250,14 +557,42 @@ class XlsxLoader(XlsxIOBase):
                 ret[i] += "_plus2"
         return ret
 
-    def _get_cell_info(self, sheet, row_num, col_num):
+    def _validate_cell(self, value, color):
+        """
+        楽譜欄のセルの色と音名を調べる関数
+        
+        Parameters
+        ----------
+        value : str
+            セルの内容
+        color : str or None
+            背景色
+        
+        Returns
+        -------
+        str or None
+            問題の内容（問題が無ければNone）
+        """
+        if color not in KNOWN_NOTE_COLORS:
+            return "Unknown color: {}".format(color)
+        if color == "white" or color == "gray" or value is None:
+            return None
+        value = str(value).strip()
+        if value == "":
+            return None
+        notes, unknown_chars = tokenize_note(value)
+        if len(notes) == 0 or len(unknown_chars) > 0:
+            return "Unparseable note: {}".format(value)
+        return None
+
+    def _get_cell_info(self, sheet_analysis, row_num, col_num):
         """
         セルの情報を返す関数
         
         Parameters
         ----------
-        sheet : openpyxl.WorkSheet
-            エクセルのワークシート(openpyxl形式)
+        sheet_analysis : SheetAnalysis
+            シートの解析結果
         row_num : int
             行番号
         col_num : int
@@ -269,18 +604,63 @@ class XlsxLoader(XlsxIOBase):
             セルの値
         str or None
             セルの色
+        int
+            左罫線の種類(BORDER_NONE, BORDER_BEAT, BORDER_MEASURE)
+        int
+            右罫線の種類
+        """
+        cell_info = sheet_analysis.cell_infos.get((row_num, col_num))
+        if cell_info is not None:
+            return cell_info
+        cell = sheet_analysis.sheet.cell(row=row_num, column=col_num)
+        style_id = self._get_style_id(cell)
+        style_info = self.style_info_dict.get(style_id)
+        if style_info is None:
+            style_info = self._get_style_info(cell)
+            self.style_info_dict[style_id] = style_info
+        cell_info = (cell.value,) + style_info
+        sheet_analysis.cell_infos[(row_num, col_num)] = cell_info
+        return cell_info
+
+    def _get_style_id(self, cell):
+        """
+        セルの背景色・罫線のスタイル番号を返す関数
+        
+        Parameters
+        ----------
+        cell : openpyxl.cell.Cell or RawCell
+            セル
+        
+        Returns
+        -------
+        tuple of int
+            (fillId, borderId)
+        """
+        if self.backend == "raw":
+            return cell.fill_id, cell.border_id
+        style_array = cell._style
+        if style_array is None:  # スタイル未設定の結合セル
+            return 0, 0
+        return style_array.fillId, style_array.borderId
+
+    def _get_style_info(self, cell):
+        """
+        セルの背景色と左右の罫線の種類を判定する関数
+        
+        Parameters
+        ----------
+        cell : openpyxl.cell.Cell or RawCell
+            セル
+        
+        Returns
+        -------
         str
-            左罫線のスタイル
-            Value must be one of {‘double’, ‘dashed’, ‘thin’, ‘medium’, ‘mediumDashDot’,
-            ‘dashDot’, ‘thick’, ‘mediumDashed’, ‘hair’, ‘dotted’, ‘slantDashDot’,
-            ‘mediumDashDotDot’, ‘dashDotDot’}
-        str
-            右罫線のスタイル
-            Value must be one of {‘double’, ‘dashed’, ‘thin’, ‘medium’, ‘mediumDashDot’,
-            ‘dashDot’, ‘thick’, ‘mediumDashed’, ‘hair’, ‘dotted’, ‘slantDashDot’,
-            ‘mediumDashDotDot’, ‘dashDotDot’}
+            セルの色
+        int
+            左罫線の種類(BORDER_NONE, BORDER_BEAT, BORDER_MEASURE)
+        int
+            右罫線の種類
         """
-        cell = sheet.cell(row=row_num, column=col_num)
         rgb = [int(c1 + c2, 16) for c1, c2 in chunked(cell.fill.fgColor.rgb[2:], 2)]
         hsv = rgb_to_hsv(*rgb)
         if hsv[1] > .01:
@@ -289,53 +669,42 @@ class XlsxLoader(XlsxIOBase):
             color = "gray"
         else:
             color = "white"
-        return cell.value, color, cell.border.left.style, cell.border.right.style
+        return (
+            color,
+            DICT_FOR_BORDER_CLASS.get(self._get_border_style(cell.border.left), BORDER_NONE),
+            DICT_FOR_BORDER_CLASS.get(self._get_border_style(cell.border.right), BORDER_NONE),
+        )
 
-    def _get_merged_cells(self, sheet):
+    def _get_border_style(self, side):
         """
-        結合セルの座標リストを返す関数
+        罫線のスタイルを返す関数（セルの区切り用の色の罫線は罫線なしとみなす）
         
         Parameters
         ----------
-        sheet : openpyxl.WorkSheet
-            エクセルのワークシート(openpyxl形式)
+        side : openpyxl.styles.Side
+            罫線
         
         Returns
         -------
-        list of tuple of int
-            (row, col)の数値が入ったリスト
+        str or None
+            罫線のスタイル
         """
-        merged_cells = []
-        for merged_cell in sheet.merged_cell_ranges:
-            merge_start_col, merge_start_row, merge_end_col, merge_end_row = merged_cell.bounds
-            if merge_start_row != merge_end_row:
-                continue  # 2行以上にわたっている結合セルなので、楽譜以外の結合セルと判定
-            else:
-                for i in range(merge_start_col + 1, merge_end_col + 1):  # 結合最初のセルは範囲外 かつ range関数は最後の番号未満までなのでお互い+1
-                    merged_cells.append((merge_start_row, i))
-        return merged_cells
+        if side.color is not None:
+            rgb = side.color.rgb
+            if isinstance(rgb, str) and rgb.lower() in NON_BORDER_COLORS:
+                return None
+        return side.style
 
-    def _check_same_strings_or_not(self, value, now_idx, candidate):
-        """
-        セルの値と音の文字候補が一致しているかどうかを返す関数
-        
-        Parameters
-        ----------
-        value : str
-            セルの値
-        now_idx : int
-            現在の文字数
-        candidate : 音の文字候補
-            音の文字候補
-        
-        Returns
-        -------
-        bool
-            セルの値と音の文字候補が合っているかどうか
-        """
-        is_same = True
-        for i, _c in enumerate(candidate):
-            if value[now_idx + i] != _c:
-                is_same = False
-                break
-        return is_same
+
+_worker_loader = None  # ワーカープロセスごとに開いたXlsxLoader
+
+
+def _init_worker_loader(source, max_beat_num, force_same_width):
+    global _worker_loader
+    _worker_loader = XlsxLoader(
+        source, max_beat_num=max_beat_num, force_same_width=force_same_width, backend="raw"
+    )
+
+
+def _get_sound_list_in_worker(job):
+    return _worker_loader.get_sound_list(*job)
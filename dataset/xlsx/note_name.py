@@ -0,0 +1,105 @@
+# coding: utf-8
+import re
+from functools import lru_cache
+
+from ._static_data import DICT_FOR_NAME_CONVERT
+
+
+def _create_note_name_pattern(name_dict):
+    """
+    音名の文字候補を、辞書の順（同じ位置で複数一致する場合は先の候補）に試す正規表現にする関数
+
+    Parameters
+    ----------
+    name_dict : dict of {tuple: tuple of (str, bool)}
+        文字候補をキー、(音名, 新しい音かどうか)を値とする辞書
+
+    Returns
+    -------
+    re.Pattern
+        候補ごとにグループを持つ正規表現
+    list of tuple of (str, bool)
+        グループ番号-1をインデックスとする(音名, 新しい音かどうか)
+    """
+    groups = []
+    tokens = []
+    for candidates, token in name_dict.items():
+        for candidate in candidates:
+            groups.append("({})".format(re.escape("".join(candidate))))
+            tokens.append(token)
+    return re.compile("|".join(groups)), tokens
+
+
+NOTE_NAME_PATTERN, NOTE_NAME_TOKENS = _create_note_name_pattern(DICT_FOR_NAME_CONVERT)
+# ドイツ音名の変化記号(Cis, Des, Es, As等)は音名の直後だけ、音名より優先して読む
+GERMAN_NOTE_NAMES = ("C", "D", "E", "F", "G", "A", "H")
+GERMAN_SUFFIX_PATTERN = re.compile("is|es|s")
+GERMAN_SUFFIX_DICT = {"is": "is", "es": "es", "s": "es"}
+
+
+def convert_to_german_note(value):
+    """
+    セル内の文字をドイツ音名に変換する関数（同じ文字列は結果を使い回す）
+
+    Parameters
+    ----------
+    value : str
+        音の文字列
+
+    Returns
+    -------
+    tuple of str
+        ドイツ音名の音
+    """
+    return tokenize_note(value)[0]
+
+
+@lru_cache(maxsize=4096)
+def tokenize_note(value):
+    """
+    セル内の文字をドイツ音名に変換し、音名として読めなかった文字も返す関数
+
+    Parameters
+    ----------
+    value : str
+        音の文字列
+
+    Returns
+    -------
+    tuple of str
+        ドイツ音名の音
+    tuple of str
+        音名として読めなかった文字（空白は除く）
+    """
+    ret = []
+    unknown_chars = []
+    now_idx = 0
+    eng_note = ""
+    while now_idx < len(value):
+        m = None
+        if eng_note in GERMAN_NOTE_NAMES:
+            suffix = GERMAN_SUFFIX_PATTERN.match(value, now_idx)
+            if suffix is not None and (suffix.group() != "s" or eng_note in ("E", "A")):
+                m = suffix
+                note_name, register_note = GERMAN_SUFFIX_DICT[suffix.group()], False
+        if m is None:
+            m = NOTE_NAME_PATTERN.match(value, now_idx)
+            if m is None:
+                if not value[now_idx].isspace():
+                    unknown_chars.append(value[now_idx])
+                now_idx += 1
+                continue
+            note_name, register_note = NOTE_NAME_TOKENS[m.lastindex - 1]
+        if register_note is True and len(eng_note) != 0:
+            ret.append(eng_note)
+            eng_note = ""
+        if (eng_note == "E" or eng_note == "A") and note_name == "es":
+            eng_note += "s"
+        elif eng_note == "H" and note_name == "es":
+            eng_note = "B"
+        else:
+            eng_note += note_name
+        now_idx = m.end()
+    if len(eng_note) != 0:
+        ret.append(eng_note)
+    return tuple(ret), tuple(unknown_chars)
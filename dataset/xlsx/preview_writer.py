@@ -0,0 +1,209 @@
+# coding: utf-8
+from html import escape
+
+from openpyxl.utils.cell import get_column_letter
+from openpyxl.utils.units import DEFAULT_COLUMN_WIDTH, DEFAULT_ROW_HEIGHT
+
+SIDE_CSS_DICT = {
+    "hair": "1px solid",
+    "dotted": "1px dotted",
+    "dashDot": "1px dashed",
+    "dashDotDot": "1px dashed",
+    "dashed": "1px dashed",
+    "thin": "1px solid",
+    "mediumDashDot": "2px dashed",
+    "mediumDashDotDot": "2px dashed",
+    "mediumDashed": "2px dashed",
+    "slantDashDot": "2px dashed",
+    "medium": "2px solid",
+    "thick": "3px solid",
+    "double": "3px double",
+}  # 罫線のスタイルごとのCSSの太さと線の種類
+HTML_HEADER = (
+    '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n<title>{}</title>\n<style>\n'
+    + "table{{border-collapse:collapse;table-layout:fixed;font-family:Calibri,sans-serif;font-size:11pt}}\n"
+    + "td{{padding:0 2px;overflow:hidden;white-space:nowrap;vertical-align:bottom}}\n"
+)
+
+
+class HtmlPreviewWriter(object):
+    """
+    SheetLayoutを、1ファイルで完結するHTMLの表にして書き出すクラス（確認用のプレビュー）
+    セルの値・フォント・背景色・罫線・結合セル・列幅・行の高さを表す
+    """
+
+    def __init__(self, layout):
+        """
+        Parameters
+        ----------
+        layout : SheetLayout
+            書き出すシートのレイアウト
+        """
+        self.layout = layout
+        self.style_class_dict = {}  # CSSの宣言ごとのクラス名
+        self.style_key_dict = {}  # (フォント, 配置, 罫線, 背景色)のidごとのクラス名
+
+    def fwrite(self, filename):
+        """
+        HTMLを書き出す関数
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力先のファイル名、もしくはバッファ(BytesIO等)
+        """
+        html = self.get_html()
+        if hasattr(filename, "write"):
+            filename.write(html.encode("utf-8"))
+        else:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(html)
+
+    def get_html(self):
+        """
+        HTMLを文字列で返す関数
+
+        Returns
+        -------
+        str
+            HTML
+        """
+        layout = self.layout
+        cell_rows = dict(layout.iter_rows())
+        # 結合セルは先頭のセルにrowspan, colspanを付け、残りのセルは書かない
+        spans = {}
+        merged_cells = set()
+        for min_col, min_row, max_col, max_row in layout.merged_ranges:
+            spans[(min_row, min_col)] = (max_row - min_row + 1, max_col - min_col + 1)
+            for row in range(min_row, max_row + 1):
+                for column in range(min_col, max_col + 1):
+                    merged_cells.add((row, column))
+        max_row = max(
+            [0] + list(cell_rows.keys()) + [bounds[3] for bounds in layout.merged_ranges]
+            + [row for row, dim in layout.row_dimensions.items() if dim.height is not None]
+        )
+        max_col = max(
+            [0] + [specs[-1][0] for specs in cell_rows.values()] + [bounds[2] for bounds in layout.merged_ranges]
+        )
+
+        body = ["<table>", "<colgroup>"]
+        for column in range(1, max_col + 1):
+            dim = layout.column_dimensions.get(get_column_letter(column))
+            width = DEFAULT_COLUMN_WIDTH if dim is None or dim.width is None else dim.width
+            body.append('<col style="width:{}px">'.format(self._convert_width2px(width)))
+        body.append("</colgroup>")
+        for row in range(1, max_row + 1):
+            dim = layout.row_dimensions.get(row)
+            height = DEFAULT_ROW_HEIGHT if dim is None or dim.height is None else dim.height
+            chunk = ['<tr style="height:{}px">'.format(self._convert_height2px(height))]
+            specs = dict(cell_rows.get(row, []))
+            for column in range(1, max_col + 1):
+                span = spans.get((row, column))
+                if span is None and (row, column) in merged_cells:
+                    continue
+                attrs = ""
+                if span is not None:
+                    if span[0] > 1:
+                        attrs += ' rowspan="{}"'.format(span[0])
+                    if span[1] > 1:
+                        attrs += ' colspan="{}"'.format(span[1])
+                spec = specs.get(column)
+                if spec is None:
+                    chunk.append("<td{}></td>".format(attrs))
+                    continue
+                class_name = self._get_class_name(spec)
+                if class_name is not None:
+                    attrs += ' class="{}"'.format(class_name)
+                value = "" if spec.value is None else escape(str(spec.value))
+                chunk.append("<td{}>{}</td>".format(attrs, value))
+            chunk.append("</tr>")
+            body.append("".join(chunk))
+        body.append("</table>")
+
+        header = HTML_HEADER.format(escape(layout.title)) + "".join(
+            ".{}{{{}}}\n".format(class_name, declarations)
+            for declarations, class_name in self.style_class_dict.items()
+        )
+        return header + "</style>\n</head>\n<body>\n" + "\n".join(body) + "\n</body>\n</html>\n"
+
+    def _get_class_name(self, spec):
+        # 同じスタイルの組み合わせは1つのCSSのクラスにまとめる
+        key = (id(spec.font), id(spec.align), id(spec.border), id(spec.fill))
+        if key in self.style_key_dict:
+            return self.style_key_dict[key][0]
+        declarations = self._get_css(spec)
+        if declarations == "":
+            class_name = None
+        else:
+            class_name = self.style_class_dict.get(declarations)
+            if class_name is None:
+                class_name = "s{}".format(len(self.style_class_dict))
+                self.style_class_dict[declarations] = class_name
+        # idが使い回されないよう、スタイルも一緒に持っておく
+        self.style_key_dict[key] = (class_name, spec.font, spec.align, spec.border, spec.fill)
+        return class_name
+
+    def _get_css(self, spec):
+        """
+        セルのスタイルをCSSの宣言にして返す関数
+
+        Parameters
+        ----------
+        spec : CellSpec
+            セル
+
+        Returns
+        -------
+        str
+            CSSの宣言
+        """
+        css = []
+        font = spec.font
+        if font is not None:
+            if font.name is not None:
+                css.append("font-family:'{}'".format(font.name))
+            if font.sz is not None:
+                css.append("font-size:{}pt".format(font.sz))
+            if font.b:
+                css.append("font-weight:bold")
+        align = spec.align
+        if align is not None:
+            if align.horizontal is not None:
+                css.append("text-align:{}".format(align.horizontal))
+            if align.vertical is not None:
+                css.append("vertical-align:{}".format("middle" if align.vertical == "center" else align.vertical))
+            if align.wrap_text:
+                css.append("white-space:normal")
+        fill = spec.fill
+        if fill is not None and fill.patternType is not None:
+            color = self._convert_color(fill.fgColor)
+            if color is not None:
+                css.append("background:{}".format(color))
+        border = spec.border
+        if border is not None:
+            for name in ["top", "left", "right", "bottom"]:
+                side = getattr(border, name)
+                if side is None or side.style is None:
+                    continue
+                color = self._convert_color(side.color)
+                css.append("border-{}:{} {}".format(
+                    name, SIDE_CSS_DICT.get(side.style, "1px solid"), "#000000" if color is None else color
+                ))
+        return ";".join(css)
+
+    @staticmethod
+    def _convert_color(color):
+        # ARGBの色("ff000000"等)をCSSの色にする（テーマ色等は扱わない）
+        if color is None or not isinstance(color.rgb, str) or len(color.rgb) != 8:
+            return None
+        return "#" + color.rgb[2:].lower()
+
+    @staticmethod
+    def _convert_width2px(width):
+        # エクセルの列幅（文字数）をピクセルにする
+        return int(width * 7 + 5)
+
+    @staticmethod
+    def _convert_height2px(height):
+        # エクセルの行の高さ（ポイント）をピクセルにする
+        return int(height * 4 / 3)
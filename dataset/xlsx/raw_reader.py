@@ -0,0 +1,534 @@
+# coding: utf-8
+import posixpath
+import re
+from hashlib import sha1
+from io import BytesIO
+from zipfile import ZipFile
+from xml.etree.ElementTree import iterparse
+from openpyxl.styles.colors import COLOR_INDEX
+from openpyxl.utils.escape import unescape
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+DEFAULT_COLUMN_WIDTH = 13  # openpyxlのColumnDimensionの既定値
+DEFAULT_RGB = "00000000"  # openpyxlのColorの既定値
+SHARED_STRING_INDEX_PATTERN = re.compile(rb'<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)<')
+
+
+class RawColor(object):
+    __slots__ = ("rgb",)
+
+    def __init__(self, rgb):
+        self.rgb = rgb
+
+
+class RawSide(object):
+    __slots__ = ("style", "color")
+
+    def __init__(self, style=None, color=None):
+        self.style = style
+        self.color = color
+
+
+class RawBorder(object):
+    __slots__ = ("left", "right", "top", "bottom")
+
+    def __init__(self, left=None, right=None, top=None, bottom=None):
+        self.left = left if left is not None else RawSide()
+        self.right = right if right is not None else RawSide()
+        self.top = top if top is not None else RawSide()
+        self.bottom = bottom if bottom is not None else RawSide()
+
+
+class RawFill(object):
+    __slots__ = ("fgColor",)
+
+    def __init__(self, fgColor):
+        self.fgColor = fgColor
+
+
+class RawCell(object):
+    __slots__ = ("value", "workbook", "fill_id", "border_id")
+
+    def __init__(self, value, workbook, fill_id=0, border_id=0):
+        self.value = value
+        self.workbook = workbook
+        self.fill_id = fill_id
+        self.border_id = border_id
+
+    @property
+    def fill(self):
+        return self.workbook.fills[self.fill_id]
+
+    @property
+    def border(self):
+        return self.workbook.borders[self.border_id]
+
+
+class RawMergedRange(object):
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds):
+        self.bounds = bounds  # (最小列, 最小行, 最大列, 最大行)
+
+
+class RawMergedCells(object):
+    def __init__(self, ranges):
+        self.ranges = ranges
+
+
+class RawColumnDimension(object):
+    __slots__ = ("width",)
+
+    def __init__(self, width=DEFAULT_COLUMN_WIDTH):
+        self.width = width
+
+
+class RawColumnDimensions(dict):
+    def __missing__(self, key):
+        return RawColumnDimension()
+
+
+class RawXlsxWorkbook(object):
+    """
+    zip内のXMLを直接読む、読み込み専用の軽量ワークブック
+    XlsxLoaderが使う部分（値、背景色、罫線、結合セル、列幅）だけをopenpyxlと同じ見え方で返す
+    """
+
+    def __init__(self, filename):
+        """
+        Parameters
+        ----------
+        filename : str or bytes or file-like object
+            .xlsxのファイル名、もしくは.xlsxのバイト列・読み込み元のバッファ
+        """
+        if isinstance(filename, (bytes, bytearray)):
+            filename = BytesIO(filename)
+        self.zip = ZipFile(filename)
+        self.sheet_paths = self._read_sheet_paths()
+        self.sheetnames = list(self.sheet_paths.keys())
+        self.shared_strings = None
+        self.fills = None
+        self.borders = None
+        self.border_ids = None  # 罫線ごとの番号（結合セルで足した罫線もopenpyxlと同様に番号を振る）
+        self.cell_styles = None  # スタイル番号ごとの(fillId, borderId)
+
+    def __getitem__(self, sheet_name):
+        return self.get_sheet(sheet_name)
+
+    def get_sheet(self, sheet_name, row_list=None):
+        """
+        シートを読み込む関数
+
+        Parameters
+        ----------
+        sheet_name : str
+            シート名
+        row_list : list of int, optional
+            読み込む行のリスト, by default None（全行）
+
+        Returns
+        -------
+        RawXlsxSheet
+            シート
+        """
+        if self.shared_strings is None:
+            self._read_shared_strings()
+        if self.cell_styles is None:
+            self._read_styles()
+        return RawXlsxSheet(self, self.sheet_paths[sheet_name], row_list)
+
+    def get_sheet_hashes(self):
+        """
+        シートごとに、シートのXML・styles.xml・シートが使う共有文字列の内容のハッシュを返す関数
+        XMLは解析せず、シートのXMLからは共有文字列の番号だけを正規表現で拾う
+        （他のシートの文字を編集してsharedStrings.xmlが変わっても、このシートのハッシュは変わらない）
+
+        Returns
+        -------
+        dict of {str: str}
+            シート名をキー、ハッシュ値を値とする辞書
+        """
+        if self.shared_strings is None:
+            self._read_shared_strings()
+        styles_key = self._get_part_key("xl/styles.xml").encode()
+        sheet_hashes = {}
+        for sheet_name, path in self.sheet_paths.items():
+            xml = self.zip.read(path)
+            indices = sorted({int(idx) for idx in SHARED_STRING_INDEX_PATTERN.findall(xml)})
+            hash_obj = sha1(styles_key)
+            hash_obj.update(xml)
+            for idx in indices:
+                if idx < len(self.shared_strings):
+                    hash_obj.update("{}\x00{}\x00".format(idx, self.shared_strings[idx]).encode())
+            sheet_hashes[sheet_name] = hash_obj.hexdigest()
+        return sheet_hashes
+
+    def add_border(self, border):
+        """
+        罫線を登録して番号を返す関数（登録済みの罫線はその番号を返す）
+
+        Parameters
+        ----------
+        border : RawBorder
+            罫線
+
+        Returns
+        -------
+        int
+            罫線の番号
+        """
+        key = _get_border_key(border)
+        border_id = self.border_ids.get(key)
+        if border_id is None:
+            border_id = len(self.borders)
+            self.borders.append(border)
+            self.border_ids[key] = border_id
+        return border_id
+
+    def _read_sheet_paths(self):
+        """
+        シート名とzip内のXMLのパスの辞書を作る関数
+        """
+        targets = {}
+        with self.zip.open("xl/_rels/workbook.xml.rels") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_PKG_REL + "Relationship":
+                    targets[elem.get("Id")] = elem.get("Target")
+        sheet_paths = {}
+        with self.zip.open("xl/workbook.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_MAIN + "sheet":
+                    target = targets[elem.get(NS_REL + "id")]
+                    if target.startswith("/"):
+                        path = target[1:]
+                    else:
+                        path = posixpath.normpath(posixpath.join("xl", target))
+                    sheet_paths[elem.get("name")] = path
+        return sheet_paths
+
+    def _get_part_key(self, path):
+        if path not in self.zip.namelist():
+            return "{}:-;".format(path)
+        info = self.zip.getinfo(path)
+        return "{}:{:08x}:{};".format(path, info.CRC, info.file_size)
+
+    def _read_shared_strings(self):
+        self.shared_strings = []
+        if "xl/sharedStrings.xml" not in self.zip.namelist():
+            return
+        with self.zip.open("xl/sharedStrings.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_MAIN + "si":
+                    self.shared_strings.append(_get_text(elem))
+                    elem.clear()
+
+    def _read_styles(self):
+        """
+        背景色、罫線、セルのスタイル番号をstyles.xmlから読み込む関数
+        """
+        self.fills = []
+        self.borders = []
+        self.cell_styles = []
+        if "xl/styles.xml" not in self.zip.namelist():
+            self.fills.append(RawFill(RawColor(DEFAULT_RGB)))
+            self.borders.append(RawBorder())
+            self.cell_styles.append((0, 0))
+            self.border_ids = {_get_border_key(self.borders[0]): 0}
+            return
+        with self.zip.open("xl/styles.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_MAIN + "fill":
+                    fg_color = elem.find(NS_MAIN + "patternFill/" + NS_MAIN + "fgColor")
+                    self.fills.append(RawFill(_get_color(fg_color, DEFAULT_RGB)))
+                elif elem.tag == NS_MAIN + "border":
+                    self.borders.append(RawBorder(**{
+                        name: _get_side(elem.find(NS_MAIN + name))
+                        for name in ("left", "right", "top", "bottom")
+                    }))
+                elif elem.tag == NS_MAIN + "cellXfs":
+                    for xf in elem.findall(NS_MAIN + "xf"):
+                        self.cell_styles.append(
+                            (int(xf.get("fillId", 0)), int(xf.get("borderId", 0)))
+                        )
+        if len(self.fills) == 0:
+            self.fills.append(RawFill(RawColor(DEFAULT_RGB)))
+        if len(self.borders) == 0:
+            self.borders.append(RawBorder())
+        self.border_ids = {}
+        for border_id, border in reversed(list(enumerate(self.borders))):
+            self.border_ids[_get_border_key(border)] = border_id
+
+
+class RawXlsxSheet(object):
+    """
+    RawXlsxWorkbookで読み込んだシート（指定した行だけを持つ）
+    """
+
+    def __init__(self, workbook, path, row_list=None):
+        """
+        Parameters
+        ----------
+        workbook : RawXlsxWorkbook
+            ワークブック
+        path : str
+            zip内のシートのXMLのパス
+        row_list : list of int, optional
+            読み込む行のリスト, by default None（全行）
+        """
+        self.workbook = workbook
+        self.path = path
+        self.rows = None if row_list is None else set(row_list)
+        self.cells = {}
+        self.column_dimensions = RawColumnDimensions()
+        merged_ranges = self._read_sheet(self.rows)
+        self.merged_cells = RawMergedCells(merged_ranges)
+        self._apply_merged_cells(merged_ranges)
+
+    def cell(self, row, column):
+        """
+        セルを返す関数（読み込んでいない行のセルは空のセル）
+
+        Parameters
+        ----------
+        row : int
+            行番号
+        column : int
+            列番号
+
+        Returns
+        -------
+        RawCell
+            セル
+        """
+        cell = self.cells.get((row, column))
+        if cell is None:
+            cell = RawCell(None, self.workbook)
+        return cell
+
+    def add_rows(self, row_list):
+        """
+        まだ読み込んでいない行を追加で読み込む関数
+
+        Parameters
+        ----------
+        row_list : list of int
+            読み込む行のリスト
+        """
+        if self.rows is None:
+            return
+        rows = set(row_list) - self.rows
+        if len(rows) == 0:
+            return
+        sheet = RawXlsxSheet(self.workbook, self.path, rows)
+        self.cells.update(sheet.cells)
+        self.rows |= rows
+
+    def _read_sheet(self, rows):
+        """
+        シートのXMLを順に読み、指定した行のセルと列幅・結合セルを得る関数
+
+        Parameters
+        ----------
+        rows : set of int or None
+            読み込む行の集合
+
+        Returns
+        -------
+        list of RawMergedRange
+            結合セルのリスト（XMLの順）
+        """
+        wb = self.workbook
+        cell_tag, row_tag = NS_MAIN + "c", NS_MAIN + "row"
+        merged_ranges = []
+        row_num = 0
+        with wb.zip.open(self.path) as f:
+            for _, elem in iterparse(f):
+                tag = elem.tag
+                if tag == row_tag:
+                    r = elem.get("r")
+                    row_num = int(r) if r is not None else row_num + 1
+                    if rows is None or row_num in rows:
+                        col_num = 0
+                        for c in elem.iter(cell_tag):
+                            ref = c.get("r")
+                            if ref is not None:
+                                _, col_num = _split_cell_ref(ref)
+                            else:
+                                col_num += 1
+                            self.cells[(row_num, col_num)] = self._create_cell(c)
+                    elem.clear()
+                elif tag == NS_MAIN + "col":
+                    dim = RawColumnDimension()
+                    if elem.get("width") is not None:
+                        dim.width = float(elem.get("width"))
+                    self.column_dimensions[_get_column_letter(int(elem.get("min")))] = dim
+                elif tag == NS_MAIN + "mergeCell":
+                    refs = elem.get("ref").split(":")
+                    min_row, min_col = _split_cell_ref(refs[0])
+                    max_row, max_col = _split_cell_ref(refs[-1])
+                    merged_ranges.append(RawMergedRange((min_col, min_row, max_col, max_row)))
+        return merged_ranges
+
+    def _create_cell(self, c):
+        wb = self.workbook
+        fill_id, border_id = wb.cell_styles[int(c.get("s", 0))]
+        data_type = c.get("t", "n")
+        formula = c.find(NS_MAIN + "f")
+        if formula is not None:
+            value = "=" + (formula.text or "")
+        elif data_type == "inlineStr":
+            child = c.find(NS_MAIN + "is")
+            value = _get_text(child) if child is not None else None
+        else:
+            value = c.findtext(NS_MAIN + "v") or None
+            if value is not None:
+                if data_type == "n":
+                    value = _cast_number(value)
+                elif data_type == "s":
+                    value = wb.shared_strings[int(value)]
+                elif data_type == "b":
+                    value = bool(int(value))
+        return RawCell(value, wb, fill_id, border_id)
+
+    def _apply_merged_cells(self, merged_ranges):
+        """
+        openpyxlと同様に、先頭セルに末尾セルの右の罫線を足し、先頭以外を空のセルにして、
+        端のセルに先頭セルの左右の罫線を付ける関数
+        """
+        wb = self.workbook
+        rows = self.rows
+        extra_rows = set()
+        if rows is not None:
+            # 読み込んだ行にかかる結合セルだけを処理し、先頭・末尾セルの行を読んでいなければまとめて読み直す
+            merged_ranges = [
+                merged_range for merged_range in merged_ranges
+                if any(merged_range.bounds[1] <= row <= merged_range.bounds[3] for row in rows)
+            ]
+            extra_rows = {
+                row for merged_range in merged_ranges
+                for row in (merged_range.bounds[1], merged_range.bounds[3])
+            } - rows
+            if len(extra_rows) > 0:
+                self._read_sheet(extra_rows)
+            rows = rows | extra_rows
+        for merged_range in merged_ranges:
+            min_col, min_row, max_col, max_row = merged_range.bounds
+            start_cell = self._get_cell(min_row, min_col)
+            end_cell = self._get_cell(max_row, max_col)
+            if end_cell is not start_cell:
+                start_cell.border_id = wb.add_border(
+                    _add_side(start_cell.border, "right", end_cell.border.right)
+                )
+            for row in range(min_row, max_row + 1):
+                if rows is not None and row not in rows:
+                    continue
+                for col in range(min_col, max_col + 1):
+                    if row == min_row and col == min_col:
+                        continue
+                    self.cells[(row, col)] = RawCell(None, wb)
+            for name, edge_col in (("left", min_col), ("right", max_col)):
+                side = getattr(start_cell.border, name)
+                if side.style is None:
+                    continue
+                for row in range(min_row, max_row + 1):
+                    if rows is not None and row not in rows:
+                        continue
+                    cell = self.cells.get((row, edge_col))
+                    if cell is None or cell is start_cell:
+                        continue
+                    cell.border_id = wb.add_border(_add_side(cell.border, name, side))
+        for row, col in [key for key in self.cells if key[0] in extra_rows]:
+            del self.cells[(row, col)]
+
+    def _get_cell(self, row, column):
+        """
+        結合セルの処理用にセルを返す関数（セルが無ければ空のセルを作る）
+        """
+        cell = self.cells.get((row, column))
+        if cell is None:
+            cell = self.cell(row, column)
+            self.cells[(row, column)] = cell
+        return cell
+
+
+def _add_side(border, name, side):
+    """
+    openpyxlのBorderの加算（元の罫線を優先）と同様に、罫線の片側を足した罫線を返す関数
+    """
+    own = getattr(border, name)
+    new_side = RawSide(
+        own.style or side.style,
+        own.color if own.color is not None else side.color,
+    )
+    sides = {n: getattr(border, n) for n in ("left", "right", "top", "bottom")}
+    sides[name] = new_side
+    return RawBorder(**sides)
+
+
+def _get_border_key(border):
+    return tuple(
+        (side.style, side.color.rgb if side.color is not None else None)
+        for side in (border.left, border.right, border.top, border.bottom)
+    )
+
+
+def _get_color(elem, default=None):
+    if elem is None:
+        return RawColor(default) if default is not None else None
+    if elem.get("rgb") is not None:
+        return RawColor(elem.get("rgb"))
+    if elem.get("indexed") is not None:
+        idx = int(elem.get("indexed"))
+        if idx < len(COLOR_INDEX):
+            return RawColor(COLOR_INDEX[idx])
+    return RawColor(default) if default is not None else None
+
+
+def _get_side(elem):
+    if elem is None:
+        return RawSide()
+    return RawSide(elem.get("style"), _get_color(elem.find(NS_MAIN + "color")))
+
+
+def _get_text(elem):
+    """
+    文字列の要素(<si>, <is>)から、ふりがな(<rPh>)を除いた文字列を得る関数
+    XMLに書けない文字のエスケープ(_xHHHH_、"_"自体は_x005F_)は元の文字に戻す
+    """
+    texts = []
+    t = elem.find(NS_MAIN + "t")
+    if t is not None and t.text is not None:
+        texts.append(t.text)
+    for r in elem.findall(NS_MAIN + "r"):
+        t = r.find(NS_MAIN + "t")
+        if t is not None and t.text is not None:
+            texts.append(t.text)
+    return unescape("".join(texts))
+
+
+def _cast_number(value):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _split_cell_ref(ref):
+    """
+    セルの座標値(A1等)を(行番号, 列番号)にする関数
+    """
+    col_num = 0
+    for i, s in enumerate(ref):
+        if s.isdigit():
+            return int(ref[i:]), col_num
+        col_num = col_num * 26 + (ord(s.upper()) - ord("@"))
+    return 0, col_num
+
+
+def _get_column_letter(col_num):
+    col_str = ""
+    while col_num > 0:
+        col_num, rem = divmod(col_num - 1, 26)
+        col_str = chr(rem + ord("A")) + col_str
+    return col_str
@@ -0,0 +1,233 @@
+# coding: utf-8
+from tempfile import TemporaryFile
+from zipfile import ZipFile, ZIP_DEFLATED
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl.compat import safe_string
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.utils.cell import column_index_from_string, get_column_letter
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.functions import tostring
+
+from .layout import LayoutStyleIndex
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_XML = (
+    XML_HEADER
+    + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    + '<Default Extension="xml" ContentType="application/xml"/>'
+    + '<Override PartName="/xl/workbook.xml" '
+    + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    + '<Override PartName="/xl/worksheets/sheet1.xml" '
+    + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    + '<Override PartName="/xl/theme/theme1.xml" '
+    + 'ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+    + '<Override PartName="/xl/styles.xml" '
+    + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    + '<Override PartName="/xl/sharedStrings.xml" '
+    + 'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    + '</Types>'
+)
+ROOT_RELS_XML = (
+    XML_HEADER
+    + '<Relationships xmlns="{}">'.format(NS_PKG_REL)
+    + '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    + 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    + '</Relationships>'
+)
+WORKBOOK_RELS_XML = (
+    XML_HEADER
+    + '<Relationships xmlns="{}">'.format(NS_PKG_REL)
+    + '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    + 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    + '<Relationship Id="rId2" Target="styles.xml" '
+    + 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    + '<Relationship Id="rId3" Target="theme/theme1.xml" '
+    + 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme"/>'
+    + '<Relationship Id="rId4" Target="sharedStrings.xml" '
+    + 'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/>'
+    + '</Relationships>'
+)
+
+
+class RawXlsxStreamWriter(object):
+    """
+    SheetLayoutを、openpyxlのWorksheetを作らずにzip内のXMLへ行の順に書き出すクラス
+    flushで書き終えた行だけを先に書き出してレイアウトから捨てるので、
+    パートを書くごとにflushすれば、楽譜が長くてもメモリに持つのは書き途中のパートの分だけになる
+    """
+
+    def __init__(self, workbook, layout):
+        """
+        Parameters
+        ----------
+        workbook : openpyxl.Workbook
+            スタイルの一覧を持つワークブック（シートは使わない）
+        layout : SheetLayout
+            書き出すシートのレイアウト（書き出した行は取り除かれる）
+        """
+        self.wb = workbook
+        self.layout = layout
+        self.style_index = LayoutStyleIndex(workbook)
+        self.shared_strings = {}  # 文字列ごとの共有文字列の番号
+        self.zf = None
+        self.sheet_file = None  # 書き込み中のsheet1.xml
+        self.merge_file = None  # 結合セルのXML（シートの最後に書くので一時ファイルにためておく）
+        self.num_merged_ranges = 0
+        self.column_widths = None  # 書き出した列幅
+        self.next_row = 1  # 次に書き出す行番号
+
+    def fwrite(self, filename):
+        """
+        xlsxを書き出す関数
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力先のファイル名、もしくはバッファ(BytesIO等)
+        """
+        self.fopen(filename)
+        self.close()
+
+    def fopen(self, filename):
+        """
+        xlsxの書き出しを始める関数（行はflushとcloseで書き出す）
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力先のファイル名、もしくはバッファ(BytesIO等)
+        """
+        self.zf = ZipFile(filename, "w", ZIP_DEFLATED)
+        self.zf.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        self.zf.writestr("_rels/.rels", ROOT_RELS_XML)
+        self.zf.writestr("xl/workbook.xml", self._get_workbook_xml())
+        self.zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+        self.zf.writestr("xl/theme/theme1.xml", theme_xml)
+        self.merge_file = TemporaryFile()
+
+    def flush(self, row):
+        """
+        指定した行より上の行を書き出し、レイアウトから捨てる関数
+
+        Parameters
+        ----------
+        row : int
+            行番号（この行は含まない）
+        """
+        cell_rows, merged_ranges, row_dimensions = self.layout.pop_rows(row)
+        if self.sheet_file is None:
+            # 列幅は行より前に書くので、最初に行を書き出すときの列幅を使う
+            self.sheet_file = self.zf.open("xl/worksheets/sheet1.xml", "w")
+            self._write(self._get_sheet_header_xml())
+        cell_dict = dict(cell_rows)
+        rows = sorted(set(cell_dict.keys()) | set(
+            _row for _row, dim in row_dimensions.items() if dim.height is not None
+        ))
+        for _row in rows:
+            if _row < self.next_row:
+                print("[WARN] Row {} is skipped because it was already written".format(_row))
+                continue
+            dim = row_dimensions.get(_row)
+            if dim is not None and dim.height is not None:
+                chunk = ['<row r="{}" ht={} customHeight="1">'.format(_row, quoteattr(safe_string(dim.height)))]
+            else:
+                chunk = ['<row r="{}">'.format(_row)]
+            for column, spec in cell_dict.get(_row, []):
+                chunk.append(self._get_cell_xml(_row, column, spec))
+            chunk.append("</row>")
+            self._write("".join(chunk))
+        self.next_row = max(self.next_row, row)
+        for min_col, min_row, max_col, max_row in merged_ranges:
+            self.merge_file.write('<mergeCell ref="{}{}:{}{}"/>'.format(
+                get_column_letter(min_col), min_row, get_column_letter(max_col), max_row
+            ).encode("utf-8"))
+        self.num_merged_ranges += len(merged_ranges)
+
+    def close(self):
+        """
+        残りの行とスタイル等を書き出し、xlsxを閉じる関数
+        """
+        self.flush(float("inf"))
+        if self._get_column_widths() != self.column_widths:
+            print("[WARN] Column widths changed after the first rows were written")
+        self._write("</sheetData>")
+        if self.num_merged_ranges > 0:
+            self._write('<mergeCells count="{}">'.format(self.num_merged_ranges))
+            self.merge_file.seek(0)
+            for chunk in iter(lambda: self.merge_file.read(1 << 16), b""):
+                self.sheet_file.write(chunk)
+            self._write("</mergeCells>")
+        self._write('<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>')
+        self._write("</worksheet>")
+        self.sheet_file.close()
+        self.merge_file.close()
+        # セルのスタイル番号(xf)はシートを書き出すときに登録するので、スタイルはその後
+        self.zf.writestr("xl/styles.xml", XML_HEADER + tostring(write_stylesheet(self.wb)).decode("utf-8"))
+        with self.zf.open("xl/sharedStrings.xml", "w") as f:
+            for chunk in self._iter_shared_strings_xml():
+                f.write(chunk.encode("utf-8"))
+        self.zf.close()
+
+    def _write(self, xml):
+        self.sheet_file.write(xml.encode("utf-8"))
+
+    def _get_workbook_xml(self):
+        return (
+            XML_HEADER
+            + '<workbook xmlns="{}" xmlns:r="{}">'.format(NS_MAIN, NS_REL)
+            + '<bookViews><workbookView activeTab="0"/></bookViews>'
+            + '<sheets><sheet name={} sheetId="1" r:id="rId1"/></sheets>'.format(quoteattr(self.layout.title))
+            + '<calcPr calcId="124519" fullCalcOnLoad="1"/>'
+            + '</workbook>'
+        )
+
+    def _get_column_widths(self):
+        return sorted(
+            (column_index_from_string(column_str), dim.width)
+            for column_str, dim in self.layout.column_dimensions.items() if dim.width
+        )
+
+    def _get_sheet_header_xml(self):
+        # 使っている範囲(dimension)は書き終えるまで分からないので書かない（省略できる）
+        xml = XML_HEADER + '<worksheet xmlns="{}" xmlns:r="{}">'.format(NS_MAIN, NS_REL)
+        xml += '<sheetViews><sheetView workbookViewId="0"/></sheetViews>'
+        xml += '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+        self.column_widths = self._get_column_widths()
+        if len(self.column_widths) > 0:
+            xml += "<cols>" + "".join(
+                '<col min="{0}" max="{0}" width={1} customWidth="1"/>'.format(
+                    column, quoteattr(safe_string(width))
+                ) for column, width in self.column_widths
+            ) + "</cols>"
+        return xml + "<sheetData>"
+
+    def _get_cell_xml(self, row, column, spec):
+        attrs = 'r="{}{}"'.format(get_column_letter(column), row)
+        style_array = self.style_index.get_style_array(spec)
+        if style_array is not None and any(style_array):
+            attrs += ' s="{}"'.format(self.wb._cell_styles.add(style_array))
+        value = spec.value
+        if value is None or value == "":
+            return "<c {}/>".format(attrs)
+        if isinstance(value, str):
+            string_idx = self.shared_strings.get(value)
+            if string_idx is None:
+                string_idx = len(self.shared_strings)
+                self.shared_strings[value] = string_idx
+            return '<c {} t="s"><v>{}</v></c>'.format(attrs, string_idx)
+        return '<c {} t="n"><v>{}</v></c>'.format(attrs, safe_string(value))
+
+    def _iter_shared_strings_xml(self):
+        yield XML_HEADER + '<sst xmlns="{0}" count="{1}" uniqueCount="{1}">'.format(
+            NS_MAIN, len(self.shared_strings)
+        )
+        for value in self.shared_strings.keys():
+            if value != value.strip():
+                yield '<si><t xml:space="preserve">{}</t></si>'.format(escape(value))
+            else:
+                yield "<si><t>{}</t></si>".format(escape(value))
+        yield "</sst>"
@@ -0,0 +1,203 @@
+# coding: utf-8
+import re
+
+from ..midi._static_data import DICT_FOR_PROGRAM_onlyFF14
+from ._static_data import (
+    BORDER_MEASURE,
+    MIN_SCORE_CELLS,
+)
+
+MARKER_PATTERN = re.compile("^[A-Za-z]{1,2}$")  # 段のマーカー(a, b, c, ...)
+PLAYER_PATTERN = re.compile("奏者\\s*(\\d+)")
+PROGRAM_NAMES = {name for keys in DICT_FOR_PROGRAM_onlyFF14.keys() for name in keys}
+
+
+def detect_score_region(cell_infos, merged_bounds):
+    """
+    シートのセルの情報から楽譜欄（開始列、終了列、パートごとの行リスト、楽器、奏者）を検出する関数
+    段のマーカー列があればマーカーのある行を、無ければ色付きのセルと小節の罫線がある行を楽譜の行とする
+    （1段が複数行の楽譜(3行固定等)は読み込めないので検出しない）
+
+    Parameters
+    ----------
+    cell_infos : dict of {tuple of int: tuple}
+        (行番号, 列番号)をキー、(値, 色, 左罫線の種類, 右罫線の種類)を値とする辞書
+    merged_bounds : list of tuple of int
+        結合セルの(最小列, 最小行, 最大列, 最大行)のリスト
+
+    Returns
+    -------
+    dict or None
+        "start_column", "end_column", "row_lists", "program_list", "player_list"を持つ辞書
+        楽器・奏者が見つからないパートはNone、楽譜の行が見つからない場合はNone
+    """
+    vertical_cells = set()  # 2行以上の結合セルに含まれるセル
+    vertical_ranges = {}  # 2行以上の結合セルの先頭セルごとの(最小行, 最大行)
+    for min_col, min_row, max_col, max_row in merged_bounds:
+        if min_row == max_row:
+            continue
+        vertical_ranges[(min_row, min_col)] = (min_row, max_row)
+        for row_num in range(min_row, max_row + 1):
+            for col_num in range(min_col, max_col + 1):
+                vertical_cells.add((row_num, col_num))
+
+    # 1行分のマーカーを列ごとに集める
+    marker_rows_dict = {}
+    has_vertical_marker = False  # 複数行の段(3行固定等)のマーカー
+    colored_dict = {}  # 行ごとの色付きのセルの列のリスト
+    measure_rows = set()  # 小節の罫線がある行
+    for (row_num, col_num), (value, color, left_border, right_border) in cell_infos.items():
+        if (
+            isinstance(value, str) and MARKER_PATTERN.match(value) is not None
+            and left_border == BORDER_MEASURE and right_border == BORDER_MEASURE
+        ):
+            if (row_num, col_num) in vertical_cells:
+                has_vertical_marker = True
+            else:
+                marker_rows_dict.setdefault(col_num, set()).add(row_num)
+        elif color != "white":
+            colored_dict.setdefault(row_num, []).append(col_num)
+        if left_border == BORDER_MEASURE or right_border == BORDER_MEASURE:
+            measure_rows.add(row_num)
+
+    marker_cols = sorted(
+        col_num for col_num, rows in marker_rows_dict.items() if len(rows) >= 2
+    )
+    if len(marker_cols) > 0:
+        score_rows = sorted(
+            row_num for row_num in marker_rows_dict[marker_cols[0]]
+            if len(colored_dict.get(row_num, [])) > 0
+        )
+        start_col = marker_cols[0] + 1
+        if len(score_rows) == 0:
+            return None
+        # 右側のマーカー列の手前までが楽譜欄
+        end_cols = [
+            col_num for col_num in marker_cols[1:]
+            if len(marker_rows_dict[col_num].intersection(score_rows)) > 0
+        ]
+        if len(end_cols) > 0:
+            end_col = end_cols[0] - 1
+        else:
+            end_col = max(max(colored_dict[row_num]) for row_num in score_rows)
+    elif has_vertical_marker:
+        print("[ERROR] Score systems with multiple rows are not supported")
+        return None
+    else:
+        score_rows = sorted(
+            row_num for row_num, cols in colored_dict.items()
+            if len(cols) >= MIN_SCORE_CELLS and row_num in measure_rows
+        )
+        if len(score_rows) == 0:
+            return None
+        start_col = min(min(colored_dict[row_num]) for row_num in score_rows)
+        end_col = max(max(colored_dict[row_num]) for row_num in score_rows)
+
+    # 楽譜欄より左の文字から楽器・奏者の欄を探す
+    program_blocks = []
+    player_blocks = []
+    program_cells = {}
+    for (row_num, col_num), (value, _, _, _) in cell_infos.items():
+        if col_num >= start_col or not isinstance(value, str):
+            continue
+        value = value.strip()
+        player = PLAYER_PATTERN.match(value)
+        rows = vertical_ranges.get((row_num, col_num))
+        if value in PROGRAM_NAMES:
+            if rows is not None:
+                program_blocks.append((rows, value))
+            else:
+                program_cells[row_num] = value
+        elif player is not None and rows is not None:
+            player_blocks.append((rows, int(player.group(1))))
+
+    if len(program_blocks) > 0:
+        # パートごとに楽器欄が縦に結合されている(XlsxWriterの出力)
+        row_lists, program_list, player_list = [], [], []
+        for (min_row, max_row), program in sorted(program_blocks):
+            rows = [row_num for row_num in score_rows if min_row - 1 <= row_num <= max_row + 1]
+            if len(rows) == 0:
+                continue
+            row_lists.append(rows)
+            program_list.append(program)
+            player_list.append(_get_block_value(player_blocks, min_row, max_row))
+    else:
+        systems = []  # 連続する行のまとまり
+        for row_num in score_rows:
+            if len(systems) > 0 and systems[-1][-1] == row_num - 1:
+                systems[-1].append(row_num)
+            else:
+                systems.append([row_num])
+        if all(len(rows) == 1 for rows in systems):
+            # パートごとに行がまとまっている（楽器名の行か、空いた行の多いところで分ける）
+            row_lists, program_list = _split_part_blocks(score_rows, program_cells)
+        else:
+            # 段ごとに各パートの行が並んでいる
+            num_parts = min(len(rows) for rows in systems)
+            row_lists = [[rows[part_idx] for rows in systems] for part_idx in range(num_parts)]
+            program_list = [program_cells.get(systems[0][part_idx]) for part_idx in range(num_parts)]
+        player_list = [None] * len(row_lists)
+    return {
+        "start_column": start_col,
+        "end_column": end_col,
+        "row_lists": row_lists,
+        "program_list": program_list,
+        "player_list": player_list,
+    }
+
+
+def _get_block_value(blocks, min_row, max_row):
+    for (_min_row, _max_row), value in blocks:
+        if _min_row <= max_row and min_row <= _max_row:
+            return value
+    return None
+
+
+def _split_part_blocks(score_rows, program_cells):
+    """
+    パートごとにまとまった楽譜の行を、パートごとの行リストに分ける関数
+    楽器名が2つ以上あれば楽器名の行（楽譜の行より上にあってもよい）から次の楽器名の行の手前までを、
+    無ければ行の間隔が最も狭い間隔より広いところで分ける
+
+    Parameters
+    ----------
+    score_rows : list of int
+        楽譜の行（昇順）
+    program_cells : dict of {int: str}
+        行番号ごとの楽器名
+
+    Returns
+    -------
+    list of list of int
+        パートごとの行リスト
+    list of str or None
+        パートごとの楽器名（見つからない場合はNone）
+    """
+    label_rows = sorted(row_num for row_num in program_cells.keys() if row_num <= score_rows[-1])
+    if len(label_rows) >= 2:
+        row_lists, program_list = [], []
+        for idx, label_row in enumerate(label_rows):
+            next_row = label_rows[idx + 1] if idx + 1 < len(label_rows) else float("inf")
+            rows = [
+                row_num for row_num in score_rows
+                if (idx == 0 or label_row <= row_num) and row_num < next_row
+            ]
+            if len(rows) > 0:
+                row_lists.append(rows)
+                program_list.append(program_cells[label_row])
+        return row_lists, program_list
+
+    gaps = [row_num - bef_row for bef_row, row_num in zip(score_rows, score_rows[1:])]
+    row_lists = [score_rows[:1]]
+    for row_num, gap in zip(score_rows[1:], gaps):
+        if gap > min(gaps):
+            row_lists.append([])
+        row_lists[-1].append(row_num)
+    program_list = [None] * len(row_lists)
+    if len(label_rows) == 1:
+        # 楽器名が1つだけの場合は、その行を含むか直後のパートの楽器とする
+        for idx, rows in enumerate(row_lists):
+            if label_rows[0] <= rows[-1]:
+                program_list[idx] = program_cells[label_rows[0]]
+                break
+    return row_lists, program_list
@@ -0,0 +1,45 @@
+# coding: utf-8
+from .base import ColumnGeometry, XlsxIOBase
+
+
+class SheetAnalysis(XlsxIOBase):
+    """
+    シートの解析結果（結合セル、列幅、セルの値と色・罫線の判定結果）をまとめたもの
+    同じシートに対するget_sound_listの呼び出し（パートごと）で使い回す
+    """
+
+    def __init__(self, sheet):
+        """
+        Parameters
+        ----------
+        sheet : openpyxl.WorkSheet or RawXlsxSheet
+            エクセルのワークシート
+        """
+        self.sheet = sheet
+        self.merged_cells = self._get_merged_cells(sheet)
+        self.column_geometry = ColumnGeometry(sheet.column_dimensions)  # 列幅（SheetLayoutと同じ形で持つ）
+        self.cell_infos = {}  # (行番号, 列番号)ごとの(値, 色, 左罫線, 右罫線)
+
+    def _get_merged_cells(self, sheet):
+        """
+        結合セルの座標の集合を返す関数
+
+        Parameters
+        ----------
+        sheet : openpyxl.WorkSheet or RawXlsxSheet
+            エクセルのワークシート
+
+        Returns
+        -------
+        set of tuple of int
+            (row, col)の数値が入った集合
+        """
+        merged_cells = set()
+        for merged_cell in sheet.merged_cells.ranges:
+            merge_start_col, merge_start_row, merge_end_col, merge_end_row = merged_cell.bounds
+            if merge_start_row != merge_end_row:
+                continue  # 2行以上にわたっている結合セルなので、楽譜以外の結合セルと判定
+            else:
+                for i in range(merge_start_col + 1, merge_end_col + 1):  # 結合最初のセルは範囲外 かつ range関数は最後の番号未満までなのでお互い+1
+                    merged_cells.add((merge_start_row, i))
+        return merged_cells
@@ -1,6 +1,8 @@
 # coding: utf-8
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from datetime import date
+from os import cpu_count
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.styles.borders import Side, Border
@@ -8,6 +10,9 @@ from openpyxl.styles.alignment import Alignment
 from more_itertools import chunked
 
 from .base import XlsxIOBase
+from .layout import SheetLayout, render_worksheet
+from .preview_writer import HtmlPreviewWriter
+from .raw_writer import RawXlsxStreamWriter
 from ._static_data import (
     DICT_FOR_CONVERT_GERMAN2JAPAN,
     DICT_FOR_CONVERT_GERMAN2JAPAN_SHORTEN,
@@ -43,6 +48,8 @@ class XlsxWriter(XlsxIOBase):
         octave3_color="ffff00ff",
         border_color="ff000000",
         non_border_color="ffc7c8c8",
+        backend="openpyxl",
+        max_memo_measures=0,
     ):
         """
         Parameters
@@ -89,15 +96,29 @@ class XlsxWriter(XlsxIOBase):
             オクターブ+2の色, by default "ffff00ff"
         border_color : str, optional
             楽譜の罫線の色, by default "ff000000"
+        backend : str, optional
+            書き込み方法, by default "openpyxl"
+            "openpyxl": openpyxlのWorkbookにセルを作ってwb.saveで保存する
+            "raw": openpyxlのWorksheetを作らず、レイアウトからXMLを直接zipへ書き出す（高速・省メモリ）
+            "html": レイアウトを確認用のHTML（1ファイル）に書き出す（xlsxは作らない）
+        max_memo_measures : int, optional
+            同じ小節を使い回すために覚えておく小節の数（古いものから捨てる）, by default 0（使い回さない）
+            同じ小節が続く曲でなければ、貼り付け直す分だけ遅くなる
         """
-        self.wb = Workbook()
+        self.wb = Workbook()  # rawの場合もスタイルの一覧はopenpyxlのものを使う
         self.ws = self.wb.active
         self.ws.sheet_name = sheet_name
+        self.backend = backend
+        self.layout = SheetLayout(title=self.ws.title)  # 書き込むセル等はまずレイアウトに置き、fwriteで描画する
+        self.part_layouts = []  # パートごとのレイアウト（書き出しながら作る場合は持たない）
+        self.stream_writer = None  # 書き出しながら作る場合のRawXlsxStreamWriter
         self.title = title
         self.tempo = tempo
         self.num_measures_in_system = num_measures_in_system
         self.start_measure_num = start_measure_num
         self.max_num_beats_in_row = 0
+        self.part_rows = []  # パートごとの音を記述した行のリスト（1行固定のみ）
+        self.score_columns = None  # 楽譜欄の(開始列, 終了列)
         self.player_width = player_width
         self.instrument_width = instrument_width
         self.score_width = score_width
@@ -108,7 +129,7 @@ class XlsxWriter(XlsxIOBase):
         self.title_width = self._convert_cm2width(title_width)
         self.color_width = self._convert_cm2width(color_width)
         self.shorten = shorten
-        self._initial_setting(self.ws)
+        self._initial_setting(self.layout)
         t = "solid"
         self.rest_color_fill = PatternFill(
             patternType=t, fgColor=rest_color, bgColor=rest_color
@@ -140,8 +161,13 @@ class XlsxWriter(XlsxIOBase):
         self.instrument_align = Alignment(
             horizontal="center", vertical="center", wrap_text=True
         )
+        self.border_dict = {}  # (上, 下, 左, 右)の罫線ごとのBorder
+        self.max_memo_measures = max_memo_measures
+        self.measure_dict = {}  # 小節の内容ごとの(書いたレイアウト, 行番号, 列番号, 列数, 最後の音)（使った順）
 
-    def add_common_data_list(self, common_data_list, start_row=10, start_column=3, progress_bar=None):
+    def add_common_data_list(
+        self, common_data_list, start_row=10, start_column=3, progress_bar=None, max_workers=1
+    ):
         """
         共通音楽データ(CommonSoundData)のリストを記述する関数
         
@@ -156,6 +182,10 @@ class XlsxWriter(XlsxIOBase):
         progress_bar : tk.ProgressBar or None, optional
             プログレスバー, by default None
             Noneの場合は何もしない
+        max_workers : int or None, optional
+            パートのレイアウトを並列に作るプロセス数, by default 1（並列化せずに作る）
+            Noneの場合はCPU数（ライターをプロセスへ渡す分、パートが少ない場合は遅くなる）
+            試験的な機能で、複数コアで速くなるかはまだ測っていない（1コアでは並列化しない方が速い）
         """
         note_lists = [common_data.get_note_list() for common_data in common_data_list]
         rate_lists = [common_data.get_rate_list() for common_data in common_data_list]
@@ -170,7 +200,6 @@ class XlsxWriter(XlsxIOBase):
         # 1ビート内の必要なセル数、太字罫線を引く場所を得る
         num_cells_maps = self._get_required_num_cells(rate_lists)
         borders_maps = self._get_borders(note_lists)
-        print("NUM_CELLS_MAPS", num_cells_maps)
 
         # cells_mapsを段ごとのセル数の最小公倍数に調整する
         num_cells_maps = self._adjust_cell_maps(num_cells_maps)
@@ -182,13 +211,37 @@ class XlsxWriter(XlsxIOBase):
 
         # 曲名やメトロノームなど記載
         self._plot_header(num_cells_maps[0][0], start_column)
+        self.score_columns = (start_column + 1, start_column + sum(num_cells_maps[0][0]))
+
+        parts = list(zip(common_data_list, note_lists, num_cells_maps, borders_maps))
+        if max_workers is None:
+            max_workers = cpu_count() or 1
+        max_workers = min(max_workers, len(parts))
+        if max_workers <= 1:
+            self._add_parts(parts, start_row, start_column, progress_bar)
+        else:
+            self._add_parts_in_parallel(parts, start_row, start_column, progress_bar, max_workers)
 
-        progress_tick = 100 // len(common_data_list)
+    def _add_parts(self, parts, start_row, start_column, progress_bar):
+        """
+        パートを1つずつシートのレイアウトに書き込む関数
+        
+        Parameters
+        ----------
+        parts : list of tuple
+            パートごとの(共通音楽データ, 音リスト, セル数マップ, 罫線マップ)のリスト
+        start_row : int
+            楽譜記述を開始する行
+        start_column : int
+            楽譜記述を開始する列
+        progress_bar : tk.ProgressBar or None
+            プログレスバー
+        """
+        progress_tick = 100 // len(parts)
         _start_row = start_row
-        for i, (common_data, note_list, num_cells_map, borders_map) in enumerate(zip(
-            common_data_list, note_lists, num_cells_maps, borders_maps
-        )):
-            end_row = self.add_common_data(
+        sheet_layout = self.layout
+        for i, (common_data, note_list, num_cells_map, borders_map) in enumerate(parts):
+            part_layout, end_row = self._get_part_layout(
                 common_data,
                 note_list,
                 num_cells_map,
@@ -198,6 +251,8 @@ class XlsxWriter(XlsxIOBase):
                 progress_bar=progress_bar,
                 progress_amount=progress_tick,
             )
+            sheet_layout.update(part_layout)
+            self._flush_part(part_layout, end_row + 1)
             _start_row = end_row + 1
             
             # 進み具合を表示する場合は更新
@@ -205,15 +260,102 @@ class XlsxWriter(XlsxIOBase):
                 progress_bar["value"] = progress_tick * (i + 1)
                 progress_bar.update()
 
+    def _add_parts_in_parallel(self, parts, start_row, start_column, progress_bar, max_workers):
+        """
+        パートのレイアウトをプロセスごとに並列に作り、パートの順にシートのレイアウトに加える関数
+        ワーカーではどのパートもstart_rowから書くので、前のパートまでの行数だけ下へずらして加える
+        
+        Parameters
+        ----------
+        parts : list of tuple
+            パートごとの(共通音楽データ, 音リスト, セル数マップ, 罫線マップ)のリスト
+        start_row : int
+            楽譜記述を開始する行
+        start_column : int
+            楽譜記述を開始する列
+        progress_bar : tk.ProgressBar or None
+            プログレスバー（パートを加えるごとに更新する）
+        max_workers : int
+            プロセス数
+        """
+        progress_tick = 100 // len(parts)
+        # ワークブックとシートのレイアウトはワーカーへ渡さない（列幅だけ渡す）
+        state = {
+            key: value for key, value in self.__dict__.items()
+            if key not in ["wb", "ws", "layout", "part_layouts", "part_rows", "stream_writer"]
+        }
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_writer,
+            initargs=(type(self), state, self.layout.title, self.layout.column_dimensions),
+        ) as executor:
+            results = executor.map(
+                _get_part_layout_in_worker,
+                [(*part, start_row, start_column) for part in parts],
+            )
+            _start_row = start_row
+            for i, (part_layout, end_row, part_rows) in enumerate(results):
+                num_rows = _start_row - start_row
+                part_layout = part_layout.shift_rows(num_rows)
+                self.part_rows.extend([[row + num_rows for row in rows] for rows in part_rows])
+                self.layout.update(part_layout)
+                self._flush_part(part_layout, end_row + num_rows + 1)
+                _start_row = end_row + num_rows + 1
+
+                # 進み具合を表示する場合は更新
+                if progress_bar:
+                    progress_bar["value"] = progress_tick * (i + 1)
+                    progress_bar.update()
+
+    def _flush_part(self, part_layout, row):
+        """
+        シートのレイアウトに加えたパートを、書き出しながら作る場合は書き出して捨て、そうでなければ持っておく関数
+
+        Parameters
+        ----------
+        part_layout : SheetLayout
+            パートのレイアウト
+        row : int
+            次のパートを書き始める行（この行より上を書き出す）
+        """
+        if self.stream_writer is None:
+            self.part_layouts.append(part_layout)
+        else:
+            self.stream_writer.flush(row)
+
+    def _get_part_layout(self, *args, **kwargs):
+        """
+        パートのレイアウトを作る関数（列幅・行の高さはシートのレイアウトと共有）
+        引数はadd_common_dataと同じ
+        
+        Returns
+        -------
+        SheetLayout
+            パートのレイアウト
+        int
+            パートの最後の行
+        """
+        sheet_layout = self.layout
+        self.layout = SheetLayout(
+            title=sheet_layout.title,
+            column_dimensions=sheet_layout.column_dimensions,
+            row_dimensions=sheet_layout.row_dimensions,
+            border_sum_dict=sheet_layout.border_sum_dict,
+        )
+        try:
+            end_row = self.add_common_data(*args, **kwargs)
+            return self.layout, end_row
+        finally:
+            self.layout = sheet_layout
+
     def add_common_data(
         self, common_data, note_list, num_cells_map, borders_map,
         start_row, start_column=3, progress_bar=None, progress_amount=None
     ):
-        print("note_list", note_list)
-        print("num_cells_map", num_cells_map)
-        print("borders_map", borders_map)
         now_row = start_row
         sum_cells = sum(num_cells_map[0])
+        rows = []
+        self.part_rows.append(rows)
         bef_sound = [None, None]
         mark_idx = 1
         now_measure = 1
@@ -224,7 +366,6 @@ class XlsxWriter(XlsxIOBase):
         for system_idx, notes_in_system in enumerate(
             chunked(note_list, self.num_measures_in_system)
         ):
-            print("system_idx", system_idx)
             num_cells_in_system = num_cells_map[system_idx]
             borders_in_system = borders_map[system_idx]
             beat_idx = 0
@@ -243,78 +384,20 @@ class XlsxWriter(XlsxIOBase):
                 now_row, [now_column, now_column + sum_cells + 1], mark_idx
             )
             self._adjust_cell_height(now_row, now_row)
+            rows.append(now_row)
             now_column += 1
             for notes_in_measure in notes_in_system:
-                merge_cell_nums = []
-                bef_sound_in_measure = None
-                bef_has_note = True
-                for j, notes_in_beat in enumerate(notes_in_measure):
-                    num_cells = num_cells_in_system[beat_idx]
-                    borders = borders_in_system[beat_idx]
-                    print("row, column", now_row, now_column)
-                    print("yes", notes_in_beat, num_cells, borders)
-                    cells_per_notes = num_cells // len(notes_in_beat)
-                    self._plot_beat_border(
-                        now_row,
-                        now_column,
-                        now_row,
-                        now_column + num_cells - 1,
-                        borders,
-                    )
-                    has_note = False
-                    for i, notes in enumerate(notes_in_beat):
-                        if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
-                            continue
-                        if type(notes) != str:
-                            has_note = True
-                            break
-                    for notes in notes_in_beat:
-                        if has_note is True and type(notes) != str and len(notes) != 0:
-                            merge_cell_nums.append(
-                                [(now_row, now_column), (now_row, now_column)]
-                            )
-                            bef_sound_in_measure = notes
-                        elif (
-                            has_note is True
-                            and bef_has_note is True
-                            and notes == "-"
-                            and bef_sound_in_measure is not None
-                        ):
-                            merge_cell_nums[-1][1] = (
-                                now_row,
-                                now_column + cells_per_notes - 1,
-                            )
-                        elif notes == "r":
-                            bef_sound_in_measure = None
-
-                        # 結合セル
-                        self._merge_cells(
-                            now_row,
-                            now_column,
-                            now_row,
-                            now_column + cells_per_notes - 1,
-                        )
-                        width_dict = self._get_cell_widths(
-                            self.ws, now_column, now_column + cells_per_notes - 1
-                        )
-                        # shorten = (
-                        #     True
-                        #     if sum(width_dict.values()) < self.shorten_width
-                        #     else False
-                        # )
-                        shorten = self.shorten
-                        print("width", width_dict)
-                        # 音をプロット
-                        bef_sound = self._plot_sound(
-                            now_row, now_column, notes, bef_sound, shorten
-                        )
-                        now_column += cells_per_notes
-                    bef_has_note = has_note
-                    beat_idx += 1
-                # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
-                if len(merge_cell_nums) > 1:
-                    for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
-                        self._merge_cells(_row1, _col1, _row2, _col2)
+                num_beats = len(notes_in_measure)
+                num_columns, bef_sound = self._plot_measure_with_memo(
+                    now_row,
+                    now_column,
+                    notes_in_measure,
+                    num_cells_in_system[beat_idx:beat_idx + num_beats],
+                    borders_in_system[beat_idx:beat_idx + num_beats],
+                    bef_sound,
+                )
+                now_column += num_columns
+                beat_idx += num_beats
             now_row += 1
 
             if progress_bar:
@@ -333,10 +416,146 @@ class XlsxWriter(XlsxIOBase):
         )
         return now_row
 
+    def _plot_measure_with_memo(
+        self, row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows=1
+    ):
+        """
+        1小節分を書く関数(引数と返り値は_plot_measureと同じ)
+        音・セル数・罫線・直前の音・行数が同じ小節は、前に書いたセルと結合セルをずらして使い回す
+        （max_memo_measuresが0の場合は使い回さずに書く）
+        """
+        if self.max_memo_measures <= 0:
+            return self._plot_measure(
+                row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows
+            )
+        key = self._to_hashable((notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows))
+        measure = self.measure_dict.pop(key, None)
+        if measure is None:
+            # 空のレイアウトに書いておき、同じ小節はそれを位置をずらして貼り付ける
+            sheet_layout = self.layout
+            self.layout = SheetLayout(
+                title=sheet_layout.title,
+                column_dimensions=sheet_layout.column_dimensions,
+                row_dimensions=sheet_layout.row_dimensions,
+                border_sum_dict=sheet_layout.border_sum_dict,
+            )
+            try:
+                num_columns, _bef_sound = self._plot_measure(
+                    row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows
+                )
+                measure = (self.layout, row, column, num_columns, tuple(_bef_sound))
+            finally:
+                self.layout = sheet_layout
+            while len(self.measure_dict) >= self.max_memo_measures:
+                del self.measure_dict[next(iter(self.measure_dict))]
+        self.measure_dict[key] = measure
+        measure_layout, measure_row, measure_column, num_columns, _bef_sound = measure
+        self.layout.paste(measure_layout, row - measure_row, column - measure_column)
+        return num_columns, list(_bef_sound)
+
+    @classmethod
+    def _to_hashable(cls, obj):
+        # 入れ子のリストをタプルにして辞書のキーにできるようにする
+        if isinstance(obj, (list, tuple)):
+            return tuple(cls._to_hashable(o) for o in obj)
+        return obj
+
+    def _plot_measure(
+        self, row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows=1
+    ):
+        """
+        1小節分の罫線・結合セル・音を書く関数
+        
+        Parameters
+        ----------
+        row : int
+            小節の先頭の行番号
+        column : int
+            小節の先頭の列番号
+        notes_in_measure : list
+            拍ごとの音リスト
+        num_cells_list : list of int
+            拍ごとのセル数
+        borders_list : list
+            拍ごとの罫線
+        bef_sound : list
+            直前の音の[音名, オクターブ]
+        num_rows : int, optional
+            小節の行数, by default 1（1行固定では常に1）
+        
+        Returns
+        -------
+        int
+            小節の列数
+        list
+            最後の音の[音名, オクターブ]
+        """
+        now_row = row
+        now_column = column
+        merge_cell_nums = []
+        bef_sound_in_measure = None
+        bef_has_note = True
+        for j, notes_in_beat in enumerate(notes_in_measure):
+            num_cells = num_cells_list[j]
+            borders = borders_list[j]
+            cells_per_notes = num_cells // len(notes_in_beat)
+            self._plot_beat_border(
+                now_row,
+                now_column,
+                now_row,
+                now_column + num_cells - 1,
+                borders,
+            )
+            has_note = False
+            for i, notes in enumerate(notes_in_beat):
+                if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
+                    continue
+                if type(notes) != str:
+                    has_note = True
+                    break
+            for notes in notes_in_beat:
+                if has_note is True and type(notes) != str and len(notes) != 0:
+                    merge_cell_nums.append(
+                        [(now_row, now_column), (now_row, now_column)]
+                    )
+                    bef_sound_in_measure = notes
+                elif (
+                    has_note is True
+                    and bef_has_note is True
+                    and notes == "-"
+                    and bef_sound_in_measure is not None
+                ):
+                    merge_cell_nums[-1][1] = (
+                        now_row,
+                        now_column + cells_per_notes - 1,
+                    )
+                elif notes == "r":
+                    bef_sound_in_measure = None
+
+                # 結合セル
+                self._merge_cells(
+                    now_row,
+                    now_column,
+                    now_row,
+                    now_column + cells_per_notes - 1,
+                )
+                shorten = self.shorten
+                # 音をプロット
+                bef_sound = self._plot_sound(
+                    now_row, now_column, notes, bef_sound, shorten
+                )
+                now_column += cells_per_notes
+            bef_has_note = has_note
+        # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
+        if len(merge_cell_nums) > 1:
+            for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
+                self._merge_cells(_row1, _col1, _row2, _col2)
+        return now_column - column, bef_sound
+
     def _initial_setting(self, sheet):
-        sheet.column_dimensions["A"].width = self._convert_cm2width(self.player_width)
-        sheet.column_dimensions["B"].width = self._convert_cm2width(
-            self.instrument_width
+        sheet.column_dimensions.geometry.set_width(1, self._convert_cm2width(self.player_width))
+        sheet.column_dimensions.geometry.set_width(
+            2, self._convert_cm2width(self.instrument_width)
         )
 
     def _plot_header(self, num_cells, start_column=3):
@@ -351,15 +570,13 @@ class XlsxWriter(XlsxIOBase):
         # セルの幅を取得
         sum_cells = sum(num_cells)
         width_list = sorted(
-            self._get_cell_widths(self.ws, now_col, now_col + sum_cells - 1).items(),
+            self._get_cell_widths(self.layout, now_col, now_col + sum_cells - 1).items(),
             key=lambda x: x[0],
         )
-        print("width_list:", width_list)
 
         # 曲名
-        border = Border(
-            left=self.medium_side, right=self.medium_side,
-            top=self.medium_side, bottom=self.medium_side,
+        border = self._get_border(
+            self.medium_side, self.medium_side, self.medium_side, self.medium_side
         )
         idx = 0
         idx = self._get_next_width_idx(width_list, idx, self.header_width)
@@ -386,7 +603,6 @@ class XlsxWriter(XlsxIOBase):
         self._plot_cell(now_row, now_col, val=str(self.tempo), border=border)
         self._plot_cell(now_row, width_list[idx - 1][0], border=border)
         idx = self._get_next_width_idx(width_list, idx, self.color_width)
-        print("WIDTH_LIST", idx, width_list)
         now_col = width_list[idx][0]
         color_start_idx = idx
 
@@ -507,16 +723,12 @@ class XlsxWriter(XlsxIOBase):
 
     def _plot_marks(self, row, columns, mark_idx):
         for column in columns:
-            column_str = self._convert_column_num(column)
-            self.ws.column_dimensions[column_str].width = self._convert_cm2width(
-                self.mark_width
+            self.layout.column_dimensions.geometry.set_width(
+                column, self._convert_cm2width(self.mark_width)
             )
             val = self._convert_column_num(mark_idx).lower()
-            border = Border(
-                top=self.medium_side,
-                left=self.medium_side,
-                bottom=self.medium_side,
-                right=self.medium_side,
+            border = self._get_border(
+                self.medium_side, self.medium_side, self.medium_side, self.medium_side
             )
             self._plot_cell(row, column, val, self.mark_font, self.mark_align, border)
         return mark_idx + 1
@@ -524,26 +736,17 @@ class XlsxWriter(XlsxIOBase):
     def _plot_beat_border(
         self, start_row, start_column, end_row, end_column, thick_flag
     ):
-        start_cell_str = self._convert_cell_num(start_row, start_column)
-        end_cell_str = self._convert_cell_num(end_row, end_column)
-        print(start_row, start_column, "{}:{}".format(start_cell_str, end_cell_str))
-        for row_cells in self.ws["{}:{}".format(start_cell_str, end_cell_str)]:
-            for idx, cell in enumerate(row_cells):
-                border = Border(
-                    top=self.medium_side,
-                    left=self.non_border_side,
-                    bottom=self.medium_side,
-                    right=self.non_border_side,
+        for row in range(start_row, end_row + 1):
+            for column in range(start_column, end_column + 1):
+                left = self.non_border_side
+                right = self.non_border_side
+                if column == start_column:
+                    left = self._get_flag_side(thick_flag[0], left)
+                if column == end_column:
+                    right = self._get_flag_side(thick_flag[1], right)
+                self.layout.cell(row, column).border = self._get_border(
+                    self.medium_side, self.medium_side, left, right
                 )
-                if idx == 0 and thick_flag[0] == 1:
-                    border.left = self.thin_side
-                elif idx == 0 and thick_flag[0] == 2:
-                    border.left = self.medium_side
-                if idx == len(row_cells) - 1 and thick_flag[1] == 1:
-                    border.right = self.thin_side
-                elif idx == len(row_cells) - 1 and thick_flag[1] == 2:
-                    border.right = self.medium_side
-                cell.border = border
 
     def _plot_measure_nums(
         self, row, column, num_cells_in_system, borders_in_system, start_measure
@@ -565,7 +768,6 @@ class XlsxWriter(XlsxIOBase):
         return num_measure
 
     def _plot_measure_num(self, now_row, now_column, num_measure, merge_cell_num):
-        print(now_row, now_column, merge_cell_num, num_measure)
         self._merge_cells(now_row, now_column, now_row, now_column + merge_cell_num - 1)
         self._plot_cell(
             now_row, now_column, num_measure, self.measure_font, self.measure_align
@@ -575,11 +777,8 @@ class XlsxWriter(XlsxIOBase):
         self, start_row, end_row, start_column, player_idx, instrument_name,
         difficulty=None
     ):
-        border = Border(
-            top=self.medium_side,
-            left=self.medium_side,
-            bottom=self.medium_side,
-            right=self.medium_side,
+        border = self._get_border(
+            self.medium_side, self.medium_side, self.medium_side, self.medium_side
         )
         headers = ["楽器", "奏者"]
         player_str = (
@@ -589,7 +788,6 @@ class XlsxWriter(XlsxIOBase):
         names = [instrument_name, player_str]
         fonts = [self.instrument_font, self.player_font]
         aligns = [self.instrument_align, self.player_align]
-        print(start_row, end_row, start_column, player_idx, instrument_name)
         for i, (header, name, font, align) in enumerate(
             zip(headers, names, fonts, aligns), start=1
         ):
@@ -605,23 +803,49 @@ class XlsxWriter(XlsxIOBase):
     def _plot_cell(
         self, row, col, val=None, font=None, align=None, border=None, fill=None
     ):
-        cell_str = self._convert_cell_num(row, col)
+        spec = self.layout.cell(row, col)
         if val is not None:
-            self.ws[cell_str].value = val
+            spec.value = val
         if font is not None:
-            self.ws[cell_str].font = font
+            spec.font = font
         if align is not None:
-            self.ws[cell_str].alignment = align
+            spec.align = align
         if border is not None:
-            self.ws[cell_str].border = border
+            spec.border = border
         if fill is not None:
-            self.ws[cell_str].fill = fill
+            spec.fill = fill
+
+    def _get_border(self, top, bottom, left, right):
+        """
+        上下左右の罫線の組み合わせごとに一度だけBorderを作って返す関数
+        
+        Parameters
+        ----------
+        top, bottom, left, right : openpyxl.styles.Side
+            上下左右の罫線（このWriterの持つSide）
+        
+        Returns
+        -------
+        openpyxl.styles.Border
+            罫線
+        """
+        border_key = (id(top), id(bottom), id(left), id(right))
+        border = self.border_dict.get(border_key)
+        if border is None:
+            border = Border(top=top, left=left, bottom=bottom, right=right)
+            self.border_dict[border_key] = border
+        return border
+
+    def _get_flag_side(self, flag, default_side):
+        # 拍・小節の区切りのフラグ(1: 拍, 2: 小節)に応じた罫線
+        if flag == 1:
+            return self.thin_side
+        elif flag == 2:
+            return self.medium_side
+        return default_side
 
     def _merge_cells(self, start_row, start_column, end_row, end_column):
-        start_cell_str = self._convert_cell_num(start_row, start_column)
-        end_cell_str = self._convert_cell_num(end_row, end_column)
-        print("merge", start_cell_str, ":", end_cell_str)
-        self.ws.merge_cells("{}:{}".format(start_cell_str, end_cell_str))
+        self.layout.merge_cells(start_row, start_column, end_row, end_column)
 
     def _get_max_beats_in_row(self, rate_lists):
         # 行方向の最大ビート数を得る
@@ -636,27 +860,23 @@ class XlsxWriter(XlsxIOBase):
     def _get_required_num_cells(self, rate_lists):
         num_cells_maps = []
 
-        print(rate_lists)
         for rate_list in rate_lists:
             num_cells_map = []
             for chunked_rates in chunked(rate_list, self.num_measures_in_system):
                 now_beat = 0
                 num_cells_in_beat = [0 for x in range(self.max_num_beats_in_row)]
                 for _, rate_in_beats in chunked_rates:
-                    print(rate_in_beats)
                     for rates in rate_in_beats:
                         num_cells_in_beat[now_beat] = len(rates)
                         now_beat += 1
                 num_cells_map.append(num_cells_in_beat)
             num_cells_maps.append(num_cells_map)
 
-        print(num_cells_maps)
         return num_cells_maps
 
     def _get_borders(self, note_lists):
         borders_maps = []
 
-        print(note_lists)
         for note_list in note_lists:
             borders_map = []
             for notes_in_system in chunked(note_list, self.num_measures_in_system):
@@ -674,7 +894,6 @@ class XlsxWriter(XlsxIOBase):
                 borders_map.append(border_in_beat)
             borders_maps.append(borders_map)
 
-        print(borders_maps)
         return borders_maps
 
     def _adjust_cell_maps(self, num_cells_maps):
@@ -694,30 +913,65 @@ class XlsxWriter(XlsxIOBase):
 
     def _adjust_cell_width(self, num_cells_in_system, start_column=4):
         beat_width = self.score_width / self.max_num_beats_in_row
-        sheet = self.ws
+        sheet = self.layout
         now_column = start_column
         for num_cells in num_cells_in_system:
             cell_width = beat_width / num_cells
             for _ in range(num_cells):
-                column_str = self._convert_column_num(now_column)
-                sheet.column_dimensions[column_str].width = self._convert_cm2width(
-                    cell_width
+                sheet.column_dimensions.geometry.set_width(
+                    now_column, self._convert_cm2width(cell_width)
                 )
                 now_column += 1
 
     def _adjust_cell_height(self, start_row, end_row):
-        sheet = self.ws
+        sheet = self.layout
         for row in range(start_row, end_row + 1):
             sheet.row_dimensions[row].height = self._convert_cm2width(
                 self.score_height
             )
 
+    def start_streaming(self, filename):
+        """
+        add_common_data_listでパートを書くごとに、書き終えた行をxlsxへ書き出してレイアウトから捨てるようにする関数
+        （backendが"raw"の場合のみ。楽譜が長くてもメモリに持つのは書き途中のパートの分だけになる）
+        add_common_data_listの前に呼び、最後にfwriteで残りを書き出して閉じる
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力先のファイル名、もしくはバッファ(BytesIO等)
+        """
+        if self.backend != "raw":
+            print("[WARN] Streaming is only supported by the raw backend")
+            return
+        self.stream_writer = RawXlsxStreamWriter(self.wb, self.layout)
+        self.stream_writer.fopen(filename)
+
     def fwrite(self, filename):
-        self.wb.save(filename)
+        """
+        xlsx（backendが"html"の場合はHTML）を書き出す関数
+        start_streamingで書き出しを始めている場合は、残りを書き出して閉じる（filenameは使わない）
+
+        Parameters
+        ----------
+        filename : str or file-like object
+            出力先のファイル名、もしくはバッファ(BytesIO等)
+        """
+        if self.stream_writer is not None:
+            self.stream_writer.close()
+            self.stream_writer = None
+        elif self.backend == "raw":
+            RawXlsxStreamWriter(self.wb, self.layout).fwrite(filename)
+        elif self.backend == "html":
+            HtmlPreviewWriter(self.layout).fwrite(filename)
+        else:
+            render_worksheet(self.layout, self.ws)
+            self.wb.save(filename)
 
     def calc_LCM(self, num_list):
         """
-        再帰によってリスト内の数値全てにおける最小公倍数を求める関数
+        リスト内の数値全てにおける最小公倍数を求める関数（0は除く）
+        同じ数値は一度だけ計算する（パート数×段数の長いリストになるため）
         
         Parameters
         ----------
@@ -729,12 +983,10 @@ class XlsxWriter(XlsxIOBase):
         int
             最小公倍数
         """
-        _list = sorted(deepcopy(num_list))
-        if len(_list) != 2:
-            biggest_num = _list.pop()
-            return lcm(biggest_num, self.calc_LCM(_list))
-        else:
-            return lcm(_list[1], _list[0])
+        num_lcm = 0
+        for num in sorted(set(num_list)):
+            num_lcm = lcm(num, num_lcm)  # num_lcmが0（最初の数値、もしくは0だけ）の場合はnumになる
+        return num_lcm
 
     def calc_GCD(self, num_list):
         """
@@ -767,9 +1019,6 @@ class ThreeLineXlsxWriter(XlsxWriter):
         self, common_data, note_list, num_cells_map, borders_map,
         start_row, start_column=3, progress_bar=None, progress_amount=None
     ):
-        print("note_list", note_list)
-        print("num_cells_map", num_cells_map)
-        print("borders_map", borders_map)
         now_row = start_row
         sum_cells = sum(num_cells_map[0])
         bef_sound = [None, None]
@@ -782,7 +1031,6 @@ class ThreeLineXlsxWriter(XlsxWriter):
         for system_idx, notes_in_system in enumerate(
             chunked(note_list, self.num_measures_in_system)
         ):
-            print("system_idx", system_idx)
             num_cells_in_system = num_cells_map[system_idx]
             borders_in_system = borders_map[system_idx]
             beat_idx = 0
@@ -805,78 +1053,18 @@ class ThreeLineXlsxWriter(XlsxWriter):
             self._adjust_cell_height(now_row, now_row + 2)
             now_column += 1
             for notes_in_measure in notes_in_system:
-                merge_cell_nums = []
-                bef_sound_in_measure = None
-                bef_has_note = True
-                for j, notes_in_beat in enumerate(notes_in_measure):
-                    num_cells = num_cells_in_system[beat_idx]
-                    borders = borders_in_system[beat_idx]
-                    print("row, column", now_row, now_column)
-                    print("yes", notes_in_beat, num_cells, borders)
-                    cells_per_notes = num_cells // len(notes_in_beat)
-                    self._plot_beat_border(
-                        now_row,
-                        now_column,
-                        now_row + 2,
-                        now_column + num_cells - 1,
-                        borders,
-                    )
-                    has_note = False
-                    for i, notes in enumerate(notes_in_beat):
-                        if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
-                            continue
-                        if type(notes) != str:
-                            has_note = True
-                            break
-                    for notes in notes_in_beat:
-                        if has_note is True and type(notes) != str and len(notes) != 0:
-                            merge_cell_nums.append(
-                                [(now_row, now_column), (now_row + 2, now_column)]
-                            )
-                            bef_sound_in_measure = notes
-                        elif (
-                            has_note is True
-                            and bef_has_note is True
-                            and notes == "-"
-                            and bef_sound_in_measure is not None
-                        ):
-                            merge_cell_nums[-1][1] = (
-                                now_row + 2,
-                                now_column + cells_per_notes - 1,
-                            )
-                        elif notes == "r":
-                            bef_sound_in_measure = None
-
-                        # 結合セル
-                        for _row in range(now_row, now_row + 3):
-                            self._merge_cells(
-                                _row,
-                                now_column,
-                                _row,
-                                now_column + cells_per_notes - 1,
-                            )
-                        width_dict = self._get_cell_widths(
-                            self.ws, now_column, now_column + cells_per_notes - 1
-                        )
-                        shorten = self.shorten
-                        # shorten = (
-                        #     True
-                        #     if sum(width_dict.values()) < self.shorten_width
-                        #     else False
-                        # )
-                        print("width", width_dict)
-                        # 音をプロット
-                        bef_sound = self._plot_sound(
-                            now_row, now_column, notes, bef_sound, shorten
-                        )
-                        now_column += cells_per_notes
-                    bef_has_note = has_note
-                    beat_idx += 1
-                # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
-                if len(merge_cell_nums) > 1:
-                    for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
-                        for _row in range(_row1, _row2 + 1):
-                            self._merge_cells(_row, _col1, _row, _col2)
+                num_beats = len(notes_in_measure)
+                num_columns, bef_sound = self._plot_measure_with_memo(
+                    now_row,
+                    now_column,
+                    notes_in_measure,
+                    num_cells_in_system[beat_idx:beat_idx + num_beats],
+                    borders_in_system[beat_idx:beat_idx + num_beats],
+                    bef_sound,
+                    num_rows=3,
+                )
+                now_column += num_columns
+                beat_idx += num_beats
             now_row += 3
 
             if progress_bar:
@@ -915,51 +1103,131 @@ class ThreeLineXlsxWriter(XlsxWriter):
         """
         for column in columns:
             for row in range(rows[0], rows[1] + 1):
-                column_str = self._convert_column_num(column)
-                self.ws.column_dimensions[column_str].width = self._convert_cm2width(
-                    self.mark_width
+                self.layout.column_dimensions.geometry.set_width(
+                    column, self._convert_cm2width(self.mark_width)
                 )
                 val = self._convert_column_num(mark_idx).lower()
-                border = Border(
-                    top=self.medium_side,
-                    left=self.medium_side,
-                    bottom=self.medium_side,
-                    right=self.medium_side,
+                border = self._get_border(
+                    self.medium_side, self.medium_side, self.medium_side, self.medium_side
                 )
                 self._plot_cell(row, column, val, self.mark_font, self.mark_align, border)
             self._merge_cells(rows[0], column, rows[1], column)
         return mark_idx + 1
 
+    def _plot_measure(
+        self, row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows=3
+    ):
+        """
+        1小節分の罫線・結合セル・音を書く関数
+        
+        Parameters
+        ----------
+        row : int
+            小節の先頭の行番号
+        column : int
+            小節の先頭の列番号
+        notes_in_measure : list
+            拍ごとの音リスト
+        num_cells_list : list of int
+            拍ごとのセル数
+        borders_list : list
+            拍ごとの罫線
+        bef_sound : list
+            直前の音の[音名, オクターブ]
+        num_rows : int, optional
+            小節の行数, by default 3
+        
+        Returns
+        -------
+        int
+            小節の列数
+        list
+            最後の音の[音名, オクターブ]
+        """
+        now_row = row
+        now_column = column
+        merge_cell_nums = []
+        bef_sound_in_measure = None
+        bef_has_note = True
+        for j, notes_in_beat in enumerate(notes_in_measure):
+            num_cells = num_cells_list[j]
+            borders = borders_list[j]
+            cells_per_notes = num_cells // len(notes_in_beat)
+            self._plot_beat_border(
+                now_row,
+                now_column,
+                now_row + num_rows - 1,
+                now_column + num_cells - 1,
+                borders,
+            )
+            has_note = False
+            for i, notes in enumerate(notes_in_beat):
+                if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
+                    continue
+                if type(notes) != str:
+                    has_note = True
+                    break
+            for notes in notes_in_beat:
+                if has_note is True and type(notes) != str and len(notes) != 0:
+                    merge_cell_nums.append(
+                        [(now_row, now_column), (now_row + num_rows - 1, now_column)]
+                    )
+                    bef_sound_in_measure = notes
+                elif (
+                    has_note is True
+                    and bef_has_note is True
+                    and notes == "-"
+                    and bef_sound_in_measure is not None
+                ):
+                    merge_cell_nums[-1][1] = (
+                        now_row + num_rows - 1,
+                        now_column + cells_per_notes - 1,
+                    )
+                elif notes == "r":
+                    bef_sound_in_measure = None
+
+                # 結合セル
+                for _row in range(now_row, now_row + num_rows):
+                    self._merge_cells(
+                        _row,
+                        now_column,
+                        _row,
+                        now_column + cells_per_notes - 1,
+                    )
+                shorten = self.shorten
+                # 音をプロット
+                bef_sound = self._plot_sound(
+                    now_row, now_column, notes, bef_sound, shorten
+                )
+                now_column += cells_per_notes
+            bef_has_note = has_note
+        # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
+        if len(merge_cell_nums) > 1:
+            for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
+                for _row in range(_row1, _row2 + 1):
+                    self._merge_cells(_row, _col1, _row, _col2)
+        return now_column - column, bef_sound
+
     def _plot_beat_border(
         self, start_row, start_column, end_row, end_column, thick_flag
     ):
         for row in range(start_row, end_row + 1):
-            start_cell_str = self._convert_cell_num(row, start_column)
-            end_cell_str = self._convert_cell_num(row, end_column)
-            print(start_row, start_column, "{}:{}".format(start_cell_str, end_cell_str))
-            for row_cells in self.ws["{}:{}".format(start_cell_str, end_cell_str)]:
-                for idx, cell in enumerate(row_cells):
-                    border = Border(
-                        top=self.non_border_side,
-                        left=self.non_border_side,
-                        bottom=self.non_border_side,
-                        right=self.non_border_side,
-                    )
-                    if row == start_row:
-                        border.top = self.medium_side
-                        border.bottom = self.thin_side
-                    if row == end_row:
-                        border.top = self.thin_side
-                        border.bottom = self.medium_side
-                    if idx == 0 and thick_flag[0] == 1:
-                        border.left = self.thin_side
-                    elif idx == 0 and thick_flag[0] == 2:
-                        border.left = self.medium_side
-                    if idx == len(row_cells) - 1 and thick_flag[1] == 1:
-                        border.right = self.thin_side
-                    elif idx == len(row_cells) - 1 and thick_flag[1] == 2:
-                        border.right = self.medium_side
-                    cell.border = border
+            top = self.non_border_side
+            bottom = self.non_border_side
+            if row == start_row:
+                top = self.medium_side
+                bottom = self.thin_side
+            if row == end_row:
+                top = self.thin_side
+                bottom = self.medium_side
+            for column in range(start_column, end_column + 1):
+                left = self.non_border_side
+                right = self.non_border_side
+                if column == start_column:
+                    left = self._get_flag_side(thick_flag[0], left)
+                if column == end_column:
+                    right = self._get_flag_side(thick_flag[1], right)
+                self.layout.cell(row, column).border = self._get_border(top, bottom, left, right)
 
     def _plot_sound(self, row, column, notes, bef_sound, shorten=False):
         # まずは休符を書く
@@ -1017,9 +1285,6 @@ class FlexibleLineXlsxWriter(ThreeLineXlsxWriter):
         self, common_data, note_list, num_cells_map, borders_map,
         start_row, start_column=3, progress_bar=None, progress_amount=None
     ):
-        print("note_list", note_list)
-        print("num_cells_map", num_cells_map)
-        print("borders_map", borders_map)
         now_row = start_row
         sum_cells = sum(num_cells_map[0])
         bef_sound = [None, None]
@@ -1038,8 +1303,6 @@ class FlexibleLineXlsxWriter(ThreeLineXlsxWriter):
                 for notes_in_beat in notes_in_measure
                 for notes in notes_in_beat if type(notes) is list
             ])
-            print("system_idx", system_idx)
-            print("num_rows", num_rows)
             num_cells_in_system = num_cells_map[system_idx]
             borders_in_system = borders_map[system_idx]
             beat_idx = 0
@@ -1062,77 +1325,18 @@ class FlexibleLineXlsxWriter(ThreeLineXlsxWriter):
             self._adjust_cell_height(now_row, now_row + num_rows)
             now_column += 1
             for notes_in_measure in notes_in_system:
-                merge_cell_nums = []
-                bef_sound_in_measure = None
-                bef_has_note = True
-                for j, notes_in_beat in enumerate(notes_in_measure):
-                    num_cells = num_cells_in_system[beat_idx]
-                    borders = borders_in_system[beat_idx]
-                    print("row, column", now_row, now_column)
-                    print("yes", notes_in_beat, num_cells, borders)
-                    cells_per_notes = num_cells // len(notes_in_beat)
-                    self._plot_beat_border(
-                        now_row,
-                        now_column,
-                        now_row + num_rows - 1,
-                        now_column + num_cells - 1,
-                        borders,
-                    )
-                    has_note = False
-                    for i, notes in enumerate(notes_in_beat):
-                        if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
-                            continue
-                        if type(notes) != str:
-                            has_note = True
-                            break
-                    for notes in notes_in_beat:
-                        if has_note is True and type(notes) != str and len(notes) != 0:
-                            merge_cell_nums.append(
-                                [(now_row, now_column), (now_row + num_rows - 1, now_column)]
-                            )
-                            bef_sound_in_measure = notes
-                        elif (
-                            has_note is True
-                            and bef_has_note is True
-                            and notes == "-"
-                            and bef_sound_in_measure is not None
-                        ):
-                            merge_cell_nums[-1][1] = (
-                                now_row + num_rows - 1,
-                                now_column + cells_per_notes - 1,
-                            )
-                        elif notes == "r":
-                            bef_sound_in_measure = None
-
-                        # 結合セル
-                        for _row in range(now_row, now_row + num_rows):
-                            self._merge_cells(
-                                _row,
-                                now_column,
-                                _row,
-                                now_column + cells_per_notes - 1,
-                            )
-                        width_dict = self._get_cell_widths(
-                            self.ws, now_column, now_column + cells_per_notes - 1
-                        )
-                        shorten = self.shorten
-                        # shorten = (
-                        #     True
-                        #     if sum(width_dict.values()) < self.shorten_width
-                        #     else False
-                        # )
-                        # 音をプロット
-                        bef_sound = self._plot_sound(
-                            now_row, now_column, notes, bef_sound, num_rows, shorten
-                        )
-                        now_column += cells_per_notes
-                    bef_has_note = has_note
-                    beat_idx += 1
-                # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
-                if len(merge_cell_nums) > 1:
-                    for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
-                        for _row in range(_row1, _row2 + 1):
-                            self._merge_cells(_row, _col1, _row, _col2)
+                num_beats = len(notes_in_measure)
+                num_columns, bef_sound = self._plot_measure_with_memo(
+                    now_row,
+                    now_column,
+                    notes_in_measure,
+                    num_cells_in_system[beat_idx:beat_idx + num_beats],
+                    borders_in_system[beat_idx:beat_idx + num_beats],
+                    bef_sound,
+                    num_rows=num_rows,
+                )
+                now_column += num_columns
+                beat_idx += num_beats
             now_row += num_rows
 
             if progress_bar:
@@ -1151,38 +1355,114 @@ class FlexibleLineXlsxWriter(ThreeLineXlsxWriter):
         )
         return now_row
 
+    def _plot_measure(
+        self, row, column, notes_in_measure, num_cells_list, borders_list, bef_sound, num_rows=1
+    ):
+        """
+        1小節分の罫線・結合セル・音を書く関数
+        
+        Parameters
+        ----------
+        row : int
+            小節の先頭の行番号
+        column : int
+            小節の先頭の列番号
+        notes_in_measure : list
+            拍ごとの音リスト
+        num_cells_list : list of int
+            拍ごとのセル数
+        borders_list : list
+            拍ごとの罫線
+        bef_sound : list
+            直前の音の[音名, オクターブ]
+        num_rows : int, optional
+            小節の行数, by default 1
+        
+        Returns
+        -------
+        int
+            小節の列数
+        list
+            最後の音の[音名, オクターブ]
+        """
+        now_row = row
+        now_column = column
+        merge_cell_nums = []
+        bef_sound_in_measure = None
+        bef_has_note = True
+        for j, notes_in_beat in enumerate(notes_in_measure):
+            num_cells = num_cells_list[j]
+            borders = borders_list[j]
+            cells_per_notes = num_cells // len(notes_in_beat)
+            self._plot_beat_border(
+                now_row,
+                now_column,
+                now_row + num_rows - 1,
+                now_column + num_cells - 1,
+                borders,
+            )
+            has_note = False
+            for i, notes in enumerate(notes_in_beat):
+                if i == 0 and j != 0 and j != len(notes_in_measure) // 2:
+                    continue
+                if type(notes) != str:
+                    has_note = True
+                    break
+            for notes in notes_in_beat:
+                if has_note is True and type(notes) != str and len(notes) != 0:
+                    merge_cell_nums.append(
+                        [(now_row, now_column), (now_row + num_rows - 1, now_column)]
+                    )
+                    bef_sound_in_measure = notes
+                elif (
+                    has_note is True
+                    and bef_has_note is True
+                    and notes == "-"
+                    and bef_sound_in_measure is not None
+                ):
+                    merge_cell_nums[-1][1] = (
+                        now_row + num_rows - 1,
+                        now_column + cells_per_notes - 1,
+                    )
+                elif notes == "r":
+                    bef_sound_in_measure = None
+
+                # 結合セル
+                for _row in range(now_row, now_row + num_rows):
+                    self._merge_cells(
+                        _row,
+                        now_column,
+                        _row,
+                        now_column + cells_per_notes - 1,
+                    )
+                shorten = self.shorten
+                # 音をプロット
+                bef_sound = self._plot_sound(
+                    now_row, now_column, notes, bef_sound, num_rows, shorten
+                )
+                now_column += cells_per_notes
+            bef_has_note = has_note
+        # 伸ばすセルは結合（拍を超えていても結合、小節を挟んだ場合は結合しない）
+        if len(merge_cell_nums) > 1:
+            for (_row1, _col1), (_row2, _col2) in merge_cell_nums:
+                for _row in range(_row1, _row2 + 1):
+                    self._merge_cells(_row, _col1, _row, _col2)
+        return now_column - column, bef_sound
+
     def _plot_beat_border(
         self, start_row, start_column, end_row, end_column, thick_flag
     ):
         for row in range(start_row, end_row + 1):
-            start_cell_str = self._convert_cell_num(row, start_column)
-            end_cell_str = self._convert_cell_num(row, end_column)
-            print(start_row, start_column, "{}:{}".format(start_cell_str, end_cell_str))
-            for row_cells in self.ws["{}:{}".format(start_cell_str, end_cell_str)]:
-                for idx, cell in enumerate(row_cells):
-                    border = Border(
-                        top=self.non_border_side,
-                        left=self.non_border_side,
-                        bottom=self.non_border_side,
-                        right=self.non_border_side,
-                    )
-                    if row == start_row:
-                        border.top = self.medium_side
-                    else:
-                        border.top = self.thin_side
-                    if row == end_row:
-                        border.bottom = self.medium_side
-                    else:
-                        border.bottom = self.thin_side
-                    if idx == 0 and thick_flag[0] == 1:
-                        border.left = self.thin_side
-                    elif idx == 0 and thick_flag[0] == 2:
-                        border.left = self.medium_side
-                    if idx == len(row_cells) - 1 and thick_flag[1] == 1:
-                        border.right = self.thin_side
-                    elif idx == len(row_cells) - 1 and thick_flag[1] == 2:
-                        border.right = self.medium_side
-                    cell.border = border
+            top = self.medium_side if row == start_row else self.thin_side
+            bottom = self.medium_side if row == end_row else self.thin_side
+            for column in range(start_column, end_column + 1):
+                left = self.non_border_side
+                right = self.non_border_side
+                if column == start_column:
+                    left = self._get_flag_side(thick_flag[0], left)
+                if column == end_column:
+                    right = self._get_flag_side(thick_flag[1], right)
+                self.layout.cell(row, column).border = self._get_border(top, bottom, left, right)
 
     def _plot_sound(self, row, column, notes, bef_sound, num_rows=1, shorten=False):
         # まずは休符を書く
@@ -1267,3 +1547,28 @@ def gcd(a, b):
         a %= b
 
     return b
+
+
+_worker_writer = None  # ワーカープロセスごとに作ったXlsxWriter（ワークブックは持たない）
+
+
+def _init_worker_writer(writer_class, state, title, column_dimensions):
+    global _worker_writer
+    _worker_writer = writer_class.__new__(writer_class)
+    _worker_writer.__dict__.update(state)
+    _worker_writer.layout = SheetLayout(title=title, column_dimensions=column_dimensions)
+    _worker_writer.part_layouts = []
+    _worker_writer.part_rows = []
+
+
+def _get_part_layout_in_worker(job):
+    # パートごとに行の高さを分けるため、シートのレイアウトは列幅と足した罫線だけ引き継いで作り直す
+    _worker_writer.layout = SheetLayout(
+        title=_worker_writer.layout.title,
+        column_dimensions=_worker_writer.layout.column_dimensions,
+        border_sum_dict=_worker_writer.layout.border_sum_dict,
+    )
+    num_part_rows = len(_worker_writer.part_rows)
+    *args, start_row, start_column = job
+    part_layout, end_row = _worker_writer._get_part_layout(*args, start_row, start_column=start_column)
+    return part_layout, end_row, _worker_writer.part_rows[num_part_rows:]
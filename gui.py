@@ -276,6 +276,24 @@ class LeftFrame(FrameBase):
             self.key_dict = key_dict
             self.pitch_dict = pitch_dict
 
+    def _auto_assign(self, unique=False):
+        self.add_msg("楽器自動割当中...")
+        try:
+            program_dict = self.m2x_converter.auto_assign(unique=unique)
+            self.add_msg("楽器自動割当成功")
+            for channel_num, program_str in sorted(
+                program_dict.items(), key=lambda x: x[0]
+            ):
+                self.add_msg(
+                    "    [channel{:02d}] {}".format(channel_num + 1, program_str)
+                )
+        except:
+            import traceback
+            traceback.print_exc()
+            self.add_msg("Error: 楽器自動割当失敗")
+            return None
+        return program_dict
+
     def _get_on_dict(self):
         on_dict = {}
         print(self.program_dict.items())
@@ -667,6 +685,26 @@ class ConfFrame(LabelFrameBase):
         )
         self.update_btn.pack(side="left", padx=5)
 
+        # 楽器自動割当ボタン
+        self.assign_btn = tk.Button(self.conf_btn_frm)
+        self.assign_btn.configure(
+            text="楽器自動割当",
+            state="disabled",
+            command=self.auto_assign,
+            font=("ms gothic", 9),
+        )
+        self.assign_btn.pack(side="left", padx=5)
+        self.unique_chkbox_var = tk.BooleanVar()
+        self.unique_chkbox = tk.Checkbutton(self.conf_btn_frm)
+        self.unique_chkbox.configure(
+            text="楽器の重複なし",
+            variable=self.unique_chkbox_var,
+            state="disabled",
+            bg=self.bg,
+            font=("ms gothic", 9),
+        )
+        self.unique_chkbox.pack(side="left", padx=5)
+
     def state_on(self, key_idx=0, on_dict={i: [1, 1] for i in range(16)}, ):
         print("ON_DICT:", on_dict)
         self.key_combo.configure(state="readonly")
@@ -691,6 +729,8 @@ class ConfFrame(LabelFrameBase):
                 self.drum_combo_list[i].current(0)
         self.estimate_btn.configure(state="normal")
         self.update_btn.configure(state="normal")
+        self.assign_btn.configure(state="normal")
+        self.unique_chkbox.configure(state="normal")
         self.advanced_setting_ent.configure(state="normal")
 
     def state_off(self):
@@ -716,6 +756,9 @@ class ConfFrame(LabelFrameBase):
             self.drum_combo_list[i].current(0)
         self.estimate_btn.configure(state="disabled")
         self.update_btn.configure(state="disabled")
+        self.assign_btn.configure(state="disabled")
+        self.unique_chkbox.configure(state="disabled")
+        self.unique_chkbox_var.set(False)
         self.advanced_setting_ent.configure(state="disabled")
 
     def estimate(self):
@@ -733,6 +776,17 @@ class ConfFrame(LabelFrameBase):
                 program_dict[i].append(program_str)
         self.master.conf_state_on(program_dict)
 
+    def auto_assign(self):
+        program_dict = self.master._auto_assign(unique=self.unique_chkbox_var.get())
+        if program_dict is None:
+            return
+        for i in range(16):
+            if i != 9 and self.chkbox_var_list[i].get() is False:
+                program_dict.pop(i, None)
+        if 9 in self.master.program_dict.keys():
+            program_dict[9] = self.master.program_dict[9]
+        self.master.conf_state_on(program_dict)
+
     def update(self):
         key = self.key_combo.get()
         key_dict = {1: key}
@@ -1,7 +1,11 @@
 # coding: utf-8
+from io import BytesIO
 from os import makedirs
 
 from dataset.midi.loader import MidiLoader
+from dataset.midi.writer import MidiWriter
+from dataset.instrument_assigner import InstrumentAssigner
+from dataset.xlsx.loader import XlsxLoader
 from dataset.xlsx.writer import XlsxWriter
 from dataset.xlsx.writer import ThreeLineXlsxWriter
 from dataset.xlsx.writer import FlexibleLineXlsxWriter
@@ -19,7 +23,7 @@ class Mid2XlsxConverter(object):
     def get_rhythm_dict(self):
         return self.common_data_list[0].get_rhythm_dict()
 
-    def fopen(self, filename):
+    def fopen(self, filename, auto_assign=False, unique=False):
         self.midi_data = MidiLoader(filename)
         self.common_data_list = self.midi_data.get_common_data_list()
 
@@ -33,6 +37,32 @@ class Mid2XlsxConverter(object):
                 if channel_num not in ret_dict:
                     ret_dict[channel_num] = []
                 ret_dict[channel_num].append(common_data.get_program_str())
+        if auto_assign:
+            ret_dict.update(self.auto_assign(unique=unique))
+        return ret_dict
+
+    def auto_assign(self, unique=False):
+        """
+        音域からチャネルごとのFF14の楽器を自動で割り当てる関数（ドラムは除く）
+
+        Parameters
+        ----------
+        unique : bool, optional
+            同じ楽器を重複して割り当てないかどうか, by default False
+
+        Returns
+        -------
+        dict of {int: str}
+            チャネル番号をキー、楽器名を値とする辞書
+        """
+        common_data_list = [
+            common_data for common_data in self.common_data_list
+            if common_data.get_channel_num() != 9
+        ]
+        program_strs = InstrumentAssigner().assign(common_data_list, unique=unique)
+        ret_dict = {}
+        for common_data, program_str in zip(common_data_list, program_strs):
+            ret_dict[common_data.get_channel_num()] = program_str
         return ret_dict
 
     def key_estimate(self):
@@ -141,17 +171,10 @@ class Mid2XlsxConverter(object):
         
     def fwrite(
         self, filename, title_name, on_list=None, style="1行固定", shorten=False,
-        start_measure_num=1, num_measures_in_system=4, score_width=29.76, progress_bar=None
+        start_measure_num=1, num_measures_in_system=4, score_width=29.76, progress_bar=None,
+        backend="openpyxl", max_workers=1, max_memo_measures=0,
     ):
-        _common_data_list = []
-        if on_list is not None:
-            for common_data in self.common_data_list:
-                channel_num = common_data.get_channel_num()
-                if channel_num not in on_list:
-                    continue
-                _common_data_list.append(common_data)
-        else:
-            _common_data_list = self.common_data_list
+        _common_data_list = self._get_on_common_data_list(on_list)
 
         # エクセル化する
         title = title_name if title_name != "" else "test"
@@ -168,10 +191,105 @@ class Mid2XlsxConverter(object):
             num_measures_in_system=num_measures_in_system,
             score_width=score_width,
             shorten=shorten,
+            backend=backend,
+            max_memo_measures=max_memo_measures,
+        )
+        if backend == "raw":
+            # パートを書くごとに書き出し、楽譜が長くてもレイアウトを全て持たないようにする
+            self.xlsx_data.start_streaming(filename)
+        self.xlsx_data.add_common_data_list(
+            _common_data_list, progress_bar=progress_bar, max_workers=max_workers
         )
-        self.xlsx_data.add_common_data_list(_common_data_list, progress_bar=progress_bar)
         self.xlsx_data.fwrite(filename)
 
+    def roundtrip(
+        self, on_list=None, shorten=False, start_measure_num=1,
+        num_measures_in_system=4, score_width=29.76
+    ):
+        """
+        mid→xlsx→midの往復変換をファイルを介さずにメモリ上で行う関数（1行固定のみ）
+
+        Parameters
+        ----------
+        on_list : list of int, optional
+            変換するチャネル番号のリスト, by default None（全チャネル）
+        shorten : bool, optional
+            音名を半角にするかどうか, by default False
+        start_measure_num : int, optional
+            何小節目から変換するか, by default 1
+        num_measures_in_system : int, optional
+            1段に記譜する小節数, by default 4
+        score_width : float, optional
+            楽譜欄のセル横幅合計, by default 29.76
+
+        Returns
+        -------
+        bytes
+            xlsxから再変換したmidiのバイト列
+        """
+        buffer = BytesIO()
+        self.fwrite(
+            buffer, "roundtrip", on_list=on_list, style="1行固定", shorten=shorten,
+            start_measure_num=start_measure_num,
+            num_measures_in_system=num_measures_in_system, score_width=score_width,
+        )
+        xlsx_data = XlsxLoader(buffer.getvalue())
+        sheet_name = xlsx_data.get_sheetnames()[0]
+        start_col, end_col = self.xlsx_data.score_columns
+        midi_data = MidiWriter(tempo=self.get_tempo(), rhythm_dict=self.get_rhythm_dict())
+        for common_data, row_list in zip(self._get_on_common_data_list(on_list), self.xlsx_data.part_rows):
+            sound_list, rate_list = xlsx_data.get_sound_list(
+                sheet_name,
+                xlsx_data._convert_column_num(start_col),
+                xlsx_data._convert_column_num(end_col),
+                row_list,
+            )
+            midi_data.add_sound_list(sound_list, rate_list, program=common_data.get_program_str())
+        return midi_data.get_bytes()
+
+    def fwrite_minus_one(self, filename_format, on_list=None, tempos=None, solo=False):
+        """
+        パートごとに、そのパートを抜いたmidi（マイナスワン）を出力する関数
+        fwriteと同じく、fopenとupdateで音名に変換した後に呼ぶ
+
+        Parameters
+        ----------
+        filename_format : str
+            出力ファイル名のフォーマット（MidiWriter.fwrite_minus_oneを参照）
+        on_list : list of int, optional
+            出力するチャネル番号のリスト, by default None（全チャネル）
+        tempos : list of int, optional
+            テンポのリスト, by default None（元のテンポのみ）
+        solo : bool, optional
+            そのパートだけのmidiも出力するかどうか, by default False
+
+        Returns
+        -------
+        list of str
+            出力ファイル名のリスト
+
+        Raises
+        ------
+        ValueError
+            fopenとupdateの前に呼んだ場合
+        """
+        if self.common_data_list is None or any(
+            common_data.note_list is None for common_data in self.common_data_list
+        ):
+            raise ValueError("fwrite_minus_one must be called after fopen and update")
+        midi_data = MidiWriter(tempo=self.get_tempo(), rhythm_dict=self.get_rhythm_dict())
+        for common_data in self._get_on_common_data_list(on_list):
+            midi_data.add_common_data(common_data)
+        return midi_data.fwrite_minus_one(filename_format, tempos=tempos, solo=solo)
+
+    def _get_on_common_data_list(self, on_list):
+        if on_list is None:
+            return self.common_data_list
+        return [
+            common_data for common_data in self.common_data_list
+            if common_data.get_channel_num() in on_list
+        ]
+
 
 if __name__ == "__main__":
     converter = Mid2XlsxConverter()
@@ -0,0 +1,60 @@
+# coding: utf-8
+import sys
+from os import listdir
+from os.path import isdir, join
+from argparse import ArgumentParser
+from dataset.midi.differ import MidiDiffer
+
+
+def parse_args():
+    parser = ArgumentParser(description="2つのmidiをノート単位で比較するツール（往復変換の確認用）")
+    parser.add_argument(
+        "midi_a", type=str,
+        help="基準とするmidiのファイル名（ディレクトリの場合は同名のファイル同士を比較）"
+    )
+    parser.add_argument(
+        "midi_b", type=str,
+        help="比較するmidiのファイル名（ディレクトリの場合は同名のファイル同士を比較）"
+    )
+    parser.add_argument(
+        "--tol", "--tolerance", dest="tolerance", type=int, default=0,
+        help="ずれとみなす開始tickの差の最大値"
+    )
+    parser.add_argument(
+        "--ic", "--ignore_channel", dest="ignore_channel", action="store_true",
+        help="チャネルの違いを無視する"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    differ = MidiDiffer(tolerance=args.tolerance, ignore_channel=args.ignore_channel)
+    if isdir(args.midi_a) and isdir(args.midi_b):
+        filenames = sorted(
+            filename for filename in listdir(args.midi_a)
+            if filename.lower().endswith((".mid", ".midi"))
+        )
+        pairs = [(join(args.midi_a, f), join(args.midi_b, f)) for f in filenames]
+    else:
+        pairs = [(args.midi_a, args.midi_b)]
+
+    num_failed = 0
+    for midi_a, midi_b in pairs:
+        try:
+            diff = differ.diff(midi_a, midi_b)
+        except (OSError, ValueError) as e:
+            print("NG {}: {}".format(midi_a, e))
+            num_failed += 1
+            continue
+        if len(diff) == 0:
+            print("OK {}".format(midi_a))
+            continue
+        num_failed += 1
+        print("NG {} ({} measures)".format(midi_a, len(diff)))
+        differ.pprint(diff)
+    return 1 if num_failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+from io import BytesIO
+import random
+import pytest
+from mid2xlsx import Mid2XlsxConverter
+from dataset.midi.writer import MidiWriter
+
+
+# ランダムな音のmidiを変換したxlsxのバイト列と、書いたライター（score_columns, part_rowsを使う）を返す
+# 楽譜の書き方はindirectのパラメータで指定する（指定しない場合は"1行固定"）
+@pytest.fixture
+def score_xlsx(tmp_path, request):
+    style = getattr(request, "param", "1行固定")
+    rand = random.Random(1)
+    writer = MidiWriter(tempo=100, rhythm_dict={1: (4, 4)})
+    for program in ["フルート", "チェロ", "ハープ"]:
+        sound_list = [
+            [[[rand.choice(["C", "D", "E", "G", "A", "r", "-"])] for _ in range(rand.choice([1, 2]))] for _ in range(4)]
+            for _ in range(8)
+        ]
+        writer.add_sound_list(sound_list, program=program)
+    writer.fwrite(str(tmp_path / "test.mid"))
+    converter = Mid2XlsxConverter()
+    program_dict = converter.fopen(str(tmp_path / "test.mid"))
+    key_dict = converter.key_estimate()
+    pitch_dict = converter.pitch_estimate()
+    program_dict, key_dict, pitch_dict = converter.update(program_dict, key_dict, pitch_dict, style=style)
+    buffer = BytesIO()
+    converter.fwrite(buffer, "test", on_list=list(program_dict.keys()), style=style)
+    return buffer.getvalue(), converter.xlsx_data
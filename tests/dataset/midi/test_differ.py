@@ -0,0 +1,71 @@
+from io import BytesIO
+from mido import Message, MetaMessage, MidiFile, MidiTrack
+from dataset.midi.differ import MeasureCounter, MidiDiffer, extract_notes
+from dataset.midi.writer import MidiWriter
+
+
+def _create_midi_bytes(sound_list, program="ハープ"):
+    writer = MidiWriter(tempo=120, rhythm_dict={1: (4, 4), 3: (3, 4)})
+    writer.add_sound_list(sound_list, program=program)
+    return writer.get_bytes()
+
+
+SOUND_LIST = [
+    [[["C"]], [["D"]], [["E"]], [["F"]]],
+    [[["G"]], [["-"]], [["r"]], [["C"]]],
+    [[["C"]], [["D"]], [["E"]]],
+]
+
+
+# ノートはmidoで読んだ場合と一致する
+def test_ノートはmidoで読んだ場合と一致する():
+    track = MidiTrack()
+    track.append(MetaMessage("time_signature", numerator=3, denominator=4, time=0))
+    track.append(Message("note_on", channel=2, note=60, velocity=90, time=10))
+    track.append(Message("note_on", channel=2, note=64, velocity=90, time=0))  # ランニングステータス
+    track.append(Message("note_on", channel=2, note=60, velocity=0, time=200))  # velocity 0はoff
+    track.append(Message("program_change", channel=2, program=3, time=0))
+    track.append(Message("note_off", channel=2, note=64, velocity=0, time=20000))
+    mid = MidiFile(type=1, ticks_per_beat=480)
+    mid.tracks.append(track)
+    buffer = BytesIO()
+    mid.save(file=buffer)
+    notes, ticks_per_beat, time_signatures = extract_notes(buffer.getvalue())
+    assert notes == [(10, 60, 200, 2), (10, 64, 20200, 2)]
+    assert ticks_per_beat == 480
+    assert time_signatures == [(0, 3, 4)]
+
+
+def test_小節番号は拍子の変化に従う():
+    counter = MeasureCounter(480, [(0, 4, 4), (1920 * 2, 3, 4)])
+    assert [counter.get_measure_num(t) for t in [0, 1919, 1920, 3840, 5279, 5280]] == [1, 1, 2, 3, 3, 4]
+
+
+def test_同じmidiは差分なし():
+    data = _create_midi_bytes(SOUND_LIST)
+    assert MidiDiffer().diff(data, data) == {}
+
+
+# 欠けた音・余分な音・ずれた音を小節ごとに報告する
+def test_欠けた音と余分な音とずれた音を小節ごとに報告する():
+    changed = [
+        [[["C"]], [["D"]], [["E"]], [["F"]]],
+        [[["G"]], [["r"]], [["r"]], [["C"]]],  # Gが短くなる
+        [[["C"]], [["r"]], [["E", "G"]]],  # Dが消え、Gが増える
+    ]
+    diff = MidiDiffer().diff(_create_midi_bytes(SOUND_LIST), _create_midi_bytes(changed))
+    assert list(diff.keys()) == [2, 3]
+    assert diff[2]["shifted"] == [((1920, 67, 960, 0), (1920, 67, 480, 0))]
+    assert diff[3]["missing"] == [(3840 + 480, 62, 480, 0)]
+    assert diff[3]["extra"] == [(3840 + 1200, 67, 240, 0)]
+    assert diff[3]["shifted"] == [((3840 + 960, 64, 480, 0), (3840 + 960, 64, 240, 0))]
+
+
+def test_チャネルの違いは無視できる():
+    data_a = _create_midi_bytes(SOUND_LIST)
+    writer = MidiWriter(tempo=120, rhythm_dict={1: (4, 4), 3: (3, 4)})
+    writer.use_channel_list[0] = True
+    writer.add_sound_list(SOUND_LIST, program="ハープ")
+    data_b = writer.get_bytes()
+    assert len(MidiDiffer().diff(data_a, data_b)) == 3
+    assert MidiDiffer(ignore_channel=True).diff(data_a, data_b) == {}
@@ -0,0 +1,137 @@
+from io import BytesIO
+import pytest
+from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+from mido.midifiles.midifiles import encode_variable_int
+from dataset.midi.encoder import (
+    encode_vlq,
+    encode_header,
+    encode_meta_track,
+    encode_track,
+    note_off_bytes,
+    note_on_bytes,
+    program_change_bytes,
+)
+from dataset.midi.writer import MidiWriter, get_tempo_ladder
+
+
+# 可変長数値はmidoと同じバイト列になる
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 480, 16383, 16384, 2097151, 2097152])
+def test_可変長数値はmidoと同じバイト列になる(value):
+    assert encode_vlq(value) == bytes(encode_variable_int(value))
+
+
+# エンコードしたSMFはmidoで出力したものと一致する
+def test_エンコードしたSMFはmidoで出力したものと一致する():
+    conductor = MidiTrack()
+    conductor.append(MetaMessage("set_tempo", tempo=bpm2tempo(92), time=0))
+    conductor.append(MetaMessage("time_signature", numerator=3, denominator=4, time=0))
+    track = MidiTrack()
+    track.append(Message("program_change", channel=1, program=46, time=0))
+    track.append(Message("note_on", channel=1, note=60, velocity=100, time=0))
+    track.append(Message("note_on", channel=1, note=64, velocity=100, time=0))
+    track.append(Message("note_off", channel=1, note=60, velocity=0, time=20000))
+    track.append(Message("note_off", channel=1, note=64, velocity=0, time=0))
+    mid = MidiFile(type=1, ticks_per_beat=480)
+    mid.tracks.extend([conductor, track])
+    expected = BytesIO()
+    mid.save(file=expected)
+
+    events = [
+        (0, program_change_bytes(1, 46)),
+        (0, note_on_bytes(1, 60)),
+        (0, note_on_bytes(1, 64)),
+        (20000, note_off_bytes(1, 60)),
+        (20000, note_off_bytes(1, 64)),
+    ]
+    encoded = encode_header(1, 2, 480) + encode_meta_track(conductor) + encode_track(events)
+    assert encoded == expected.getvalue()
+
+
+# MidiWriterはバッファにも書き出せる
+def test_MidiWriterはバッファにも書き出せる():
+    writer = MidiWriter(tempo=120, rhythm_dict={1: (4, 4)})
+    writer.add_sound_list(
+        [[[["C"]], [["D"]], [["-"]], [["r"]]]],
+        [([1, 1, 1, 1], [[1], [1], [1], [1]])],
+        program="ハープ",
+    )
+    buffer = BytesIO()
+    writer.fwrite(buffer)
+    assert buffer.getvalue() == writer.get_bytes()
+    mid = MidiFile(file=BytesIO(buffer.getvalue()))
+    notes = [msg for msg in mid.tracks[1] if msg.type in ("note_on", "note_off")]
+    assert [(msg.type, msg.note) for msg in notes] == [
+        ("note_on", 60), ("note_off", 60), ("note_on", 62), ("note_off", 62),
+    ]
+    assert sum(msg.time for msg in mid.tracks[1]) == 480 * 3
+
+
+# レートリストを省略した場合は等分される
+def test_レートリストを省略した場合は等分される():
+    writer = MidiWriter(tempo=120, rhythm_dict={1: (4, 4)})
+    writer.add_sound_list([[[["C"]], [["D", "E"]], [["-"]], [["r"]]]], program="ハープ")
+    mid = MidiFile(file=BytesIO(writer.get_bytes()))
+    ons = []
+    now_time = 0
+    for msg in mid.tracks[1]:
+        now_time += msg.time
+        if msg.type == "note_on":
+            ons.append((now_time, msg.note))
+    assert ons == [(0, 60), (480, 62), (720, 64)]
+
+
+# 和音はリストで渡せる
+def test_和音はリストで渡せる():
+    writer = MidiWriter(tempo=120, rhythm_dict={1: (4, 4)})
+    events = writer.get_note_events(
+        [[[[["C", "E"]]], [["r"]], [["r"]], [["r"]]]],
+        [([1, 1, 1, 1], [[1], [1], [1], [1]])],
+        48,
+    )
+    assert events == [(0, True, 48), (0, True, 52), (480, False, 48), (480, False, 52)]
+
+
+# テンポ違いの出力はテンポごとに作り直した場合と一致する
+def test_テンポ違いの出力はテンポごとに作り直した場合と一致する():
+    sound_list = [[[["C"]], [["D", "E"]], [["-"]], [["r"]]]] * 2
+    rhythm_dict = {1: (4, 4), 2: (3, 4)}
+
+    def create(tempo):
+        writer = MidiWriter(tempo=tempo, rhythm_dict=rhythm_dict)
+        writer.add_sound_list(sound_list, program="ハープ")
+        writer.add_sound_list(sound_list, program="チューバ")
+        return writer
+
+    tempos = get_tempo_ladder(60, 100, 5)
+    assert tempos == [60, 65, 70, 75, 80, 85, 90, 95, 100]
+    variants = list(create(92).get_tempo_variant_bytes(tempos))
+    assert variants == [create(tempo).get_bytes() for tempo in tempos]
+
+
+def test_テンポの刻みは終了テンポを含む():
+    assert get_tempo_ladder(100, 88, 5) == [100, 95, 90, 88]
+    assert get_tempo_ladder(60, 60) == [60]
+
+
+# マイナスワンは元のファイルからそのパートのトラックを除いたものになる
+def test_マイナスワンは元のファイルからそのパートのトラックを除いたものになる(tmp_path):
+    sound_list = [[[["C"]], [["D", "E"]], [["-"]], [["r"]]]]
+    programs = ["ハープ", "チューバ", "フルート"]
+
+    def create(tempo):
+        writer = MidiWriter(tempo=tempo, rhythm_dict={1: (4, 4)})
+        for program in programs:
+            writer.add_sound_list(sound_list, program=program)
+        return writer
+
+    filenames = create(120).fwrite_minus_one(
+        str(tmp_path / "{mode}{part}_{program}_{tempo}.mid"), tempos=[120, 60], solo=True
+    )
+    assert len(filenames) == len(programs) * 2 * 2
+    for tempo in [120, 60]:
+        tracks = MidiFile(file=BytesIO(create(tempo).get_bytes())).tracks
+        for part_idx, program in enumerate(programs):
+            minus = MidiFile(tmp_path / "minus{}_{}_{}.mid".format(part_idx + 1, program, tempo))
+            solo = MidiFile(tmp_path / "solo{}_{}_{}.mid".format(part_idx + 1, program, tempo))
+            assert minus.tracks == tracks[:part_idx + 1] + tracks[part_idx + 2:]
+            assert solo.tracks == [tracks[0], tracks[part_idx + 1]]
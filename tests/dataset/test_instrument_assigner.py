@@ -0,0 +1,56 @@
+from itertools import permutations
+import random
+import pytest
+from dataset.common_sound import CommonSoundData
+from dataset.instrument_assigner import InstrumentAssigner, solve_assignment
+
+
+def _create_common_data(pitches, program_str="ハープ"):
+    common_data = CommonSoundData()
+    common_data.add_pitch_list([[[[pitch] for pitch in pitches]]], delete_unnecessary_mark=False)
+    common_data.add_program_str(program_str)
+    return common_data
+
+
+# ハンガリアン法の割当は総当たりの最小コストと一致する
+@pytest.mark.parametrize("num_rows, num_cols", [(3, 3), (4, 6), (5, 5)])
+def test_割当は総当たりの最小コストと一致する(num_rows, num_cols):
+    rand = random.Random(num_rows * 10 + num_cols)
+    cost_matrix = [[rand.random() for _ in range(num_cols)] for _ in range(num_rows)]
+    ret = solve_assignment(cost_matrix)
+    assert len(set(ret)) == num_rows
+    best = min(
+        sum(cost_matrix[i][j] for i, j in enumerate(cols))
+        for cols in permutations(range(num_cols), num_rows)
+    )
+    assert sum(cost_matrix[i][j] for i, j in enumerate(ret)) == pytest.approx(best)
+
+
+def test_列が足りない場合は割り当てられない行がNoneになる():
+    ret = solve_assignment([[1.0], [0.0], [2.0]])
+    assert ret == [None, 0, None]
+
+
+# 音域に収まる楽器が割り当てられる
+def test_音域に収まる楽器が割り当てられる():
+    assigner = InstrumentAssigner()
+    common_data_list = [
+        _create_common_data([96, 100, 103, 107]),  # 高音域
+        _create_common_data([28, 31, 35, 40]),  # 低音域
+    ]
+    program_strs = assigner.assign(common_data_list)
+    assert program_strs[0] == "ピッコロ"
+    assert program_strs[1] in ["ティンパニー", "チューバ", "コントラバス"]  # 同じ音域
+
+
+def test_音域が同じなら元の楽器が優先される():
+    assigner = InstrumentAssigner()
+    common_data = _create_common_data([28, 31, 35, 40], program_str="コントラバス")
+    assert assigner.assign([common_data]) == ["コントラバス"]
+
+
+def test_重複なしの場合は同じ楽器が割り当てられない():
+    assigner = InstrumentAssigner()
+    common_data_list = [_create_common_data([60, 64, 67, 72]) for _ in range(4)]
+    assert len(set(assigner.assign(common_data_list))) == 1
+    assert len(set(assigner.assign(common_data_list, unique=True))) == 4
@@ -0,0 +1,40 @@
+import wave
+from io import BytesIO
+import numpy as np
+from dataset.midi.writer import MidiWriter
+from dataset.wav.writer import WavWriter, get_note_wave, pair_note_events
+
+
+def _create_midi_data():
+    midi_data = MidiWriter(tempo=120, rhythm_dict={1: (4, 4)})
+    midi_data.add_sound_list([[[["C"]], [["D"]], [["-"]], [["r"]]]], program="フルート")
+    midi_data.add_sound_list([[[["C"]], [["r"]], [["C"]], [["r"]]]], program="スネアドラム")
+    return midi_data
+
+
+# ノートイベントは開始・終了の組になる
+def test_ノートイベントは開始と終了の組になる():
+    starts, ends, pitches = pair_note_events(_create_midi_data().part_notes[0][1])
+    assert starts.tolist() == [0, 480]
+    assert ends.tolist() == [480, 1440]
+    assert pitches.tolist() == [72, 74]
+
+
+# 同じ楽器・ピッチ・音長の波形はキャッシュされる
+def test_同じ楽器とピッチと音長の波形はキャッシュされる():
+    assert get_note_wave(73, 72, 10, 8000) is get_note_wave(73, 72, 10, 8000)
+
+
+# 曲の長さ分の波形が出力される
+def test_曲の長さ分の波形が出力される():
+    wav_data = WavWriter(sample_rate=8000, max_workers=1)
+    wav_data.add_midi_writer(_create_midi_data())
+    data = wav_data.render()
+    assert data.dtype == np.int16
+    assert len(data) >= 8000 * 1.5  # 4分音符3つ分(テンポ120)
+    assert np.abs(data[:4000]).max() > 0
+    buffer = BytesIO()
+    wav_data.fwrite(buffer)
+    with wave.open(BytesIO(buffer.getvalue()), "rb") as f:
+        assert f.getframerate() == 8000
+        assert f.getnframes() == len(data)
@@ -0,0 +1,139 @@
+import random
+from openpyxl import Workbook
+from openpyxl.styles import Border, Side
+from dataset.xlsx.layout import LayoutStyleIndex, SheetLayout, render_worksheet
+
+
+def _get_border_dict(ws):
+    return {
+        (row, column): tuple(
+            getattr(cell.border, name).style for name in ["top", "left", "right", "bottom"]
+        )
+        for (row, column), cell in ws._cells.items() if cell.has_style
+    }
+
+
+# 結合セルの罫線がopenpyxlのmerge_cellsと同じになる
+def test_結合セルの罫線がopenpyxlのmerge_cellsと同じになる():
+    rand = random.Random(0)
+    sides = [Side(style=None), Side(style="thin"), Side(style="medium")]
+    borders = [
+        Border(top=rand.choice(sides), bottom=rand.choice(sides), left=rand.choice(sides), right=rand.choice(sides))
+        for _ in range(8)
+    ]
+    layout = SheetLayout()
+    ws = Workbook().active
+    for _ in range(200):
+        row, column = rand.randint(1, 6), rand.randint(1, 6)
+        if rand.random() < 0.6:
+            border = rand.choice(borders)
+            layout.cell(row, column).border = border
+            ws.cell(row=row, column=column).border = border
+        else:
+            end_row, end_column = row + rand.randint(0, 2), column + rand.randint(0, 2)
+            layout.merge_cells(row, column, end_row, end_column)
+            ws.merge_cells(start_row=row, start_column=column, end_row=end_row, end_column=end_column)
+
+    rendered_ws = Workbook().active
+    render_worksheet(layout, rendered_ws)
+    assert _get_border_dict(rendered_ws) == _get_border_dict(ws)
+    # openpyxlの結合セルは全て、重ならないようにまとめた結合セルのどれかに含まれる
+    merged_ranges = list(layout.merged_ranges)
+    for i, (min_col, min_row, max_col, max_row) in enumerate(merged_ranges):
+        for _min_col, _min_row, _max_col, _max_row in merged_ranges[i + 1:]:
+            assert max_col < _min_col or _max_col < min_col or max_row < _min_row or _max_row < min_row
+    for merged_cell in ws.merged_cells.ranges:
+        if merged_cell.size["rows"] * merged_cell.size["columns"] > 1:
+            assert any(
+                min_col <= merged_cell.min_col and merged_cell.max_col <= max_col
+                and min_row <= merged_cell.min_row and merged_cell.max_row <= max_row
+                for min_col, min_row, max_col, max_row in merged_ranges
+            )
+
+
+# 1セルの結合と既存の結合セルに含まれる結合は登録しない
+def test_1セルの結合と既存の結合セルに含まれる結合は登録しない():
+    layout = SheetLayout()
+    layout.merge_cells(1, 1, 1, 1)
+    layout.merge_cells(1, 2, 1, 3)
+    layout.merge_cells(1, 2, 1, 5)
+    layout.merge_cells(1, 4, 1, 5)
+    layout.merge_cells(1, 7, 1, 8)
+    layout.merge_cells(1, 8, 1, 9)
+    assert list(layout.merged_ranges) == [(2, 1, 5, 1), (7, 1, 9, 1)]
+
+
+# パートのレイアウトを加えられる
+def test_パートのレイアウトを加えられる():
+    layout = SheetLayout()
+    part_layout = SheetLayout(column_dimensions=layout.column_dimensions, row_dimensions=layout.row_dimensions)
+    part_layout.cell(3, 2).value = "ド"
+    part_layout.merge_cells(3, 2, 3, 4)
+    part_layout.column_dimensions["B"].width = 2.5
+    layout.update(part_layout)
+    assert [(row, [(column, spec.value) for column, spec in specs]) for row, specs in layout.iter_rows()] == [
+        (3, [(2, "ド")])
+    ]
+    assert list(layout.merged_ranges) == [(2, 3, 4, 3)]
+    assert layout.column_dimensions["B"].width == 2.5
+
+
+# 列幅を変えると右の列の幅と累積和が更新される
+def test_列幅を変えると右の列の幅と累積和が更新される():
+    layout = SheetLayout()
+    geometry = layout.column_dimensions.geometry
+    geometry.set_width(2, 5)
+    assert geometry.get_widths(1, 3) == {1: 13, 2: 5, 3: 13}
+    assert geometry.get_width_sum(2, 3) == 18
+    geometry.set_width(3, None)
+    assert geometry.get_widths(3, 4) == {3: 5, 4: 13}
+    assert geometry.get_width_sum(1, 4) == 36
+    assert set(layout.column_dimensions.keys()) == {"A", "B", "C", "D"}
+
+
+# 指定した行より上のセルと結合セルを取り除ける
+def test_指定した行より上のセルと結合セルを取り除ける():
+    layout = SheetLayout()
+    layout.cell(1, 1).value = "曲名"
+    layout.cell(3, 2).value = "ド"
+    layout.merge_cells(1, 1, 1, 3)
+    layout.merge_cells(2, 5, 4, 5)
+    layout.row_dimensions[1].height = 20
+    cell_rows, merged_ranges, row_dimensions = layout.pop_rows(3)
+    assert [(row, [(column, spec.value) for column, spec in specs]) for row, specs in cell_rows] == [
+        (1, [(1, "曲名")])
+    ]
+    assert merged_ranges == [(1, 1, 3, 1)]
+    assert row_dimensions[1].height == 20
+    # 指定した行をまたぐ結合セルは残る
+    assert [(row, [(column, spec.value) for column, spec in specs]) for row, specs in layout.iter_rows()] == [
+        (3, [(2, "ド")])
+    ]
+    assert list(layout.merged_ranges) == [(5, 2, 5, 4)]
+    layout.merge_cells(2, 4, 4, 6)
+    assert list(layout.merged_ranges) == [(4, 2, 6, 4)]
+
+
+# 足した罫線はキャッシュを共有するレイアウトの間で使い回す
+def test_足した罫線はキャッシュを共有するレイアウトの間で使い回す():
+    border = Border(left=Side(style="thin"), bottom=Side(style="medium"))
+    layout = SheetLayout()
+    part_layouts = [SheetLayout(border_sum_dict=layout.border_sum_dict) for _ in range(2)]
+    for part_layout in part_layouts:
+        part_layout.cell(1, 1).border = border
+        part_layout.cell(1, 2).border = border
+        part_layout.merge_cells(1, 1, 1, 2)
+    assert part_layouts[0].cell(1, 1).border is part_layouts[1].cell(1, 1).border
+    assert part_layouts[0].shift_rows(2).border_sum_dict is layout.border_sum_dict
+
+
+# セルを捨ててもスタイル番号は別のスタイルと取り違えない
+def test_セルを捨ててもスタイル番号は別のスタイルと取り違えない():
+    style_index = LayoutStyleIndex(Workbook())
+    style_arrays = {}
+    for style in ["thin", "medium", "thick", "double"] * 50:
+        spec = SheetLayout().cell(1, 1)
+        spec.border = Border(left=Side(style=style))
+        style_array = style_index.get_style_array(spec)
+        assert style_arrays.setdefault(style, style_array.borderId) == style_array.borderId
+    assert len(set(style_arrays.values())) == 4
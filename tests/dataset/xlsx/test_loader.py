@@ -0,0 +1,106 @@
+from io import BytesIO
+import pytest
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+from dataset.xlsx.loader import XlsxLoader
+
+
+# 並列に読み込んだ結果は順に読み込んだ結果と一致する
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_並列に読み込んだ結果は順に読み込んだ結果と一致する(score_xlsx, backend):
+    data, xlsx_writer = score_xlsx
+    loader = XlsxLoader(BytesIO(data), backend=backend)
+    sheet_name = loader.get_sheetnames()[0]
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    jobs = [(sheet_name, start_col, end_col, row_list) for row_list in xlsx_writer.part_rows] * 2
+    expected = [loader.get_sound_list(*job) for job in jobs]
+    assert loader.get_sound_lists(jobs, max_workers=2) == expected
+    assert loader.get_sound_lists(jobs, max_workers=1) == expected
+
+
+# 手で壊したセルを座標付きで報告する
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_手で壊したセルを座標付きで報告する(score_xlsx, backend):
+    data, xlsx_writer = score_xlsx
+    loader = XlsxLoader(data, backend=backend)
+    sheet_name = loader.get_sheetnames()[0]
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    jobs = [(sheet_name, start_col, end_col, row_list) for row_list in xlsx_writer.part_rows]
+    for job in jobs:
+        assert loader.validate(*job, rhythm_dict={1: (4, 4)}) == []
+    assert len(loader.validate(*jobs[0], rhythm_dict={1: (3, 4)})) > 0
+
+    wb = load_workbook(BytesIO(data))
+    sheet = wb[sheet_name]
+    row_num = xlsx_writer.part_rows[0][0]
+    cell = sheet.cell(row=row_num, column=xlsx_writer.score_columns[0])
+    cell.value = "ドX"
+    edited = BytesIO()
+    wb.save(edited)
+    loader = XlsxLoader(edited.getvalue(), backend=backend)
+    issues = loader.validate(*jobs[0], rhythm_dict={1: (4, 4)})
+    assert ("{}{}".format(start_col, row_num), "Unparseable note: ドX") in issues
+
+
+# 緑の音のセルは読み込めるのでエラーにしない
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_緑の音のセルは読み込めるのでエラーにしない(score_xlsx, backend):
+    data, xlsx_writer = score_xlsx
+    wb = load_workbook(BytesIO(data))
+    sheet = wb[wb.sheetnames[0]]
+    row_num = xlsx_writer.part_rows[0][0]
+    cell = sheet.cell(row=row_num, column=xlsx_writer.score_columns[0])
+    cell.value = "ド"
+    cell.fill = PatternFill(patternType="solid", fgColor="ff00ff00", bgColor="ff00ff00")
+    edited = BytesIO()
+    wb.save(edited)
+    loader = XlsxLoader(edited.getvalue(), backend=backend)
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    job = (wb.sheetnames[0], start_col, end_col, xlsx_writer.part_rows[0])
+    assert loader.validate(*job, rhythm_dict={1: (4, 4)}) == []
+    sound_list, _ = loader.get_sound_list(*job)
+    assert sound_list[0][0][0] == ["C"]
+
+
+# セルのスタイルは異なるスタイルごとに一度だけ判定する
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_セルのスタイルは異なるスタイルごとに一度だけ判定する(score_xlsx, monkeypatch, backend):
+    data, xlsx_writer = score_xlsx
+    loader = XlsxLoader(data, backend=backend)
+    style_ids = []
+    get_style_info = loader._get_style_info
+
+    def _get_style_info(cell):
+        style_ids.append(loader._get_style_id(cell))
+        return get_style_info(cell)
+
+    monkeypatch.setattr(loader, "_get_style_info", _get_style_info)
+    sheet_name = loader.get_sheetnames()[0]
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    for _ in range(2):
+        for row_list in xlsx_writer.part_rows:
+            loader.get_sound_list(sheet_name, start_col, end_col, row_list)
+    assert len(style_ids) == len(set(style_ids)) == len(loader.style_info_dict)
+    for color, left_border, right_border in loader.style_info_dict.values():
+        assert isinstance(left_border, int) and isinstance(right_border, int)
+
+
+# 行のベクトルはセルごとの情報と一致する
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_行のベクトルはセルごとの情報と一致する(score_xlsx, backend):
+    data, xlsx_writer = score_xlsx
+    row_loader = XlsxLoader(data, backend=backend)
+    cell_loader = XlsxLoader(data, backend=backend)
+    sheet_name = row_loader.get_sheetnames()[0]
+    start_col, end_col = xlsx_writer.score_columns
+    for row_list in xlsx_writer.part_rows:
+        row_analysis = row_loader._get_sheet_analysis(sheet_name, row_list)
+        cell_analysis = cell_loader._get_sheet_analysis(sheet_name, row_list)
+        for row_num in row_list:
+            values, colors, left_borders, right_borders, _, _ = row_loader._get_row_vector(
+                row_analysis, row_num, start_col, end_col
+            )
+            for col_num in range(start_col, end_col + 1):
+                assert (
+                    values[col_num], colors[col_num], left_borders[col_num], right_borders[col_num]
+                ) == cell_loader._get_cell_info(cell_analysis, row_num, col_num)
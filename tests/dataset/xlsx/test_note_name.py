@@ -0,0 +1,35 @@
+import pytest
+from dataset.xlsx.note_name import convert_to_german_note
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("ド", ("C",)),
+    ("ﾄﾞ", ("C",)),
+    ("ﾌｧ♯", ("Fis",)),
+    ("ファ#", ("Fis",)),
+    ("シ♭", ("B",)),
+    ("ミ♭ソ", ("Es", "G")),
+    ("ﾗ♭ﾄﾞ", ("As", "C")),
+    ("・", ("r",)),
+    ("c#e", ("Cis", "E")),
+])
+def test_音名をドイツ音名に変換する(value, expected):
+    assert convert_to_german_note(value) == expected
+
+
+# ドイツ音名の変化記号は音名の直後で優先して読む
+@pytest.mark.parametrize("value, expected", [
+    ("Cis", ("Cis",)),
+    ("Des", ("Des",)),
+    ("Es", ("Es",)),
+    ("As", ("As",)),
+    ("Hes", ("B",)),
+    ("ce", ("C", "E")),
+])
+def test_ドイツ音名の綴りを読める(value, expected):
+    assert convert_to_german_note(value) == expected
+
+
+def test_複数文字の候補の途中で終わっても読める():
+    assert convert_to_german_note("ドﾄ") == ("C",)
+    assert convert_to_german_note("ﾌ") == ()
@@ -0,0 +1,82 @@
+from io import BytesIO
+import pytest
+from openpyxl import Workbook, load_workbook
+from dataset.xlsx.loader import XlsxLoader
+from dataset.xlsx.layout import SheetLayout
+from dataset.xlsx.raw_reader import RawXlsxWorkbook
+from dataset.xlsx.raw_writer import RawXlsxStreamWriter
+
+
+# XMLから直接読んだセルはopenpyxlで読んだものと同じに見える
+@pytest.mark.parametrize("score_xlsx", ["3行固定"], indirect=True)
+def test_XMLから直接読んだセルはopenpyxlと同じに見える(score_xlsx):
+    xlsx_bytes, _ = score_xlsx
+    wb, raw_wb = load_workbook(BytesIO(xlsx_bytes)), RawXlsxWorkbook(xlsx_bytes)
+    assert wb.sheetnames == raw_wb.sheetnames
+    sheet, raw_sheet = wb[wb.sheetnames[0]], raw_wb[wb.sheetnames[0]]
+    assert sorted(r.bounds for r in sheet.merged_cells.ranges) == sorted(r.bounds for r in raw_sheet.merged_cells.ranges)
+    for row in range(1, sheet.max_row + 1):
+        for col in range(1, sheet.max_column + 1):
+            cell, raw_cell = sheet.cell(row=row, column=col), raw_sheet.cell(row, col)
+            assert cell.value == raw_cell.value
+            assert cell.fill.fgColor.rgb == raw_cell.fill.fgColor.rgb
+            for name in ("left", "right"):
+                side, raw_side = getattr(cell.border, name), getattr(raw_cell.border, name)
+                assert side.style == raw_side.style
+                assert (side.color.rgb if side.color else None) == (raw_side.color.rgb if raw_side.color else None)
+    for letter, dim in sheet.column_dimensions.items():
+        assert dim.width == raw_sheet.column_dimensions[letter].width
+
+
+def test_rawで読み込んだ楽譜はopenpyxlと一致する(score_xlsx):
+    xlsx_bytes, xlsx_writer = score_xlsx
+    loaders = [XlsxLoader(xlsx_bytes), XlsxLoader(xlsx_bytes, backend="raw")]
+    start_col, end_col = xlsx_writer.score_columns
+    sheet_name = loaders[0].get_sheetnames()[0]
+    for row_list in xlsx_writer.part_rows:
+        sound_lists = [
+            loader.get_sound_list(
+                sheet_name, loader._convert_column_num(start_col), loader._convert_column_num(end_col), row_list
+            )
+            for loader in loaders
+        ]
+        assert sound_lists[0] == sound_lists[1]
+
+
+# 編集したシートだけハッシュが変わる
+def test_編集したシートだけハッシュが変わる(score_xlsx):
+    data, _ = score_xlsx
+    wb = load_workbook(BytesIO(data))
+    wb.copy_worksheet(wb[wb.sheetnames[0]]).title = "copy"
+    wb.save(BytesIO())  # openpyxlが最初の保存で書き換える部分をそろえる
+    buffer = BytesIO()
+    wb.save(buffer)
+    before = RawXlsxWorkbook(buffer.getvalue()).get_sheet_hashes()
+    wb["copy"].cell(row=1, column=1).value = "edited"
+    edited = BytesIO()
+    wb.save(edited)
+    after = RawXlsxWorkbook(edited.getvalue()).get_sheet_hashes()
+    assert before[wb.sheetnames[0]] == after[wb.sheetnames[0]]
+    assert before["copy"] != after["copy"]
+    assert XlsxLoader(edited.getvalue()).get_sheet_hashes() == after
+
+
+# エスケープされた文字は元の文字に戻す
+def test_エスケープされた文字は元の文字に戻す():
+    values = ["ド_x000D_レ", "_x005F_x000D_", "ミ_x000a_"]
+    expected = ["ド\rレ", "_x000D_", "ミ\n"]
+    # 共有文字列
+    layout = SheetLayout(title="Sheet")
+    for row, value in enumerate(values, 1):
+        layout.cell(row, 1).value = value
+    shared = BytesIO()
+    RawXlsxStreamWriter(Workbook(), layout).fwrite(shared)
+    # セル内の文字列(inlineStr)
+    wb = Workbook()
+    for row, value in enumerate(values, 1):
+        wb.active.cell(row=row, column=1).value = value
+    inline = BytesIO()
+    wb.save(inline)
+    for data in [shared.getvalue(), inline.getvalue()]:
+        sheet = RawXlsxWorkbook(data)["Sheet"]
+        assert [sheet.cell(row, 1).value for row in range(1, len(values) + 1)] == expected
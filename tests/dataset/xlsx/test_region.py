@@ -0,0 +1,62 @@
+import pytest
+from dataset.xlsx._static_data import BORDER_MEASURE, BORDER_NONE
+from dataset.xlsx.loader import XlsxLoader
+from dataset.xlsx.region import detect_score_region
+from dataset.xlsx.writer import FlexibleLineXlsxWriter
+
+
+# 出力したxlsxの楽譜欄を検出できる
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+@pytest.mark.parametrize("score_xlsx", ["1行固定", "flex"], indirect=True)
+def test_出力したxlsxの楽譜欄を検出できる(score_xlsx, backend):
+    data, xlsx_writer = score_xlsx
+    loader = XlsxLoader(data, backend=backend)
+    sheet_name = loader.get_sheetnames()[0]
+    region = loader.detect_score_region(sheet_name)
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    assert region["sheet_name"] == sheet_name
+    assert region["start_column_char"] == start_col
+    assert region["end_column_char"] == end_col
+    if isinstance(xlsx_writer, FlexibleLineXlsxWriter):
+        assert len(region["row_lists"]) == 3
+    else:
+        assert region["row_lists"] == xlsx_writer.part_rows
+    assert region["program_list"] == ["フルート", "チェロ", "ハープ"]
+    assert region["player_list"] == [1, 2, 3]
+
+
+# 1段が複数行の楽譜は検出しない
+@pytest.mark.parametrize("score_xlsx", ["3行固定"], indirect=True)
+def test_1段が複数行の楽譜は検出しない(score_xlsx):
+    data, _ = score_xlsx
+    loader = XlsxLoader(data)
+    assert loader.detect_score_region(loader.get_sheetnames()[0]) is None
+
+
+def _get_cell_infos(part_rows, labels, num_cols=12):
+    # 色付きのセルと小節の罫線のある楽譜の行と、A列の楽器名
+    cell_infos = {}
+    for rows in part_rows:
+        for row_num in rows:
+            for col_num in range(3, 3 + num_cols):
+                left_border = BORDER_MEASURE if col_num % 4 == 3 else BORDER_NONE
+                cell_infos[(row_num, col_num)] = ("ド", "yellow", left_border, BORDER_NONE)
+    for row_num, program in labels.items():
+        cell_infos[(row_num, 1)] = (program, "white", BORDER_NONE, BORDER_NONE)
+    return cell_infos
+
+
+# パートごとにまとまった楽譜をパートに分ける
+def test_パートごとにまとまった楽譜をパートに分ける():
+    part_rows = [[2, 4, 6], [9, 11, 13]]
+    region = detect_score_region(_get_cell_infos(part_rows, {2: "フルート", 9: "チェロ"}), [])
+    assert region["row_lists"] == part_rows
+    assert region["program_list"] == ["フルート", "チェロ"]
+    # 楽器名が無くても、空いた行の多いところで分ける
+    region = detect_score_region(_get_cell_infos(part_rows, {}), [])
+    assert region["row_lists"] == part_rows
+    assert region["program_list"] == [None, None]
+    # 段ごとに各パートの行が並んでいる楽譜は今まで通り
+    region = detect_score_region(_get_cell_infos([[2, 5, 8], [3, 6, 9]], {2: "フルート", 3: "チェロ"}), [])
+    assert region["row_lists"] == [[2, 5, 8], [3, 6, 9]]
+    assert region["program_list"] == ["フルート", "チェロ"]
@@ -0,0 +1,42 @@
+from io import BytesIO
+import pytest
+from openpyxl import Workbook
+from dataset.xlsx.loader import XlsxLoader
+from dataset.xlsx.sheet_analysis import SheetAnalysis
+
+
+def _create_xlsx_bytes(sheet_names):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for sheet_name in sheet_names:
+        ws = wb.create_sheet(sheet_name)
+        for col_str, width in zip("ABCDE", [2.0, 1.5, 3.25, 1.0, 4.0]):
+            ws.column_dimensions[col_str].width = width
+        ws.merge_cells("B1:D1")
+        ws.merge_cells("A2:A3")  # 2行にわたる結合セルは楽譜外
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_結合セルと列幅の累積和が得られる(backend):
+    loader = XlsxLoader(_create_xlsx_bytes(["s1"]), backend=backend)
+    sheet_analysis = SheetAnalysis(loader._get_sheet("s1", [1, 2, 3]))
+    assert sheet_analysis.merged_cells == {(1, 3), (1, 4)}
+    assert sheet_analysis.column_geometry.get_widths(2, 4) == {2: 1.5, 3: 3.25, 4: 1.0}
+    assert sheet_analysis.column_geometry.get_width_list(3) == [0, 2.0, 1.5, 3.25]
+    assert sheet_analysis.column_geometry.get_width_sum(2, 4) == 5.75
+    assert sheet_analysis.column_geometry.get_width_sum(1, 5) == 11.75
+
+
+# 解析結果はシートごとに使い回され、上限を超えると古いものから捨てられる
+def test_解析結果はシートごとに使い回される():
+    loader = XlsxLoader(_create_xlsx_bytes(["s1", "s2", "s3"]), backend="raw", max_cached_sheets=2)
+    sheet_analysis = loader._get_sheet_analysis("s1", [1])
+    assert loader._get_sheet_analysis("s1", [2]) is sheet_analysis
+    assert sheet_analysis.sheet.rows == {1, 2}
+    loader._get_sheet_analysis("s2", [1])
+    loader._get_sheet_analysis("s1", [1])
+    loader._get_sheet_analysis("s3", [1])
+    assert list(loader.sheet_analysis_dict.keys()) == ["s1", "s3"]
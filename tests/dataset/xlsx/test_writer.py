@@ -0,0 +1,156 @@
+from html.parser import HTMLParser
+from io import BytesIO
+import random
+import pytest
+from openpyxl import load_workbook
+from mid2xlsx import Mid2XlsxConverter
+from dataset.midi.writer import MidiWriter
+from dataset.xlsx.loader import XlsxLoader
+
+
+@pytest.fixture
+def mid_path(tmp_path):
+    rand = random.Random(5)
+    writer = MidiWriter(tempo=100, rhythm_dict={1: (4, 4)})
+    for program in ["フルート", "チェロ"]:
+        sound_list = [
+            [[[rand.choice(["C", "D", "E", "G", "A", "r", "-"])] for _ in range(rand.choice([1, 2, 3]))] for _ in range(4)]
+            for _ in range(8)
+        ]
+        writer.add_sound_list(sound_list, program=program)
+    writer.fwrite(str(tmp_path / "test.mid"))
+    return str(tmp_path / "test.mid")
+
+
+def _write_xlsx(mid_path, style, backend, max_workers=1, max_memo_measures=0):
+    converter = Mid2XlsxConverter()
+    program_dict = converter.fopen(mid_path)
+    key_dict = converter.key_estimate()
+    pitch_dict = converter.pitch_estimate()
+    program_dict, key_dict, pitch_dict = converter.update(program_dict, key_dict, pitch_dict, style=style)
+    buffer = BytesIO()
+    converter.fwrite(
+        buffer, "test", on_list=list(program_dict.keys()), style=style, backend=backend,
+        max_workers=max_workers, max_memo_measures=max_memo_measures,
+    )
+    return buffer.getvalue(), converter.xlsx_data
+
+
+def _get_cell_dict(data):
+    ws = load_workbook(BytesIO(data)).active
+    return {
+        (cell.row, cell.column): (cell.value, cell.fill.fgColor.rgb, cell.font.b)
+        for row in ws.iter_rows() for cell in row
+    }
+
+
+# rawで書き出したxlsxはopenpyxlで書き出したものと同じ内容になる
+@pytest.mark.parametrize("style", ["1行固定", "3行固定", "flex"])
+def test_rawで書き出したxlsxはopenpyxlで書き出したものと同じ内容になる(mid_path, style):
+    openpyxl_data, _ = _write_xlsx(mid_path, style, "openpyxl")
+    raw_data, _ = _write_xlsx(mid_path, style, "raw")
+    assert _get_cell_dict(raw_data) == _get_cell_dict(openpyxl_data)
+    ws_openpyxl = load_workbook(BytesIO(openpyxl_data)).active
+    ws_raw = load_workbook(BytesIO(raw_data)).active
+    assert set(map(str, ws_raw.merged_cells.ranges)) == set(map(str, ws_openpyxl.merged_cells.ranges))
+    assert {k: v.width for k, v in ws_raw.column_dimensions.items()} == {
+        k: v.width for k, v in ws_openpyxl.column_dimensions.items()
+    }
+
+
+# rawで書き出す場合は書き終えたパートをレイアウトに残さない
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_rawで書き出す場合は書き終えたパートをレイアウトに残さない(mid_path, max_workers):
+    data, writer = _write_xlsx(mid_path, "1行固定", "raw", max_workers=max_workers)
+    assert len(writer.layout.cells) == 0
+    assert len(writer.layout.merged_ranges) == 0
+    assert writer.part_layouts == []
+    assert load_workbook(BytesIO(data)).active.max_row > 10
+
+
+# パートを並列に書いても1つずつ書いたものと同じ内容になる
+@pytest.mark.parametrize("style", ["1行固定", "3行固定", "flex"])
+def test_パートを並列に書いても1つずつ書いたものと同じ内容になる(mid_path, style):
+    serial_data, serial_writer = _write_xlsx(mid_path, style, "raw", max_workers=1)
+    parallel_data, parallel_writer = _write_xlsx(mid_path, style, "raw", max_workers=2)
+    assert _get_cell_dict(parallel_data) == _get_cell_dict(serial_data)
+    ws_serial = load_workbook(BytesIO(serial_data)).active
+    ws_parallel = load_workbook(BytesIO(parallel_data)).active
+    assert set(map(str, ws_parallel.merged_cells.ranges)) == set(map(str, ws_serial.merged_cells.ranges))
+    assert {k: v.height for k, v in ws_parallel.row_dimensions.items()} == {
+        k: v.height for k, v in ws_serial.row_dimensions.items()
+    }
+    assert parallel_writer.part_rows == serial_writer.part_rows
+
+
+# 同じ小節を使い回しても書き直したものと同じ内容になる
+@pytest.mark.parametrize("style", ["1行固定", "3行固定", "flex"])
+def test_同じ小節を使い回しても書き直したものと同じ内容になる(tmp_path, style):
+    writer = MidiWriter(tempo=100, rhythm_dict={1: (4, 4)})
+    ostinato = [[["C"], ["E"]], [["G"]], [["C"], ["-"], ["r"]], [["-"]]]
+    writer.add_sound_list([ostinato for _ in range(12)], program="チェロ")
+    writer.fwrite(str(tmp_path / "ostinato.mid"))
+    memo_data, xlsx_writer = _write_xlsx(str(tmp_path / "ostinato.mid"), style, "raw", max_memo_measures=2)
+    assert 0 < len(xlsx_writer.measure_dict) <= 2
+    data, xlsx_writer = _write_xlsx(str(tmp_path / "ostinato.mid"), style, "raw")
+    assert len(xlsx_writer.measure_dict) == 0
+    assert _get_cell_dict(memo_data) == _get_cell_dict(data)
+    ws_memo = load_workbook(BytesIO(memo_data)).active
+    ws = load_workbook(BytesIO(data)).active
+    assert set(map(str, ws_memo.merged_cells.ranges)) == set(map(str, ws.merged_cells.ranges))
+
+
+# rawで書き出したxlsxを読み込める
+@pytest.mark.parametrize("backend", ["openpyxl", "raw"])
+def test_rawで書き出したxlsxを読み込める(mid_path, backend):
+    openpyxl_data, xlsx_writer = _write_xlsx(mid_path, "1行固定", "openpyxl")
+    raw_data, _ = _write_xlsx(mid_path, "1行固定", "raw")
+    sound_lists = []
+    for data in [openpyxl_data, raw_data]:
+        loader = XlsxLoader(data, backend=backend)
+        sheet_name = loader.get_sheetnames()[0]
+        start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+        sound_lists.append([
+            loader.get_sound_list(sheet_name, start_col, end_col, row_list)
+            for row_list in xlsx_writer.part_rows
+        ])
+    assert sound_lists[0] == sound_lists[1]
+
+
+class _TableParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.values = []
+        self.num_spans = 0
+        self.in_td = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "td":
+            self.in_td = True
+            self.values.append("")
+            if "rowspan" in attrs or "colspan" in attrs:
+                self.num_spans += 1
+
+    def handle_endtag(self, tag):
+        if tag == "td":
+            self.in_td = False
+
+    def handle_data(self, data):
+        if self.in_td:
+            self.values[-1] += data
+
+
+# htmlのプレビューにxlsxと同じ値と結合セルが書かれる
+@pytest.mark.parametrize("style", ["1行固定", "3行固定", "flex"])
+def test_htmlのプレビューにxlsxと同じ値と結合セルが書かれる(mid_path, style):
+    openpyxl_data, _ = _write_xlsx(mid_path, style, "openpyxl")
+    html_data, _ = _write_xlsx(mid_path, style, "html")
+    parser = _TableParser()
+    parser.feed(html_data.decode("utf-8"))
+    ws = load_workbook(BytesIO(openpyxl_data)).active
+    assert parser.num_spans == len(ws.merged_cells.ranges)
+    assert sorted(value for value in parser.values if value != "") == sorted(
+        str(cell.value) for row in ws.iter_rows() for cell in row if cell.value is not None
+    )
+
@@ -0,0 +1,45 @@
+import random
+import pytest
+from mid2xlsx import Mid2XlsxConverter
+from dataset.midi.differ import MidiDiffer
+from dataset.midi.writer import MidiWriter
+
+
+def _create_midi_file(path, num_measures=8):
+    rand = random.Random(0)
+    writer = MidiWriter(tempo=100, rhythm_dict={1: (4, 4)})
+    for program in ["フルート", "チェロ"]:
+        sound_list = [
+            [[[rand.choice(["C", "D", "E", "G", "A", "r", "-"])] for _ in range(rand.choice([1, 2]))] for _ in range(4)]
+            for _ in range(num_measures)
+        ]
+        writer.add_sound_list(sound_list, program=program)
+    writer.fwrite(str(path))
+    return writer.get_bytes()
+
+
+# mid→xlsx→midの往復変換で音が変わらない
+def test_往復変換で音が変わらない(tmp_path):
+    original = _create_midi_file(tmp_path / "test.mid")
+    converter = Mid2XlsxConverter()
+    program_dict = converter.fopen(str(tmp_path / "test.mid"))
+    key_dict = converter.key_estimate()
+    pitch_dict = converter.pitch_estimate()
+    program_dict, key_dict, pitch_dict = converter.update(program_dict, key_dict, pitch_dict)
+    converted = converter.roundtrip(on_list=list(program_dict.keys()))
+    assert MidiDiffer(ignore_channel=True).diff(original, converted) == {}
+
+
+# updateの前にマイナスワンを出力するとエラーになる
+def test_updateの前にマイナスワンを出力するとエラーになる(tmp_path):
+    _create_midi_file(tmp_path / "test.mid")
+    converter = Mid2XlsxConverter()
+    with pytest.raises(ValueError):
+        converter.fwrite_minus_one(str(tmp_path / "{mode}{part}.mid"))
+    program_dict = converter.fopen(str(tmp_path / "test.mid"))
+    with pytest.raises(ValueError):
+        converter.fwrite_minus_one(str(tmp_path / "{mode}{part}.mid"))
+    key_dict = converter.key_estimate()
+    pitch_dict = converter.pitch_estimate()
+    converter.update(program_dict, key_dict, pitch_dict)
+    assert len(converter.fwrite_minus_one(str(tmp_path / "{mode}{part}.mid"))) > 0
@@ -0,0 +1,26 @@
+from dataset.xlsx.loader import XlsxLoader
+from xlsx2mid import create_midis
+
+
+# シートも設定も変わっていない曲は出力し直さない
+def test_シートも設定も変わっていない曲は出力し直さない(tmp_path, score_xlsx):
+    data, xlsx_writer = score_xlsx
+    loader = XlsxLoader(data, backend="raw")
+    start_col, end_col = [loader._convert_column_num(col) for col in xlsx_writer.score_columns]
+    data_dict = {
+        "sheet_name": loader.get_sheetnames()[0],
+        "start_column_char": start_col,
+        "end_column_char": end_col,
+        "row_lists": xlsx_writer.part_rows,
+        "program_list": ["フルート", "チェロ", "ハープ"],
+        "rhythm": {1: (4, 4)},
+    }
+    manifest_name = str(tmp_path / "manifest.json")
+    songs = [(100, data_dict, str(tmp_path / "a.mid")), ([80, 90], data_dict, str(tmp_path / "b{}.mid"))]
+    assert None not in create_midis(loader, songs, max_workers=1, manifest_name=manifest_name)
+    assert create_midis(loader, songs, max_workers=1, manifest_name=manifest_name) == [None, None]
+
+    # 設定を変えた曲と、出力が消えた曲は出力し直す
+    songs[0] = (120, data_dict, str(tmp_path / "a.mid"))
+    (tmp_path / "b80.mid").unlink()
+    assert None not in create_midis(loader, songs, max_workers=1, manifest_name=manifest_name)
@@ -1,31 +1,139 @@
 # coding: utf-8
+from hashlib import sha1
+from json import dump, dumps, load
 from os import makedirs
+from os.path import isfile
 from argparse import ArgumentParser
 from dataset.xlsx.loader import XlsxLoader
-from dataset.midi.writer import MidiWriter
+from dataset.midi.writer import MidiWriter, get_tempo_ladder
+from dataset.wav.writer import WavWriter
 
 
-def create_midi(xlsx_data, tempo, data_dict, mid_name):
-    midi_data = MidiWriter(tempo=tempo, rhythm_dict=data_dict["rhythm"])
-    for row_list, program in zip(data_dict["row_lists"], data_dict["program_list"]):
-        sound_list, rate_list = xlsx_data.get_sound_list(
+def get_sound_list_jobs(data_dict):
+    # XlsxLoader.get_sound_listsに渡す、パートごとの(シート名, 開始列, 終了列, 行リスト)
+    return [
+        (
             data_dict["sheet_name"],
             data_dict["start_column_char"],
             data_dict["end_column_char"],
             row_list,
         )
+        for row_list, _ in zip(data_dict["row_lists"], data_dict["program_list"])
+    ]
+
+
+def create_midi(xlsx_data, tempo, data_dict, mid_name, sound_lists=None):
+    # tempoにリストを渡すと、シートを1回だけ読んで各テンポのmidiを出力する
+    # （その場合mid_nameは"{}"にテンポが入るフォーマット文字列）
+    # sound_listsを渡すと、読み込み済みのパートごとの(共通音リスト, 共通音レートリスト)を使う
+    tempos = tempo if isinstance(tempo, (list, tuple)) else None
+    if tempos is not None:
+        tempo = tempos[0]
+    midi_data = MidiWriter(tempo=tempo, rhythm_dict=data_dict["rhythm"])
+    if sound_lists is None:
+        sound_lists = xlsx_data.get_sound_lists(get_sound_list_jobs(data_dict))
+    for (sound_list, rate_list), program in zip(sound_lists, data_dict["program_list"]):
         midi_data.add_sound_list(
             sound_list,
             rate_list,
             program=program,
         )
+    if tempos is not None:
+        midi_data.fwrite_tempo_variants(tempos, mid_name)
+        return midi_data
     midi_data.fwrite(mid_name)
     midi_data.pprint()
-    
+    return midi_data
+
+
+def create_midis(xlsx_data, songs, max_workers=None, manifest_name=None):
+    # songsは(テンポ, data_dict, mid_name)のリスト
+    # 全曲の全パートをまとめて並列に読み込んでから、曲ごとにmidiを出力する
+    # （読み込み直す曲が1曲以下の場合は並列化しない）
+    # manifest_nameを渡すと、前回からシートの内容と設定が変わっていない曲は読み込まずに飛ばす
+    # （飛ばした曲の戻り値はNone）
+    manifest = {}
+    song_keys = [None] * len(songs)
+    if manifest_name is not None:
+        manifest = load_manifest(manifest_name)
+        sheet_hashes = xlsx_data.get_sheet_hashes()
+        song_keys = [
+            get_song_key(sheet_hashes, tempo, data_dict) for tempo, data_dict, _ in songs
+        ]
+    rebuild_idxs = [
+        idx for idx, ((tempo, _, mid_name), song_key) in enumerate(zip(songs, song_keys))
+        if song_key is None or manifest.get(mid_name) != song_key
+        or not all(isfile(name) for name in get_mid_names(tempo, mid_name))
+    ]
+    if len(rebuild_idxs) < len(songs):
+        print("Skip {} unchanged song(s)".format(len(songs) - len(rebuild_idxs)))
+    jobs_list = [get_sound_list_jobs(songs[idx][1]) for idx in rebuild_idxs]
+    if len(rebuild_idxs) <= 1:
+        max_workers = 1
+    sound_lists = xlsx_data.get_sound_lists(
+        [job for jobs in jobs_list for job in jobs], max_workers=max_workers
+    )
+    midi_datas = [None] * len(songs)
+    start_idx = 0
+    for idx, jobs in zip(rebuild_idxs, jobs_list):
+        tempo, data_dict, mid_name = songs[idx]
+        midi_datas[idx] = create_midi(
+            xlsx_data, tempo, data_dict, mid_name,
+            sound_lists=sound_lists[start_idx:start_idx + len(jobs)],
+        )
+        start_idx += len(jobs)
+        if song_keys[idx] is not None:
+            manifest[mid_name] = song_keys[idx]
+    if manifest_name is not None:
+        save_manifest(manifest_name, manifest)
+    return midi_datas
+
+
+def get_song_key(sheet_hashes, tempo, data_dict):
+    # シートの内容のハッシュと、テンポ・data_dictのハッシュを組にしたもの
+    config = dumps([tempo, data_dict], sort_keys=True, ensure_ascii=False)
+    return [sheet_hashes.get(data_dict["sheet_name"]), sha1(config.encode()).hexdigest()]
 
-def ems_main():
-    xlsx_data = XlsxLoader("EMS楽譜専用(EMS score).xlsx")
+
+def get_mid_names(tempo, mid_name):
+    # create_midiが出力するファイル名のリスト
+    if isinstance(tempo, (list, tuple)):
+        return [mid_name.format(t) for t in tempo]
+    return [mid_name]
+
+
+def load_manifest(manifest_name):
+    # 前回出力した曲ごとのキー（mid_nameをキー、get_song_keyの値を値とする辞書）
+    if not isfile(manifest_name):
+        return {}
+    with open(manifest_name, encoding="utf-8") as f:
+        return load(f)
+
+
+def save_manifest(manifest_name, manifest):
+    with open(manifest_name, "w", encoding="utf-8") as f:
+        dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def validate_songs(xlsx_data, songs):
+    # songsは(テンポ, data_dict, mid_name)のリスト
+    # midiは作らずに全曲の全パートを調べ、問題のあるセルを表示して問題の数を返す
+    num_issues = 0
+    for _, data_dict, _ in songs:
+        for job, program in zip(get_sound_list_jobs(data_dict), data_dict["program_list"]):
+            for cell_str, issue in xlsx_data.validate(*job, rhythm_dict=data_dict["rhythm"]):
+                print("{}!{} ({}): {}".format(data_dict["sheet_name"], cell_str, program, issue))
+                num_issues += 1
+    print("{} issue(s) found".format(num_issues))
+    return num_issues
+
+
+def ems_main(check_only=False):
+    # check_onlyの場合はmidiを作らずに楽譜欄の問題だけを表示する
+    # シートを必要なときだけ読むrawで開き、変更の無い曲は出力し直さない
+    xlsx_data = XlsxLoader("EMS楽譜専用(EMS score).xlsx", backend="raw")
     makedirs("out", exist_ok=True)
+    songs = []
 
     # TM4
     dict_TM4 = {
@@ -46,10 +154,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 92
-    create_midi(xlsx_data, tempo, dict_TM4, "out/TM4_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_TM4, "out/TM4_tempo{}.mid".format(tempo))
+    tempos = [92, 60]
+    songs.append((tempos, dict_TM4, "out/TM4_tempo{}.mid"))
 
     # TOT5
     dict_TOT5 = {
@@ -70,10 +176,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 72
-    create_midi(xlsx_data, tempo, dict_TOT5, "out/TOT5_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_TOT5, "out/TOT5_tempo{}.mid".format(tempo))
+    tempos = [72, 60]
+    songs.append((tempos, dict_TOT5, "out/TOT5_tempo{}.mid"))
 
     # OVL4
     dict_OVL4 = {
@@ -93,10 +197,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 93
-    create_midi(xlsx_data, tempo, dict_OVL4, "out/OVL4_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_OVL4, "out/OVL4_tempo{}.mid".format(tempo))
+    tempos = [93, 60]
+    songs.append((tempos, dict_OVL4, "out/OVL4_tempo{}.mid"))
 
     # NIR
     dict_NIR = {
@@ -114,10 +216,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 81
-    create_midi(xlsx_data, tempo, dict_NIR, "out/NIR_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_NIR, "out/NIR_tempo{}.mid".format(tempo))
+    tempos = [81, 60]
+    songs.append((tempos, dict_NIR, "out/NIR_tempo{}.mid"))
 
     # MAT2
     dict_MAT2 = {
@@ -135,10 +235,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 74
-    create_midi(xlsx_data, tempo, dict_MAT2, "out/MAT2_tempo{}.mid".format(tempo))
-    tempo = 55
-    create_midi(xlsx_data, tempo, dict_MAT2, "out/MAT2_tempo{}.mid".format(tempo))
+    tempos = [74, 55]
+    songs.append((tempos, dict_MAT2, "out/MAT2_tempo{}.mid"))
 
     # AMA
     dict_AMA = {
@@ -161,10 +259,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 78
-    create_midi(xlsx_data, tempo, dict_AMA, "out/AMA_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_AMA, "out/AMA_tempo{}.mid".format(tempo))
+    tempos = [78, 60]
+    songs.append((tempos, dict_AMA, "out/AMA_tempo{}.mid"))
 
     # WAW2
     dict_WAW2 = {
@@ -182,10 +278,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 67
-    create_midi(xlsx_data, tempo, dict_WAW2, "out/WAW2_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_WAW2, "out/WAW2_tempo{}.mid".format(tempo))
+    tempos = [67, 60]
+    songs.append((tempos, dict_WAW2, "out/WAW2_tempo{}.mid"))
 
     # LIM下書き
     dict_LIM = {
@@ -208,10 +302,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 112
-    create_midi(xlsx_data, tempo, dict_LIM, "out/LIM_tempo{}.mid".format(tempo))
-    tempo = 80
-    create_midi(xlsx_data, tempo, dict_LIM, "out/LIM_tempo{}.mid".format(tempo))
+    tempos = [112, 80]
+    songs.append((tempos, dict_LIM, "out/LIM_tempo{}.mid"))
 
     # CRY4_R2
     dict_CRY = {
@@ -235,10 +327,8 @@ def ems_main():
             60: (4, 4),
         }
     }
-    tempo = 81
-    create_midi(xlsx_data, tempo, dict_CRY, "out/CRY_tempo{}.mid".format(tempo))
-    tempo = 70
-    create_midi(xlsx_data, tempo, dict_CRY, "out/CRY_tempo{}.mid".format(tempo))
+    tempos = [81, 70]
+    songs.append((tempos, dict_CRY, "out/CRY_tempo{}.mid"))
 
     # BRN5
     dict_BRN5 = {
@@ -259,10 +349,12 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 70
-    create_midi(xlsx_data, tempo, dict_BRN5, "out/BRN5_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_BRN5, "out/BRN5_tempo{}.mid".format(tempo))
+    tempos = [70, 60]
+    songs.append((tempos, dict_BRN5, "out/BRN5_tempo{}.mid"))
+    if check_only:
+        validate_songs(xlsx_data, songs)
+        return
+    create_midis(xlsx_data, songs, manifest_name="out/manifest.json")
 
 
 def parse_args():
@@ -276,28 +368,54 @@ def parse_args():
         help="エクセルのシート名"
     )
     parser.add_argument(
-        "-t", "--tempo", dest="tempo", type=int, required=True,
-        help="テンポ"
+        "-t", "--tempo", dest="tempo", type=int, nargs="+", required=True,
+        help="テンポ（複数指定するとテンポ違いのmidiをまとめて出力） ex) 92 60"
     )
     parser.add_argument(
-        "--sc", "--start_column", dest="start_column", type=str, required=True,
-        help="楽譜が開始する列の英番号",
+        "--ts", "--tempo_step", dest="tempo_step", type=int, default=None,
+        help="指定すると最初と最後のテンポの間をこの間隔で刻んで出力 ex) -t 60 100 --ts 5"
     )
     parser.add_argument(
-        "--ec", "--end_column", dest="end_column", type=str, required=True,
-        help="楽譜が終わる列の英番号",
+        "--raw", dest="raw", action="store_true",
+        help="xlsxをopenpyxlを使わずXMLから直接読み込む（シートの多い大きなワークブック向け）"
     )
     parser.add_argument(
-        "--rs", "--rows", dest="rows", type=str, nargs="+", required=True,
-        help="各楽器の行番号リスト ex) 1,2,3,4 <-一つ目の楽器の行 5,6,7,8<-二つ目の楽器の行",
+        "--check", dest="check", action="store_true",
+        help="midiを作らずに、楽譜欄の問題（読めない音名・拍数・色・罫線）だけを表示する"
     )
     parser.add_argument(
-        "-p", "--programs", dest="programs", type=str, nargs="+", required=True,
+        "--wav", dest="wav", action="store_true",
+        help="練習用の音源(wav)も出力する"
+    )
+    parser.add_argument(
+        "--mo", "--minus_one", dest="minus_one", action="store_true",
+        help="パートごとに、そのパートを抜いたmidiも出力する"
+    )
+    parser.add_argument(
+        "--solo", dest="solo", action="store_true",
+        help="--minus_oneと併用すると、パートごとにそのパートだけのmidiも出力する"
+    )
+    parser.add_argument(
+        "--sc", "--start_column", dest="start_column", type=str, default=None,
+        help="楽譜が開始する列の英番号（省略するとシートから自動で検出）",
+    )
+    parser.add_argument(
+        "--ec", "--end_column", dest="end_column", type=str, default=None,
+        help="楽譜が終わる列の英番号（省略するとシートから自動で検出）",
+    )
+    parser.add_argument(
+        "--rs", "--rows", dest="rows", type=str, nargs="+", default=None,
+        help="各楽器の行番号リスト ex) 1,2,3,4 <-一つ目の楽器の行 5,6,7,8<-二つ目の楽器の行\n"
+             + "（省略するとシートから自動で検出）",
+    )
+    parser.add_argument(
+        "-p", "--programs", dest="programs", type=str, nargs="+", default=None,
         help="各楽器の種類リスト ex) グランドピアノ スチールギター\n"
              + "対応楽器リスト: ハープ, グランドピアノ, スチールギター, ピチカート, \n"
              + "               フルート, オーボエ, クラリネット, ピッコロ, バンパイプ, \n"
              + "               ティンパニー, ボンゴ, バスドラム, スネアドラム, シンバル, \n"
-             + "               トランペット, トロンボーン, チューバ, ホルン, サックス"
+             + "               トランペット, トロンボーン, チューバ, ホルン, サックス\n"
+             + "（省略するとシートから自動で検出）"
     )
     parser.add_argument(
         "-r", "--rhythms", dest="rhythms", type=str, nargs="+", required=True,
@@ -339,22 +457,35 @@ class Xlsx2MidConverter(object):
         self.common_data_list = _common_data_list
 
     def fwrite(self, filename, on_list=None):
+        midi_data = self._create_midi_data()
+        midi_data.fwrite(filename)
+
+    def fwrite_tempo_variants(self, tempos, filename_format):
+        midi_data = self._create_midi_data()
+        return midi_data.fwrite_tempo_variants(tempos, filename_format)
+
+    def fwrite_minus_one(self, filename_format, tempos=None, solo=False):
+        midi_data = self._create_midi_data()
+        return midi_data.fwrite_minus_one(filename_format, tempos=tempos, solo=solo)
+
+    def fwrite_wav(self, filename, sample_rate=44100):
+        wav_data = WavWriter(sample_rate=sample_rate)
+        wav_data.add_midi_writer(self._create_midi_data())
+        wav_data.fwrite(filename)
+
+    def _create_midi_data(self):
         midi_data = MidiWriter(tempo=self.tempo, rhythm_dict=self.rhythm_dict)
         for common_data in self.common_data_list:
             print(common_data.get_program_str())
             midi_data.add_common_data(common_data)
-        midi_data.fwrite(filename)
+        return midi_data
 
 
 def main():
     args = parse_args()
-    xlsx_data = XlsxLoader(args.xlsx_name)
+    xlsx_data = XlsxLoader(args.xlsx_name, backend="raw" if args.raw else "openpyxl")
     data_dict = {
         "sheet_name": args.sheet_name,
-        "start_column_char": args.start_column.upper(),
-        "end_column_char": args.end_column.upper(),
-        "row_lists": [[int(r) for r in rs.strip().split(",")] for rs in args.rows],
-        "program_list": [p.strip() for p in args.programs],
         "rhythm": { 
             int(rhythm.strip().split(",")[0]): (
                 int(rhythm.strip().split(",")[1]),
@@ -362,9 +493,60 @@ def main():
             ) for rhythm in args.rhythms
         }
     }
+    if None in (args.start_column, args.end_column, args.rows, args.programs):
+        # 指定されていない楽譜欄はシートから検出する
+        region = xlsx_data.detect_score_region(args.sheet_name)
+        if region is None:
+            print("[ERROR] Score region was not detected. Please specify --sc, --ec, --rs and -p")
+            return
+        print("Detected score region:", region)
+    if args.start_column is not None:
+        data_dict["start_column_char"] = args.start_column.upper()
+    else:
+        data_dict["start_column_char"] = region["start_column_char"]
+    if args.end_column is not None:
+        data_dict["end_column_char"] = args.end_column.upper()
+    else:
+        data_dict["end_column_char"] = region["end_column_char"]
+    if args.rows is not None:
+        data_dict["row_lists"] = [[int(r) for r in rs.strip().split(",")] for rs in args.rows]
+    else:
+        data_dict["row_lists"] = region["row_lists"]
+    if args.programs is not None:
+        data_dict["program_list"] = [p.strip() for p in args.programs]
+    else:
+        if None in region["program_list"]:
+            print("[ERROR] Program was not found for part {}. Please specify -p".format(
+                region["program_list"].index(None) + 1
+            ))
+            return
+        data_dict["program_list"] = region["program_list"]
     print(data_dict)
-    tempo = int(args.tempo)
-    create_midi(xlsx_data, tempo, data_dict, "{}_tempo{}.mid".format(args.sheet_name, tempo))
+    tempos = [int(tempo) for tempo in args.tempo]
+    if args.tempo_step is not None:
+        tempos = get_tempo_ladder(tempos[0], tempos[-1], args.tempo_step)
+    if args.check:
+        validate_songs(xlsx_data, [(tempos, data_dict, None)])
+        return
+    if len(tempos) == 1:
+        tempo = tempos[0]
+        midi_data = create_midi(
+            xlsx_data, tempo, data_dict, "{}_tempo{}.mid".format(args.sheet_name, tempo)
+        )
+    else:
+        midi_data = create_midi(
+            xlsx_data, tempos, data_dict, "{}_tempo{{}}.mid".format(args.sheet_name)
+        )
+    if args.wav:
+        wav_data = WavWriter()
+        wav_data.add_midi_writer(midi_data)
+        wav_data.fwrite("{}_tempo{}.wav".format(args.sheet_name, tempos[0]))
+    if args.minus_one:
+        midi_data.fwrite_minus_one(
+            args.sheet_name + "_{mode}{part}_{program}_tempo{tempo}.mid",
+            tempos=tempos,
+            solo=args.solo,
+        )
 
 
 if __name__ == '__main__':
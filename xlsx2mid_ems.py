@@ -2,36 +2,18 @@
 from os import makedirs
 from argparse import ArgumentParser
 from dataset.xlsx.loader import XlsxLoader
-from dataset.midi.writer import MidiWriter
-
-
-def create_midi(xlsx_data, tempo, data_dict, mid_name):
-    midi_data = MidiWriter(tempo=tempo, rhythm_dict=data_dict["rhythm"])
-    for row_list, program in zip(data_dict["row_lists"], data_dict["program_list"]):
-        sound_list, rate_list = xlsx_data.get_sound_list(
-            data_dict["sheet_name"],
-            data_dict["start_column_char"],
-            data_dict["end_column_char"],
-            row_list,
-        )
-        print(sound_list)
-        print(rate_list)
-        midi_data.add_sound_list(
-            sound_list,
-            rate_list,
-            program=program,
-        )
-    midi_data.fwrite(mid_name)
-    midi_data.pprint()
-    
+from xlsx2mid import create_midi, create_midis
+
 
 def ems_main():
     # xlsx_data = XlsxLoader("EMS楽譜専用(EMS score).xlsx")
     # xlsx_data = XlsxLoader("EMS作曲・下書き専用_WOT.xlsx", force_same_width=True)
     # xlsx_data = XlsxLoader("UU.xlsx", force_same_width=True)
     # xlsx_data = XlsxLoader("CR2下書き.xlsx", force_same_width=True)
-    xlsx_data = XlsxLoader("EMS作曲・下書き専用_CON.xlsx", force_same_width=True)
+    # シートを必要なときだけ読むrawで開き、曲をまとめてからcreate_midisで出力する
+    xlsx_data = XlsxLoader("EMS作曲・下書き専用_CON.xlsx", force_same_width=True, backend="raw")
     makedirs("out", exist_ok=True)
+    songs = []
 
     # CON下書き
     dict_CON = {
@@ -61,8 +43,8 @@ def ems_main():
         }
     }
     tempo = 60
-    create_midi(xlsx_data, tempo, dict_CON, "out/CON_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_CON, "out/CON_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # CR2下書き
     dict_CR2 = {
@@ -81,8 +63,8 @@ def ems_main():
         }
     }
     tempo = 128
-    create_midi(xlsx_data, tempo, dict_CR2, "out/CR2_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_CR2, "out/CR2_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # WOT下書き
     dict_WOT = {
@@ -101,8 +83,8 @@ def ems_main():
         }
     }
     tempo = 75
-    create_midi(xlsx_data, tempo, dict_WOT, "out/WOT_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_WOT, "out/WOT_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # UU
     dict_UU = {
@@ -128,8 +110,8 @@ def ems_main():
         }
     }
     tempo = 125
-    create_midi(xlsx_data, tempo, dict_UU, "out/UU_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_UU, "out/UU_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # ALPv4下書き
     dict_BCD = {
@@ -155,8 +137,8 @@ def ems_main():
         }
     }
     tempo = 150
-    create_midi(xlsx_data, tempo, dict_BCD, "out/ALPv4_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_BCD, "out/ALPv4_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # BCD下書き
     dict_BCD = {
@@ -176,8 +158,8 @@ def ems_main():
         }
     }
     tempo = 84
-    create_midi(xlsx_data, tempo, dict_BCD, "out/BCD_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_BCD, "out/BCD_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # DBA下書き
     dict_DBA = {
@@ -203,8 +185,8 @@ def ems_main():
         }
     }
     tempo = 163
-    create_midi(xlsx_data, tempo, dict_DBA, "out/DBA_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_DBA, "out/DBA_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # MAT改下書き
     dict_MAT = {
@@ -230,8 +212,8 @@ def ems_main():
         }
     }
     tempo = 74
-    create_midi(xlsx_data, tempo, dict_MAT, "out/MAT改_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_MAT, "out/MAT改_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # GRI下書き
     dict_GRI = {
@@ -257,8 +239,8 @@ def ems_main():
         }
     }
     tempo = 142
-    create_midi(xlsx_data, tempo, dict_GRI, "out/GRI_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_GRI, "out/GRI_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # KUG下書き
     dict_KUG = {
@@ -279,8 +261,8 @@ def ems_main():
         }
     }
     tempo = 80
-    create_midi(xlsx_data, tempo, dict_KUG, "out/KUG_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_KUG, "out/KUG_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # WTH下書き
     dict_WTH = {
@@ -305,8 +287,8 @@ def ems_main():
         }
     }
     tempo = 80
-    create_midi(xlsx_data, tempo, dict_WTH, "out/WTH_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_WTH, "out/WTH_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # WOS下書き
     dict_WOS = {
@@ -328,8 +310,8 @@ def ems_main():
         }
     }
     tempo = 150
-    create_midi(xlsx_data, tempo, dict_WOS, "out/WOS_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_WOS, "out/WOS_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # EW下書き
     dict_EW = {
@@ -351,7 +333,7 @@ def ems_main():
         }
     }
     tempo = 100
-    create_midi(xlsx_data, tempo, dict_EW, "out/EW_tempo{}.mid".format(tempo))
+    songs.append((tempo, dict_EW, "out/EW_tempo{}.mid".format(tempo)))
 
     # TIT下書き
     dict_TIT = {
@@ -373,8 +355,8 @@ def ems_main():
 
     }
     tempo = 180
-    create_midi(xlsx_data, tempo, dict_TIT, "out/TIT_tempo{}.mid".format(tempo))
-    return
+    songs.append((tempo, dict_TIT, "out/TIT_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
     # TM4
     dict_TM4 = {
@@ -395,10 +377,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 92
-    create_midi(xlsx_data, tempo, dict_TM4, "out/TM4_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_TM4, "out/TM4_tempo{}.mid".format(tempo))
+    tempos = [92, 60]
+    songs.append((tempos, dict_TM4, "out/TM4_tempo{}.mid"))
 
     # TOT5
     dict_TOT5 = {
@@ -419,10 +399,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 72
-    create_midi(xlsx_data, tempo, dict_TOT5, "out/TOT5_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_TOT5, "out/TOT5_tempo{}.mid".format(tempo))
+    tempos = [72, 60]
+    songs.append((tempos, dict_TOT5, "out/TOT5_tempo{}.mid"))
 
     # OVL4
     dict_OVL4 = {
@@ -442,10 +420,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 93
-    create_midi(xlsx_data, tempo, dict_OVL4, "out/OVL4_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_OVL4, "out/OVL4_tempo{}.mid".format(tempo))
+    tempos = [93, 60]
+    songs.append((tempos, dict_OVL4, "out/OVL4_tempo{}.mid"))
 
     # NIR2
     dict_NIR2 = {
@@ -463,10 +439,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 81
-    create_midi(xlsx_data, tempo, dict_NIR2, "out/NIR2_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_NIR2, "out/NIR2_tempo{}.mid".format(tempo))
+    tempos = [81, 60]
+    songs.append((tempos, dict_NIR2, "out/NIR2_tempo{}.mid"))
 
     # NIR7
     dict_NIR7 = {
@@ -490,10 +464,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 162
-    create_midi(xlsx_data, tempo, dict_NIR7, "out/NIR7_tempo{}.mid".format(tempo))
-    tempo = 120
-    create_midi(xlsx_data, tempo, dict_NIR7, "out/NIR7_tempo{}.mid".format(tempo))
+    tempos = [162, 120]
+    songs.append((tempos, dict_NIR7, "out/NIR7_tempo{}.mid"))
 
     # MAT2
     dict_MAT2 = {
@@ -511,10 +483,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 74
-    create_midi(xlsx_data, tempo, dict_MAT2, "out/MAT2_tempo{}.mid".format(tempo))
-    tempo = 55
-    create_midi(xlsx_data, tempo, dict_MAT2, "out/MAT2_tempo{}.mid".format(tempo))
+    tempos = [74, 55]
+    songs.append((tempos, dict_MAT2, "out/MAT2_tempo{}.mid"))
 
     # AMA
     dict_AMA = {
@@ -537,10 +507,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 78
-    create_midi(xlsx_data, tempo, dict_AMA, "out/AMA_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_AMA, "out/AMA_tempo{}.mid".format(tempo))
+    tempos = [78, 60]
+    songs.append((tempos, dict_AMA, "out/AMA_tempo{}.mid"))
 
     # WAW2
     dict_WAW2 = {
@@ -558,10 +526,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 67
-    create_midi(xlsx_data, tempo, dict_WAW2, "out/WAW2_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_WAW2, "out/WAW2_tempo{}.mid".format(tempo))
+    tempos = [67, 60]
+    songs.append((tempos, dict_WAW2, "out/WAW2_tempo{}.mid"))
 
     # LIM下書き
     dict_LIM = {
@@ -584,10 +550,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 112
-    create_midi(xlsx_data, tempo, dict_LIM, "out/LIM_tempo{}.mid".format(tempo))
-    tempo = 80
-    create_midi(xlsx_data, tempo, dict_LIM, "out/LIM_tempo{}.mid".format(tempo))
+    tempos = [112, 80]
+    songs.append((tempos, dict_LIM, "out/LIM_tempo{}.mid"))
 
     # CRY4_R2
     dict_CRY = {
@@ -611,10 +575,8 @@ def ems_main():
             60: (4, 4),
         }
     }
-    tempo = 81
-    create_midi(xlsx_data, tempo, dict_CRY, "out/CRY_tempo{}.mid".format(tempo))
-    tempo = 70
-    create_midi(xlsx_data, tempo, dict_CRY, "out/CRY_tempo{}.mid".format(tempo))
+    tempos = [81, 70]
+    songs.append((tempos, dict_CRY, "out/CRY_tempo{}.mid"))
 
     # BRN5
     dict_BRN5 = {
@@ -635,10 +597,8 @@ def ems_main():
             1: (4, 4),
         }
     }
-    tempo = 70
-    create_midi(xlsx_data, tempo, dict_BRN5, "out/BRN5_tempo{}.mid".format(tempo))
-    tempo = 60
-    create_midi(xlsx_data, tempo, dict_BRN5, "out/BRN5_tempo{}.mid".format(tempo))
+    tempos = [70, 60]
+    songs.append((tempos, dict_BRN5, "out/BRN5_tempo{}.mid"))
 
     # NIB4
     dict_NIB4 = {
@@ -659,7 +619,7 @@ def ems_main():
         }
     }
     tempo = 60
-    create_midi(xlsx_data, tempo, dict_NIB4, "out/NIB4_tempo{}.mid".format(tempo))
+    songs.append((tempo, dict_NIB4, "out/NIB4_tempo{}.mid".format(tempo)))
 
     # ILM4
     dict_ILM4 = {
@@ -680,7 +640,7 @@ def ems_main():
         }
     }
     tempo = 25
-    create_midi(xlsx_data, tempo, dict_ILM4, "out/ILM4_tempo{}.mid".format(tempo))
+    songs.append((tempo, dict_ILM4, "out/ILM4_tempo{}.mid".format(tempo)))
 
     # ULD下書き
     dict_ULD = {
@@ -701,7 +661,8 @@ def ems_main():
         }
     }
     tempo = 82
-    create_midi(xlsx_data, tempo, dict_ULD, "out/ULD_tempo{}.mid".format(tempo))
+    songs.append((tempo, dict_ULD, "out/ULD_tempo{}.mid".format(tempo)))
+    return create_midis(xlsx_data, songs)
 
 
 def parse_args():
@@ -718,6 +679,10 @@ def parse_args():
         "-t", "--tempo", dest="tempo", type=int, required=True,
         help="テンポ"
     )
+    parser.add_argument(
+        "--raw", dest="raw", action="store_true",
+        help="xlsxをopenpyxlを使わずXMLから直接読み込む（シートの多い大きなワークブック向け）"
+    )
     parser.add_argument(
         "--sc", "--start_column", dest="start_column", type=str, required=True,
         help="楽譜が開始する列の英番号",
@@ -747,7 +712,7 @@ def parse_args():
 
 def main():
     args = parse_args()
-    xlsx_data = XlsxLoader(args.xlsx_name)
+    xlsx_data = XlsxLoader(args.xlsx_name, backend="raw" if args.raw else "openpyxl")
     data_dict = {
         "sheet_name": args.sheet_name,
         "start_column_char": args.start_column.upper(),